@@ -1,14 +1,71 @@
 """FastAPI backend for fraud detection system."""
-from fastapi import FastAPI, HTTPException, Query
-from pydantic import BaseModel, Field
-from typing import List, Optional
+import base64
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import Iterator, List, Optional, Tuple, Union
 import pandas as pd
-from config import ANOMALY_OUTPUT, RISK_OUTPUT, API_HOST, API_PORT
-from utils.data_loader import load_csv
+from config import (
+    RISK_OUTPUT, RISK_STORE, AGGREGATES_OUTPUT, API_HOST, API_PORT, API_STORE, EXPORT_CHUNK_SIZE,
+    METRICS_ENABLED
+)
+from backend.cache import DatasetCache
+from backend.query import QueryService
+from backend.risk_index import RiskIndex
+from backend.risk_store import RiskStore
+from backend.scoring import MicroBatcher, ScoringService
+from utils.aggregates import DIMENSIONS, load_cube, rollup
 from utils.logger import setup_logger
+from utils.metrics import registry
 
 logger = setup_logger(__name__)
-app = FastAPI(title="Beneficiary Fraud Detection API", version="1.0.0")
+if API_STORE == "sqlite":
+    # Indexed database queried per request; memory does not grow with the dataset
+    dataset_cache = DatasetCache(loader=RiskStore.open)
+    queries = QueryService(dataset_cache, RISK_STORE)
+else:
+    dataset_cache = DatasetCache(builder=RiskIndex)
+    queries = QueryService(dataset_cache, RISK_OUTPUT)
+# The aggregate cube is small enough to serve from memory with either store
+aggregate_cache = DatasetCache(loader=load_cube)
+aggregates = QueryService(aggregate_cache, AGGREGATES_OUTPUT, workers=1)
+scoring_service = ScoringService()
+batcher = MicroBatcher(scoring_service)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the dataset cache and scoring tables, and run the micro-batcher."""
+    index = await queries.index()
+    if index is not None:
+        await run_in_threadpool(scoring_service.refresh, index)
+    batcher.start()
+    yield
+    await batcher.stop()
+    queries.shutdown()
+    aggregates.shutdown()
+
+app = FastAPI(title="Beneficiary Fraud Detection API", version="1.0.0", lifespan=lifespan)
+
+if METRICS_ENABLED:
+    request_seconds = registry.histogram("http_request_seconds", "Latency of API requests")
+
+    @app.middleware("http")
+    async def record_latency(request: Request, call_next):
+        """Observe request latency labelled by route template, method and status."""
+        started = time.perf_counter()
+        response = await call_next(request)
+        # The route template, not the raw path, keeps label cardinality bounded
+        route = request.scope.get("route")
+        request_seconds.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=response.status_code
+        )
+        return response
 
 class Beneficiary(BaseModel):
     """Beneficiary data model."""
@@ -21,16 +78,137 @@ class Beneficiary(BaseModel):
     amount: int
     district: str
     date: str
+    cluster_id: Optional[int] = None
+    cluster_size: Optional[int] = None
+    ring_id: Optional[int] = None
+    ring_size: Optional[int] = None
+    shared_links: Optional[int] = None
     anomaly: Optional[int] = None
+    anomaly_score: Optional[float] = None
     risk_score: Optional[float] = None
 
+class Enrollment(BaseModel):
+    """New beneficiary record submitted for real-time scoring."""
+    beneficiary_id: int
+    name: str
+    phone: str
+    address: str
+    bank_account: int
+    scheme: str
+    amount: int
+    district: str
+    date: str
+
+class DuplicateCandidate(BaseModel):
+    """Indexed beneficiary that may be the same person."""
+    beneficiary_id: int
+    similarity: float
+
+class ScoreResult(BaseModel):
+    """Real-time assessment of one enrollment."""
+    beneficiary_id: int
+    anomaly: int
+    anomaly_score: float
+    risk_score: float
+    same_bank_count: int
+    same_address_count: int
+    ring_size: int
+    shared_links: int
+    duplicate_candidates: List[DuplicateCandidate]
+
+class RiskPage(BaseModel):
+    """One keyset page of beneficiaries ordered by descending risk."""
+    items: List[Beneficiary]
+    next_cursor: Optional[str] = None
+
+class AggregateCell(BaseModel):
+    """Leakage totals of one district/scheme/month group."""
+    district: Optional[str] = None
+    scheme: Optional[str] = None
+    month: Optional[str] = None
+    records: int
+    anomalies: int
+    high_risk: int
+    amount_total: int
+    amount_at_risk: int
+    mean_risk_score: float
+
+beneficiary_list = TypeAdapter(List[Beneficiary])
+aggregate_list = TypeAdapter(List[AggregateCell])
+
+def encode_cursor(key: Optional[Tuple[float, int]]) -> Optional[str]:
+    """Encode a (risk_score, beneficiary_id) key as an opaque cursor."""
+    if key is None:
+        return None
+    return base64.urlsafe_b64encode(f"{key[0]!r}:{key[1]}".encode()).decode()
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[float, int]]:
+    """Decode a cursor produced by encode_cursor, raising 400 if malformed."""
+    if cursor is None:
+        return None
+    try:
+        risk, beneficiary_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return float(risk), int(beneficiary_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def records_json(df: pd.DataFrame) -> bytes:
+    """Validate rows against Beneficiary and serialize them as a JSON array."""
+    return beneficiary_list.dump_json(beneficiary_list.validate_python(df.to_dict(orient="records")))
+
+def cells_json(df: pd.DataFrame) -> bytes:
+    """Validate rollup rows against AggregateCell and serialize them as a JSON array."""
+    return aggregate_list.dump_json(aggregate_list.validate_python(df.to_dict(orient="records")))
+
+async def serve_query(key: tuple, func, service: QueryService = queries) -> Response:
+    """
+    Answer a read query with the shared, serialized result of func(index).
+
+    Args:
+        key: Query name and parameters, identical for identical requests
+        func: Function of the served dataset returning the JSON response body
+        service: Query service of the dataset, the risk data by default
+
+    Returns:
+        JSON response
+    """
+    try:
+        return Response(await service.run(key, func), media_type="application/json")
+    except LookupError:
+        raise HTTPException(status_code=500, detail="Failed to load risk data")
+
 @app.get("/")
-def home():
+async def home():
     """Health check endpoint."""
     return {"status": "API running", "version": "1.0.0"}
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Dataset cache hit/miss/reload and query coalescing metrics."""
+    return {
+        **dataset_cache.stats(),
+        'queries': queries.stats(),
+        'aggregates': {**aggregate_cache.stats(), 'queries': aggregates.stats()},
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of API, cache and model metrics."""
+    stats = dataset_cache.stats()
+    cache_gauge = registry.gauge("dataset_cache", "Dataset cache counters and hit rate")
+    for name, value in stats.items():
+        if isinstance(value, (int, float)):
+            cache_gauge.set(value, stat=name)
+    load_gauge = registry.gauge("dataset_cache_load_seconds", "Duration of the last load per dataset")
+    for dataset, seconds in stats["load_seconds"].items():
+        load_gauge.set(seconds, dataset=dataset)
+    query_gauge = registry.gauge("api_queries", "Read queries computed, coalesced and served from memo")
+    for name, value in queries.stats().items():
+        query_gauge.set(value, outcome=name)
+    return registry.render()
+
 @app.get("/anomalies", response_model=List[Beneficiary])
-def get_anomalies(
+async def get_anomalies(
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of results"),
     min_risk: Optional[float] = Query(None, ge=0, description="Minimum risk score filter")
 ):
@@ -45,31 +223,26 @@ def get_anomalies(
         List of anomalous beneficiaries
     """
     try:
-        df = load_csv(ANOMALY_OUTPUT)
-        if df is None:
-            raise HTTPException(status_code=500, detail="Failed to load anomaly data")
-        
-        # Filter anomalies
-        anomalies = df[df['anomaly'] == -1]
-        
-        # Apply risk filter if provided
-        if min_risk is not None and 'risk_score' in anomalies.columns:
-            anomalies = anomalies[anomalies['risk_score'] >= min_risk]
-        
-        # Limit results
-        anomalies = anomalies.head(limit)
-        
-        logger.info(f"Returning {len(anomalies)} anomalies")
-        return anomalies.to_dict(orient="records")
+        # Prebuilt anomaly subset, optionally filtered by risk
+        return await serve_query(
+            ("anomalies", limit, min_risk),
+            lambda index: records_json(index.anomalies(limit, min_risk))
+        )
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error fetching anomalies: {str(e)}")
+        logger.error("Error fetching anomalies: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/risk", response_model=List[Beneficiary])
-def get_high_risk(
+async def get_high_risk(
     threshold: float = Query(10.0, ge=0, description="Risk score threshold"),
-    limit: int = Query(100, ge=1, le=1000, description="Maximum number of results")
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of results"),
+    district: Optional[str] = Query(None, description="Only this district"),
+    scheme: Optional[str] = Query(None, description="Only this scheme"),
+    date_from: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="Earliest date, YYYY-MM-DD"),
+    date_to: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="Latest date, YYYY-MM-DD")
 ):
     """
     Get high-risk beneficiaries.
@@ -77,28 +250,181 @@ def get_high_risk(
     Args:
         threshold: Minimum risk score threshold
         limit: Maximum number of results to return
+        district: Optional district filter
+        scheme: Optional scheme filter
+        date_from: Optional earliest enrollment date
+        date_to: Optional latest enrollment date
         
     Returns:
         List of high-risk beneficiaries
     """
     try:
-        df = load_csv(RISK_OUTPUT)
-        if df is None:
-            raise HTTPException(status_code=500, detail="Failed to load risk data")
+        # Binary search over the risk-sorted order
+        filters = dict(district=district, scheme=scheme, date_from=date_from, date_to=date_to)
+        return await serve_query(
+            ("risk", threshold, limit, *filters.values()),
+            lambda index: records_json(index.high_risk(threshold, limit, **filters))
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error fetching high-risk beneficiaries: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/risk/page", response_model=RiskPage)
+async def get_risk_page(
+    threshold: float = Query(0.0, ge=0, description="Risk score threshold"),
+    limit: int = Query(100, ge=1, le=1000, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    anomalies_only: bool = Query(False, description="Only page over anomalies")
+):
+    """
+    Page through beneficiaries by descending risk score.
+    
+    Args:
+        threshold: Minimum risk score threshold
+        limit: Page size
+        cursor: Cursor returned with the previous page
+        anomalies_only: Only include anomalies
+        
+    Returns:
+        Page of beneficiaries and the cursor of the next page
+    """
+    try:
+        after = decode_cursor(cursor)
+        
+        def page(index) -> bytes:
+            rows, last_key = index.page(threshold, limit, after, anomalies_only)
+            return RiskPage(
+                items=rows.to_dict(orient="records"),
+                next_cursor=encode_cursor(last_key)
+            ).model_dump_json().encode()
+        
+        return await serve_query(("page", threshold, limit, after, anomalies_only), page)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error fetching risk page: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/export")
+async def export_risk(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    threshold: float = Query(0.0, ge=0, description="Risk score threshold"),
+    anomalies_only: bool = Query(False, description="Only export anomalies")
+):
+    """
+    Stream every beneficiary at or above a threshold, ordered by descending risk.
+    
+    Rows are serialized EXPORT_CHUNK_SIZE at a time straight from the
+    DataFrame, so memory per request does not grow with the result size.
+    
+    Args:
+        format: Output format, ndjson or csv
+        threshold: Minimum risk score threshold
+        anomalies_only: Only include anomalies
+        
+    Returns:
+        Streaming NDJSON or CSV response
+    """
+    index = await queries.index()
+    if index is None:
+        raise HTTPException(status_code=500, detail="Failed to load risk data")
+    
+    def serialize() -> Iterator[str]:
+        # The generator holds this index snapshot even if the cache reloads
+        for number, chunk in enumerate(
+            index.iter_chunks(threshold, EXPORT_CHUNK_SIZE, anomalies_only)
+        ):
+            if format == "csv":
+                yield chunk.to_csv(index=False, header=number == 0)
+            else:
+                yield chunk.to_json(orient="records", lines=True).rstrip("\n") + "\n"
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    logger.info("Streaming %s export with threshold=%s", format, threshold)
+    return StreamingResponse(
+        serialize(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=risk_export.{format}"}
+    )
+
+@app.get("/aggregates", response_model=List[AggregateCell])
+async def get_aggregates(
+    group_by: str = Query("district", description="Comma-separated dimensions out of district, scheme, month; empty for one total"),
+    district: Optional[str] = Query(None, description="Only this district"),
+    scheme: Optional[str] = Query(None, description="Only this scheme"),
+    month_from: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Earliest month, YYYY-MM"),
+    month_to: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Latest month, YYYY-MM")
+):
+    """
+    Get leakage totals rolled up from the precomputed district x scheme x month cube.
+    
+    Args:
+        group_by: Dimensions to group by; drill down by filtering on one and grouping by another
+        district: Optional district filter
+        scheme: Optional scheme filter
+        month_from: Optional earliest month
+        month_to: Optional latest month
         
-        # Filter by risk threshold
-        high_risk = df[df['risk_score'] >= threshold]
-        high_risk = high_risk.sort_values('risk_score', ascending=False).head(limit)
+    Returns:
+        List of aggregate cells sorted by the group_by dimensions
+    """
+    dimensions = list(dict.fromkeys(d.strip() for d in group_by.split(",") if d.strip()))
+    unknown = [d for d in dimensions if d not in DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by dimensions: {unknown}")
+    
+    try:
+        filters = dict(district=district, scheme=scheme, month_from=month_from, month_to=month_to)
+        return await serve_query(
+            ("aggregates", tuple(dimensions), *filters.values()),
+            lambda cube: cells_json(rollup(cube, dimensions, **filters)),
+            service=aggregates
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error fetching aggregates: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/score", response_model=List[ScoreResult])
+async def score_enrollments(enrollments: Union[Enrollment, List[Enrollment]]):
+    """
+    Score one new enrollment or a batch of them in real time.
+    
+    Concurrent requests are micro-batched into one vectorized scoring pass
+    against warm count tables and the preloaded anomaly model.
+    
+    Args:
+        enrollments: One record or a list of records
         
-        logger.info(f"Returning {len(high_risk)} high-risk beneficiaries")
-        return high_risk.to_dict(orient="records")
+    Returns:
+        Anomaly flag, risk score and duplicate candidates per record
+    """
+    if not isinstance(enrollments, list):
+        enrollments = [enrollments]
+    if not enrollments:
+        return []
     
+    try:
+        index = await queries.index()
+        if index is not None:
+            # No-op unless the served dataset was reloaded
+            await run_in_threadpool(scoring_service.refresh, index)
+        return await batcher.submit([e.model_dump() for e in enrollments])
+    
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        logger.error(f"Error fetching high-risk beneficiaries: {str(e)}")
+        logger.error("Error scoring enrollments: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/beneficiary/{beneficiary_id}", response_model=Beneficiary)
-def get_beneficiary(beneficiary_id: int):
+async def get_beneficiary(beneficiary_id: int):
     """
     Get details for a specific beneficiary.
     
@@ -109,20 +435,21 @@ def get_beneficiary(beneficiary_id: int):
         Beneficiary details
     """
     try:
-        df = load_csv(RISK_OUTPUT)
-        if df is None:
-            raise HTTPException(status_code=500, detail="Failed to load data")
-        
-        beneficiary = df[df['beneficiary_id'] == beneficiary_id]
-        if beneficiary.empty:
+        # Off the event loop: a SQLite store may wait for a pooled connection
+        beneficiary = await queries.run(
+            ("beneficiary", beneficiary_id), lambda index: index.get(beneficiary_id)
+        )
+        if beneficiary is None:
             raise HTTPException(status_code=404, detail="Beneficiary not found")
         
-        return beneficiary.iloc[0].to_dict()
+        return beneficiary
     
     except HTTPException:
         raise
+    except LookupError:
+        raise HTTPException(status_code=500, detail="Failed to load data")
     except Exception as e:
-        logger.error(f"Error fetching beneficiary {beneficiary_id}: {str(e)}")
+        logger.error("Error fetching beneficiary %d: %s", beneficiary_id, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+"""In-memory dataset cache for the API, invalidated by file mtime or pipeline version."""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Optional
+import pandas as pd
+from config import PIPELINE_VERSION_FILE
+from utils.data_loader import load_data
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class _Entry(NamedTuple):
+    """Immutable cache entry; replaced as a whole so readers never see a partial update."""
+    fingerprint: tuple
+    data: Any
+
+class DatasetCache:
+    """Share parsed datasets across requests and reload them when they change."""
+
+    def __init__(
+        self,
+        loader: Callable[[Path], Optional[pd.DataFrame]] = load_data,
+        version_file: Path = PIPELINE_VERSION_FILE,
+        builder: Optional[Callable[[pd.DataFrame], Any]] = None
+    ):
+        """
+        Initialize dataset cache.
+
+        Args:
+            loader: Function loading a dataset from a path, returns None on failure
+            version_file: File the pipeline rewrites after each successful run
+            builder: Optional function turning a loaded DataFrame into the cached
+                object (e.g. an index), run once per load
+        """
+        self.loader = loader
+        self.builder = builder
+        self.version_file = version_file
+        self._entries: Dict[Path, _Entry] = {}
+        self._locks: Dict[Path, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'reloads': 0, 'load_errors': 0}
+        self._load_seconds: Dict[str, float] = {}
+
+    def get(self, file_path: Path) -> Optional[Any]:
+        """
+        Return the cached dataset, loading or reloading it if it changed.
+
+        Callers must treat the returned object as read-only since it is
+        shared between concurrent requests.
+
+        Args:
+            file_path: Dataset path
+
+        Returns:
+            DataFrame (or builder output) if available, None otherwise
+        """
+        fingerprint = self._fingerprint(file_path)
+        entry = self._entries.get(file_path)
+        if entry is not None and entry.fingerprint == fingerprint:
+            self._stats['hits'] += 1
+            return entry.data
+
+        with self._lock_for(file_path):
+            # Another request may have reloaded while this one waited
+            fingerprint = self._fingerprint(file_path)
+            entry = self._entries.get(file_path)
+            if entry is not None and entry.fingerprint == fingerprint:
+                self._stats['hits'] += 1
+                return entry.data
+
+            if fingerprint is None:
+                self._stats['load_errors'] += 1
+                logger.error("File not found: %s", file_path)
+                return entry.data if entry is not None else None
+
+            started = time.perf_counter()
+            data = self.loader(file_path)
+            if data is None:
+                self._stats['load_errors'] += 1
+                # Keep serving the previous copy rather than failing requests
+                return entry.data if entry is not None else None
+            if self.builder is not None:
+                data = self.builder(data)
+
+            self._entries[file_path] = _Entry(fingerprint, data)
+            self._load_seconds[str(file_path)] = time.perf_counter() - started
+            self._stats['reloads' if entry is not None else 'misses'] += 1
+            logger.info(
+                "%s %s (%d records) in %.3fs",
+                'Reloaded' if entry is not None else 'Cached', file_path,
+                len(data), self._load_seconds[str(file_path)]
+            )
+            return data
+
+    def invalidate(self, file_path: Optional[Path] = None) -> None:
+        """
+        Drop one or all cached datasets.
+
+        Args:
+            file_path: Dataset to drop, all datasets when None
+        """
+        if file_path is None:
+            self._entries = {}
+        else:
+            self._entries.pop(file_path, None)
+
+    def stats(self) -> dict:
+        """
+        Return cache metrics.
+
+        Returns:
+            Dictionary with hit/miss/reload/error counters, hit rate and the
+            last load duration per dataset
+        """
+        lookups = self._stats['hits'] + self._stats['misses'] + self._stats['reloads']
+        return {
+            **self._stats,
+            'hit_rate': self._stats['hits'] / lookups if lookups else 0.0,
+            'datasets': len(self._entries),
+            'load_seconds': dict(self._load_seconds),
+        }
+
+    def _fingerprint(self, file_path: Path) -> Optional[tuple]:
+        """Cheap change detector: file mtime/size plus the pipeline version stamp."""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        try:
+            version = os.stat(self.version_file).st_mtime_ns
+        except OSError:
+            version = None
+        return stat.st_mtime_ns, stat.st_size, version
+
+    def _lock_for(self, file_path: Path) -> threading.Lock:
+        """Return the per-dataset lock serializing loads of one file."""
+        with self._locks_guard:
+            return self._locks.setdefault(file_path, threading.Lock())
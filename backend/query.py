@@ -0,0 +1,126 @@
+"""Off-loop query execution for the API with request coalescing."""
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional
+from config import API_DATASET_CHECK_SECONDS, API_QUERY_MEMO_SIZE, API_QUERY_WORKERS
+from backend.cache import DatasetCache
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class QueryService:
+    """Run read queries against the served dataset in a dedicated executor.
+
+    Identical queries that arrive while one is computing share its result,
+    and finished results are memoized until the dataset is reloaded, so a
+    popular query is computed and serialized once per dataset version. The
+    event loop itself only does dictionary lookups.
+    """
+
+    def __init__(
+        self,
+        cache: DatasetCache,
+        file_path: Path,
+        workers: int = API_QUERY_WORKERS,
+        memo_size: int = API_QUERY_MEMO_SIZE,
+        check_seconds: float = API_DATASET_CHECK_SECONDS
+    ):
+        """
+        Initialize query service.
+
+        Args:
+            cache: Dataset cache holding the served dataset
+            file_path: Path of the served dataset
+            workers: Threads running dataset loads and queries
+            memo_size: Finished query results kept per dataset version
+            check_seconds: How often the dataset file is checked for changes
+        """
+        self.cache = cache
+        self.file_path = file_path
+        self.memo_size = memo_size
+        self.check_seconds = check_seconds
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query")
+        self._index = None
+        self._checked_at = float("-inf")
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._memo: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._stats = {'computed': 0, 'coalesced': 0, 'memo_hits': 0}
+
+    async def index(self) -> Optional[Any]:
+        """
+        Return the served dataset, re-checking the file at most every check_seconds.
+
+        Returns:
+            Cached dataset (builder output), None if it cannot be loaded
+        """
+        if self._index is None or time.monotonic() - self._checked_at >= self.check_seconds:
+            index = await self._coalesced(("dataset",), self.cache.get, self.file_path)
+            self._checked_at = time.monotonic()
+            if index is not self._index:
+                # A new dataset version invalidates every memoized result
+                self._memo.clear()
+                self._index = index
+        return self._index
+
+    async def run(self, key: Hashable, func: Callable[[Any], Any]) -> Any:
+        """
+        Compute func(dataset) in the executor, once per key and dataset version.
+
+        Args:
+            key: Hashable description of the query, e.g. ("risk", threshold, limit)
+            func: Function of the dataset; must not mutate it
+
+        Returns:
+            func's result, shared with concurrent and later identical queries
+
+        Raises:
+            LookupError: If the dataset cannot be loaded
+        """
+        index = await self.index()
+        if index is None:
+            raise LookupError(f"Failed to load {self.file_path}")
+
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            self._stats['memo_hits'] += 1
+            return self._memo[key]
+
+        # Only computations on this dataset version are shared; the running
+        # computation keeps the index alive, so its id cannot be reused meanwhile
+        result = await self._coalesced((id(index), key), func, index)
+        # Memoize only if the dataset this result was computed on is still served
+        if index is self._index:
+            self._memo[key] = result
+            if len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return result
+
+    async def _coalesced(self, key: Hashable, func: Callable, *args) -> Any:
+        """Await the in-flight computation of key, starting it if there is none."""
+        future = self._in_flight.get(key)
+        if future is not None:
+            self._stats['coalesced'] += 1
+        else:
+            self._stats['computed'] += 1
+            future = asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shielded so one cancelled client does not cancel the shared computation
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict:
+        """
+        Return query metrics.
+
+        Returns:
+            Dictionary with computed, coalesced and memo hit counters and the
+            number of memoized results
+        """
+        return {**self._stats, 'memoized': len(self._memo)}
+
+    def shutdown(self) -> None:
+        """Stop the executor threads."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
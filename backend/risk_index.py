@@ -0,0 +1,193 @@
+"""Precomputed lookup structures over the risk output for the API."""
+import numpy as np
+import pandas as pd
+from typing import Iterator, List, Optional, Tuple
+
+class RiskIndex:
+    """Read-only risk dataset with ID, risk-ordered and anomaly indexes built once."""
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Build indexes over a risk output DataFrame.
+
+        Args:
+            df: Risk output with beneficiary_id, risk_score and anomaly columns
+        """
+        self.df = df.reset_index(drop=True)
+        ids = self.df['beneficiary_id'].to_numpy()
+
+        # Hash index from beneficiary_id to row; first occurrence wins like a mask lookup
+        positions = pd.Series(np.arange(len(ids)), index=ids)
+        self._positions = positions[~positions.index.duplicated()]
+
+        # Rows by descending risk, ties broken by ascending beneficiary_id
+        risk = self.df['risk_score'].to_numpy(dtype=np.float64)
+        self.order = np.lexsort((ids, -risk))
+        self.sorted_neg_risk = -risk[self.order]
+        self.sorted_ids = ids[self.order]
+
+        # Anomalies in file order, plus the anomaly-only slice of the risk order
+        is_anomaly = self.df['anomaly'].to_numpy() == -1
+        self.anomaly_positions = np.flatnonzero(is_anomaly)
+        keep = is_anomaly[self.order]
+        self._anomaly_view = (
+            self.order[keep], self.sorted_neg_risk[keep], self.sorted_ids[keep]
+        )
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def get(self, beneficiary_id: int) -> Optional[dict]:
+        """
+        Look up one beneficiary in O(1).
+
+        Args:
+            beneficiary_id: Beneficiary ID
+
+        Returns:
+            Row as a dictionary, None if the ID is unknown
+        """
+        position = self._positions.get(beneficiary_id)
+        if position is None:
+            return None
+        return self.df.iloc[position].to_dict()
+
+    def value_counts(self, column: str) -> pd.Series:
+        """Number of rows per distinct value of a column."""
+        return self.df[column].value_counts()
+
+    @property
+    def columns(self) -> List[str]:
+        """Columns of the risk output."""
+        return list(self.df.columns)
+
+    def select(self, columns: List[str]) -> pd.DataFrame:
+        """All rows, only the given columns."""
+        return self.df[columns]
+
+    def count_at_least(self, threshold: float) -> int:
+        """Number of rows with risk_score >= threshold, by binary search."""
+        return int(np.searchsorted(self.sorted_neg_risk, -threshold, side='right'))
+
+    def high_risk(self, threshold: float, limit: int, **filters) -> pd.DataFrame:
+        """
+        Return the highest-risk rows at or above a threshold in O(log n + k).
+
+        Filters are applied to the rows above the threshold, so filtered
+        queries cost O(log n + rows above threshold).
+
+        Args:
+            threshold: Minimum risk score
+            limit: Maximum number of rows
+            **filters: Optional district, scheme, date_from and date_to
+
+        Returns:
+            DataFrame sorted by descending risk_score
+        """
+        filters = {name: value for name, value in filters.items() if value is not None}
+        if not filters:
+            count = min(self.count_at_least(threshold), limit)
+            return self.df.iloc[self.order[:count]]
+
+        rows = self.df.iloc[self.order[:self.count_at_least(threshold)]]
+        keep = np.ones(len(rows), dtype=bool)
+        for name, value in filters.items():
+            column = rows['date'] if name.startswith('date') else rows[name]
+            if name == 'date_from':
+                keep &= (column >= value).to_numpy()
+            elif name == 'date_to':
+                keep &= (column <= value).to_numpy()
+            else:
+                keep &= (column == value).to_numpy()
+        return rows[keep].iloc[:limit]
+
+    def anomalies(self, limit: int, min_risk: Optional[float] = None) -> pd.DataFrame:
+        """
+        Return anomalous rows in file order.
+
+        Args:
+            limit: Maximum number of rows
+            min_risk: Optional minimum risk score
+
+        Returns:
+            DataFrame of anomalies
+        """
+        positions = self.anomaly_positions
+        if min_risk is not None:
+            risk = self.df['risk_score'].to_numpy()[positions]
+            positions = positions[risk >= min_risk]
+        return self.df.iloc[positions[:limit]]
+
+    def page(
+        self,
+        threshold: float,
+        limit: int,
+        after: Optional[Tuple[float, int]] = None,
+        anomalies_only: bool = False
+    ) -> Tuple[pd.DataFrame, Optional[Tuple[float, int]]]:
+        """
+        Return one keyset page of the risk order.
+
+        Pages are keyed on (risk_score, beneficiary_id), so they stay stable
+        and cost O(log n + limit) however deep the caller pages.
+
+        Args:
+            threshold: Minimum risk score
+            limit: Page size
+            after: (risk_score, beneficiary_id) of the last row of the previous page
+            anomalies_only: Page over anomalies only
+
+        Returns:
+            Tuple of (page rows, key of the last row or None if no rows follow)
+        """
+        order, neg_risk, ids = self._view(anomalies_only)
+        start = self._position_after(neg_risk, ids, after)
+        end = int(np.searchsorted(neg_risk, -threshold, side='right'))
+        stop = min(start + limit, end)
+
+        rows = self.df.iloc[order[start:stop]]
+        if stop >= end or stop <= start:
+            return rows, None
+        return rows, (float(-neg_risk[stop - 1]), int(ids[stop - 1]))
+
+    def iter_chunks(
+        self,
+        threshold: float,
+        chunk_size: int,
+        anomalies_only: bool = False
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Yield rows at or above a threshold in risk order, chunk_size at a time.
+
+        Args:
+            threshold: Minimum risk score
+            chunk_size: Rows per chunk
+            anomalies_only: Only yield anomalies
+
+        Yields:
+            DataFrames of at most chunk_size rows
+        """
+        order, neg_risk, _ = self._view(anomalies_only)
+        end = int(np.searchsorted(neg_risk, -threshold, side='right'))
+        for start in range(0, end, chunk_size):
+            yield self.df.iloc[order[start:min(start + chunk_size, end)]]
+
+    def _view(self, anomalies_only: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (row order, negated sorted risk, sorted ids) for all rows or anomalies."""
+        if anomalies_only:
+            return self._anomaly_view
+        return self.order, self.sorted_neg_risk, self.sorted_ids
+
+    @staticmethod
+    def _position_after(
+        neg_risk: np.ndarray,
+        ids: np.ndarray,
+        after: Optional[Tuple[float, int]]
+    ) -> int:
+        """First position strictly after the (risk_score, beneficiary_id) key."""
+        if after is None:
+            return 0
+        risk, beneficiary_id = after
+        lo = int(np.searchsorted(neg_risk, -risk, side='left'))
+        hi = int(np.searchsorted(neg_risk, -risk, side='right'))
+        return lo + int(np.searchsorted(ids[lo:hi], beneficiary_id, side='right'))
@@ -0,0 +1,264 @@
+"""Indexed SQLite risk store serving the API queries at constant memory."""
+import queue
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import pandas as pd
+from config import STORE_POOL_SIZE
+from utils.schemas import RISK_STORE_TABLE
+
+# Descending risk with ascending ID tie-break, the order of RiskIndex
+RISK_ORDER = "ORDER BY risk_score DESC, beneficiary_id"
+
+class ConnectionPool:
+    """Fixed set of read-only connections to one database file, shared across threads."""
+
+    def __init__(self, file_path: Path, size: int = STORE_POOL_SIZE):
+        """
+        Open the pool.
+
+        Args:
+            file_path: Database path
+            size: Number of connections
+        """
+        self._connections: queue.LifoQueue = queue.LifoQueue()
+        for _ in range(size):
+            conn = sqlite3.connect(
+                f"file:{file_path}?mode=ro", uri=True, check_same_thread=False
+            )
+            # Readers of a file that is never modified in place, only replaced
+            conn.execute("PRAGMA query_only=ON")
+            self._connections.put(conn)
+        self.size = size
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection, blocking while all are in use."""
+        conn = self._connections.get()
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
+
+    def close(self) -> None:
+        """Close every connection; the pool must not be used afterwards."""
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+class RiskStore:
+    """Read-only risk dataset queried from SQLite, with the RiskIndex interface.
+
+    Each instance reads one version of the database file. The pipeline
+    replaces the file atomically, and open connections keep reading the
+    version they opened, so a reload only needs a new instance.
+    """
+
+    def __init__(self, file_path: Path, pool_size: int = STORE_POOL_SIZE):
+        """
+        Open a store.
+
+        Args:
+            file_path: Database written by save_sqlite()
+            pool_size: Number of pooled connections
+        """
+        self.file_path = file_path
+        self.pool = ConnectionPool(file_path, pool_size)
+        with self.pool.connection() as conn:
+            self.columns: List[str] = [
+                row[1] for row in conn.execute(f"PRAGMA table_info({RISK_STORE_TABLE})")
+            ]
+            self._len = conn.execute(f"SELECT COUNT(*) FROM {RISK_STORE_TABLE}").fetchone()[0]
+
+    @classmethod
+    def open(cls, file_path: Path) -> Optional["RiskStore"]:
+        """Open a store, None if the file is missing or unreadable; a DatasetCache loader."""
+        if not Path(file_path).exists():
+            return None
+        try:
+            return cls(file_path)
+        except sqlite3.Error:
+            return None
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __del__(self):
+        pool = getattr(self, "pool", None)
+        if pool is not None:
+            pool.close()
+
+    def get(self, beneficiary_id: int) -> Optional[dict]:
+        """
+        Look up one beneficiary by index.
+
+        Args:
+            beneficiary_id: Beneficiary ID
+
+        Returns:
+            Row as a dictionary, None if the ID is unknown
+        """
+        rows = self._query(
+            f"SELECT * FROM {RISK_STORE_TABLE} WHERE beneficiary_id = ? ORDER BY rowid LIMIT 1",
+            (int(beneficiary_id),)
+        )
+        return rows.iloc[0].to_dict() if len(rows) else None
+
+    def count_at_least(self, threshold: float) -> int:
+        """Number of rows with risk_score >= threshold."""
+        with self.pool.connection() as conn:
+            return conn.execute(
+                f"SELECT COUNT(*) FROM {RISK_STORE_TABLE} WHERE risk_score >= ?", (threshold,)
+            ).fetchone()[0]
+
+    def high_risk(self, threshold: float, limit: int, **filters) -> pd.DataFrame:
+        """
+        Return the highest-risk rows at or above a threshold.
+
+        Args:
+            threshold: Minimum risk score
+            limit: Maximum number of rows
+            **filters: Optional district, scheme, date_from and date_to
+
+        Returns:
+            DataFrame sorted by descending risk_score
+        """
+        where, params = _filter_clause(filters)
+        return self._query(
+            f"SELECT * FROM {RISK_STORE_TABLE} WHERE risk_score >= ?{where} {RISK_ORDER} LIMIT ?",
+            (threshold, *params, limit)
+        )
+
+    def anomalies(self, limit: int, min_risk: Optional[float] = None) -> pd.DataFrame:
+        """
+        Return anomalous rows in file order.
+
+        Args:
+            limit: Maximum number of rows
+            min_risk: Optional minimum risk score
+
+        Returns:
+            DataFrame of anomalies
+        """
+        risk_clause = "" if min_risk is None else " AND risk_score >= ?"
+        params = () if min_risk is None else (min_risk,)
+        return self._query(
+            f"SELECT * FROM {RISK_STORE_TABLE} WHERE anomaly = -1{risk_clause} ORDER BY rowid LIMIT ?",
+            (*params, limit)
+        )
+
+    def page(
+        self,
+        threshold: float,
+        limit: int,
+        after: Optional[Tuple[float, int]] = None,
+        anomalies_only: bool = False
+    ) -> Tuple[pd.DataFrame, Optional[Tuple[float, int]]]:
+        """
+        Return one keyset page of the risk order.
+
+        Args:
+            threshold: Minimum risk score
+            limit: Page size
+            after: (risk_score, beneficiary_id) of the last row of the previous page
+            anomalies_only: Page over anomalies only
+
+        Returns:
+            Tuple of (page rows, key of the last row or None if no rows follow)
+        """
+        where, params = self._page_clause(threshold, after, anomalies_only)
+        # One extra row tells whether another page follows
+        rows = self._query(
+            f"SELECT * FROM {RISK_STORE_TABLE} WHERE {where} {RISK_ORDER} LIMIT ?",
+            (*params, limit + 1)
+        )
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows.iloc[:limit]
+        last = rows.iloc[-1]
+        return rows, (float(last["risk_score"]), int(last["beneficiary_id"]))
+
+    def iter_chunks(
+        self,
+        threshold: float,
+        chunk_size: int,
+        anomalies_only: bool = False
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Yield rows at or above a threshold in risk order, chunk_size at a time.
+
+        Each chunk is one keyset page on its own pooled connection, so a slow
+        consumer never holds a connection between chunks.
+
+        Args:
+            threshold: Minimum risk score
+            chunk_size: Rows per chunk
+            anomalies_only: Only yield anomalies
+
+        Yields:
+            DataFrames of at most chunk_size rows
+        """
+        after = None
+        while True:
+            rows, after = self.page(threshold, chunk_size, after, anomalies_only)
+            if len(rows):
+                yield rows
+            if after is None:
+                break
+
+    def value_counts(self, column: str) -> pd.Series:
+        """Number of rows per distinct value of a column."""
+        if column not in self.columns:
+            raise KeyError(column)
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT {column}, COUNT(*) FROM {RISK_STORE_TABLE} GROUP BY {column}"
+            ).fetchall()
+        values, counts = zip(*rows) if rows else ((), ())
+        return pd.Series(counts, index=pd.Index(values, name=column), name="count", dtype="int64")
+
+    def select(self, columns: List[str]) -> pd.DataFrame:
+        """All rows in file order, only the given columns."""
+        unknown = [column for column in columns if column not in self.columns]
+        if unknown:
+            raise KeyError(unknown)
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(columns)} FROM {RISK_STORE_TABLE} ORDER BY rowid"
+            ).fetchall()
+        return pd.DataFrame.from_records(rows, columns=columns)
+
+    def _query(self, sql: str, params: tuple) -> pd.DataFrame:
+        with self.pool.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return pd.DataFrame.from_records(rows, columns=self.columns)
+
+    @staticmethod
+    def _page_clause(
+        threshold: float,
+        after: Optional[Tuple[float, int]],
+        anomalies_only: bool
+    ) -> Tuple[str, tuple]:
+        """WHERE clause and parameters selecting rows after a key in risk order."""
+        where, params = "risk_score >= ?", [threshold]
+        if anomalies_only:
+            where += " AND anomaly = -1"
+        if after is not None:
+            where += " AND (risk_score < ? OR (risk_score = ? AND beneficiary_id > ?))"
+            params += [after[0], after[0], after[1]]
+        return where, tuple(params)
+
+def _filter_clause(filters: Dict[str, Optional[str]]) -> Tuple[str, tuple]:
+    """AND-ed conditions for the optional district, scheme and date filters."""
+    conditions = {
+        "district": "district = ?",
+        "scheme": "scheme = ?",
+        "date_from": "date >= ?",
+        "date_to": "date <= ?",
+    }
+    where, params = "", []
+    for name, value in filters.items():
+        if value is not None:
+            where += f" AND {conditions[name]}"
+            params.append(value)
+    return where, tuple(params)
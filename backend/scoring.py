@@ -0,0 +1,226 @@
+"""Real-time scoring of new enrollments with micro-batching."""
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from config import (
+    ANOMALY_MODEL_PATH, COUNT_FEATURES, DUPLICATE_INDEX, FEATURE_COUNT_MODE, FEATURE_SKETCHES,
+    SCORE_MAX_BATCH, SCORE_MAX_WAIT_MS
+)
+from models import AnomalyDetector, DuplicateDetector, IdentityGraph, RiskScorer
+from utils.logger import setup_logger
+from utils.sketches import FeatureSketches
+
+logger = setup_logger(__name__)
+
+class ScoringService:
+    """Score new records against warm count tables and preloaded models."""
+
+    def __init__(self):
+        self.bank_counts = pd.Series(dtype="int64")
+        self.address_counts = pd.Series(dtype="int64")
+        self.sketches: Optional[FeatureSketches] = None
+        self.detector: Optional[AnomalyDetector] = None
+        self.scorer = RiskScorer()
+        self.duplicates: Optional[DuplicateDetector] = None
+        self.graph = IdentityGraph()
+        self.identifiers: Dict[str, pd.DataFrame] = {}
+        self._source = None
+
+    def refresh(self, index) -> None:
+        """
+        Rebuild count tables and reload models when the served dataset changes.
+
+        Args:
+            index: RiskIndex or RiskStore currently served by the API
+        """
+        if index is self._source:
+            return
+
+        if FEATURE_COUNT_MODE == "sketch":
+            self.sketches = self._load_sketches(index)
+        else:
+            self.bank_counts = index.value_counts("bank_account")
+            self.address_counts = index.value_counts("address")
+        ring_columns = self.graph.attributes + ["ring_id", "ring_size"]
+        self.identifiers = (
+            self.graph.lookup(index.select(ring_columns))
+            if all(column in index.columns for column in ring_columns) else {}
+        )
+        self.detector = AnomalyDetector.load(ANOMALY_MODEL_PATH)
+        self.duplicates = (
+            DuplicateDetector.load(DUPLICATE_INDEX) if DUPLICATE_INDEX.exists() else None
+        )
+        self._source = index
+        tables = (
+            f"sketches of {self.sketches.records} records" if self.sketches is not None
+            else f"{len(self.bank_counts)} bank accounts, {len(self.address_counts)} addresses"
+        )
+        logger.info(
+            f"Scoring tables refreshed: {tables}, "
+            f"model={'loaded' if self.detector else 'missing'}, "
+            f"duplicate index={'loaded' if self.duplicates else 'missing'}"
+        )
+
+    @staticmethod
+    def _load_sketches(index) -> FeatureSketches:
+        """Sketches saved by the pipeline for this dataset, else built from it."""
+        sketches = FeatureSketches.load(FEATURE_SKETCHES) if FEATURE_SKETCHES.exists() else None
+        if sketches is None or sketches.records != len(index):
+            logger.info("No matching feature sketches saved, building them from the served dataset")
+            columns = list(COUNT_FEATURES.values()) + ["district"]
+            sketches = FeatureSketches().add(index.select(columns))
+        return sketches
+
+    def score(self, df: pd.DataFrame, requests: Optional[np.ndarray] = None) -> List[dict]:
+        """
+        Score a batch of new records in one vectorized pass.
+
+        Group counts and fraud rings include the existing dataset and the
+        other records of the same request, matching how preprocessing counts
+        and links a full file. Records of different requests sharing a
+        micro-batch never count or link against each other.
+
+        Args:
+            df: New beneficiary records
+            requests: Request number of each record; None if all records
+                belong to one request
+
+        Returns:
+            One result dictionary per record, in input order
+        """
+        if self.detector is None:
+            raise RuntimeError("Anomaly model is not available; run the pipeline first")
+
+        df = df.reset_index(drop=True)
+        if requests is None:
+            requests = np.zeros(len(df), dtype=np.int64)
+        if self.sketches is not None:
+            existing = self.sketches.annotate(df[list(COUNT_FEATURES.values())].copy())
+        else:
+            existing = pd.DataFrame({
+                "same_bank_count": df["bank_account"].map(self.bank_counts),
+                "same_address_count": df["address"].map(self.address_counts),
+            })
+        for feature, column in COUNT_FEATURES.items():
+            df[feature] = (
+                existing[feature].fillna(0).astype("int64")
+                + df.groupby([requests, df[column]])[column].transform("count")
+            )
+        df = pd.concat([
+            self.graph.extend(part.copy(), self.identifiers)
+            for _, part in df.groupby(requests, sort=False)
+        ]).sort_index()
+        df = self.detector.predict(df)
+        df = self.scorer.calculate_risk(df)
+
+        candidates: Dict[int, List[dict]] = {}
+        if self.duplicates is not None:
+            for new_id, other_id, similarity in self.duplicates.query(df):
+                candidates.setdefault(new_id, []).append(
+                    {"beneficiary_id": other_id, "similarity": similarity}
+                )
+
+        columns = [
+            "beneficiary_id", "anomaly", "anomaly_score", "risk_score",
+            "same_bank_count", "same_address_count", "ring_size", "shared_links"
+        ]
+        results = df[columns].to_dict(orient="records")
+        for result in results:
+            result["duplicate_candidates"] = candidates.get(result["beneficiary_id"], [])
+        return results
+
+class MicroBatcher:
+    """Coalesce concurrent scoring requests into one vectorized batch."""
+
+    def __init__(
+        self,
+        service: ScoringService,
+        max_batch: int = SCORE_MAX_BATCH,
+        max_wait_ms: float = SCORE_MAX_WAIT_MS
+    ):
+        """
+        Initialize micro-batcher.
+
+        Args:
+            service: Scoring service running the batches
+            max_batch: Maximum records per batch
+            max_wait_ms: Longest a request waits for others to join its batch
+        """
+        self.service = service
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the batching loop on the running event loop."""
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the batching loop."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, records: List[dict]) -> List[dict]:
+        """
+        Score records as part of the next batch.
+
+        Args:
+            records: New beneficiary records
+
+        Returns:
+            Results for these records, in order
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((records, future))
+        return await future
+
+    async def _run(self) -> None:
+        """Collect requests until the batch is full or max_wait elapses, then score."""
+        loop = asyncio.get_running_loop()
+        while True:
+            pending: List[Tuple[List[dict], asyncio.Future]] = [await self._queue.get()]
+            size = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            records = [record for batch, _ in pending for record in batch]
+            requests = np.repeat(np.arange(len(pending)), [len(batch) for batch, _ in pending])
+            started = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(
+                    None, self.service.score, pd.DataFrame(records), requests
+                )
+            except Exception as e:
+                logger.error("Error scoring batch of %d records: %s", len(records), e)
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            logger.debug(
+                "Scored %d records from %d requests in %.1f ms",
+                len(records), len(pending), (time.perf_counter() - started) * 1000
+            )
+            offset = 0
+            for batch, future in pending:
+                if not future.done():
+                    future.set_result(results[offset:offset + len(batch)])
+                offset += len(batch)
@@ -0,0 +1,95 @@
+"""Benchmark incremental pipeline updates against full recomputes and check they agree.
+
+Usage: python benchmarks/bench_incremental.py [n_rows] [changed_fraction ...]
+       (default: 100000 0.001 0.01 0.1)
+"""
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+from config import ANOMALY_FEATURES
+from models import AnomalyDetector, RiskScorer
+from notebooks.incremental import RAW_COLUMNS, apply_incremental, build_state
+from notebooks.preprocess import build_features
+
+def make_raw_frame(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Build synthetic raw records where names, accounts and addresses repeat."""
+    rng = np.random.default_rng(seed)
+    people = rng.integers(0, n_rows // 3, n_rows)
+    return pd.DataFrame({
+        'beneficiary_id': np.arange(n_rows),
+        'name': pd.Series(people).map('Person {} Kumar'.format),
+        'phone': pd.Series(rng.integers(6 * 10**9, 10**10, n_rows)).astype(str),
+        'address': pd.Series(rng.integers(0, n_rows // 2, n_rows)).map('{} Station Road'.format),
+        'bank_account': people * 7 + rng.integers(0, 2, n_rows),
+        'scheme': rng.choice(['Food Subsidy', 'Farmer Aid', 'Scholarship'], n_rows),
+        'amount': rng.choice([2000, 5000, 10000, 50000], n_rows, p=[.4, .3, .29, .01]),
+        'district': rng.choice([f'District {i}' for i in range(700)], n_rows),
+        'date': '2024-01-01',
+    })
+
+def mutate(raw: pd.DataFrame, fraction: float, seed: int = 7) -> pd.DataFrame:
+    """Change, remove and add roughly fraction of the records, a third each."""
+    rng = np.random.default_rng(seed)
+    n_delta = max(3, int(len(raw) * fraction))
+    picked = rng.choice(len(raw), n_delta, replace=False)
+    changed, removed = picked[: n_delta // 3], picked[n_delta // 3: 2 * n_delta // 3]
+
+    new = raw.copy()
+    new.loc[changed, 'bank_account'] = raw['bank_account'].sample(len(changed), random_state=1).to_numpy()
+    new.loc[changed, 'amount'] = 50000
+    new = new.drop(index=removed)
+
+    added = raw.sample(n_delta - 2 * (n_delta // 3), random_state=2).copy()
+    added['beneficiary_id'] = np.arange(len(raw), len(raw) + len(added))
+    return pd.concat([new, added], ignore_index=True)[RAW_COLUMNS]
+
+def full_run(raw: pd.DataFrame, detector: AnomalyDetector) -> pd.DataFrame:
+    """Recompute everything with a fixed model."""
+    df = build_features(raw.copy())
+    return RiskScorer().calculate_risk(detector.predict(df))
+
+def same_output(full: pd.DataFrame, incremental: pd.DataFrame) -> bool:
+    """Compare outputs; cluster and ring labels only need to describe the same partition."""
+    labels = [c for c in ('cluster_id', 'ring_id') if c in full.columns]
+    columns = [c for c in full.columns if c not in labels]
+    values_match = full[columns].reset_index(drop=True).equals(incremental[columns])
+    partition_match = all(
+        np.array_equal(pd.factorize(full[c])[0], pd.factorize(incremental[c])[0]) for c in labels
+    )
+    return values_match and partition_match
+
+def timed(func):
+    """Return (result, wall seconds)."""
+    started = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - started
+
+def run(n_rows: int, fractions) -> None:
+    """Print full vs incremental timings per change fraction."""
+    raw = make_raw_frame(n_rows)
+    detector = AnomalyDetector().fit(build_features(raw.copy()), ANOMALY_FEATURES)
+    previous = full_run(raw, detector)
+    state = build_state(previous, 'baseline')
+
+    print(f"\n{n_rows:,} rows")
+    print(f"{'changed':>9}{'delta rows':>12}{'full s':>10}{'incr s':>10}{'speedup':>9}  match")
+    for fraction in fractions:
+        new_raw = mutate(raw, fraction)
+        full, full_s = timed(lambda: full_run(new_raw, detector))
+        (incremental, _), incr_s = timed(
+            lambda: apply_incremental(new_raw, previous, state, detector, 'updated')
+        )
+        delta = max(3, int(n_rows * fraction))
+        print(
+            f"{fraction:>9.2%}{delta:>12,}{full_s:>10.2f}{incr_s:>10.2f}"
+            f"{full_s / incr_s:>8.1f}x  {same_output(full, incremental)}"
+        )
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    fractions = [float(arg) for arg in sys.argv[2:]] or [0.001, 0.01, 0.1]
+    run(size, fractions)
@@ -0,0 +1,55 @@
+"""Report in-memory bytes per row of a processed artifact before and after optimize_dtypes.
+
+Columns are shown as object strings (pandas < 3 default), as loaded without
+optimization and as loaded with it.
+
+Usage: python benchmarks/bench_memory.py [n_rows]   (default: 1000000)
+"""
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pandas as pd
+from bench_storage import make_processed_frame
+from utils.data_loader import load_csv, save_csv
+
+def bytes_per_row(df: pd.DataFrame) -> pd.Series:
+    """Deep memory usage per column divided by the row count."""
+    return df.memory_usage(deep=True, index=False) / max(len(df), 1)
+
+def run(n_rows: int) -> None:
+    """Print the per-column memory report for one dataset size."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "processed.csv"
+        save_csv(make_processed_frame(n_rows), path)
+        default = load_csv(path, optimize=False)
+        optimized = load_csv(path)
+
+    as_object = default.astype({
+        column: object for column in default.columns
+        if pd.api.types.is_string_dtype(default[column])
+    })
+    report = pd.DataFrame({
+        'object': bytes_per_row(as_object),
+        'default': bytes_per_row(default),
+        'optimized': bytes_per_row(optimized),
+        'dtype': optimized.dtypes.astype(str),
+    })
+
+    print(f"\n{n_rows:,} rows, bytes per row")
+    print(f"{'column':<20}{'object':>10}{'default':>10}{'optimized':>11}  dtype")
+    for column, row in report.iterrows():
+        print(
+            f"{column:<20}{row['object']:>10.1f}{row['default']:>10.1f}"
+            f"{row['optimized']:>11.1f}  {row['dtype']}"
+        )
+    totals = report[['object', 'default', 'optimized']].sum()
+    print(
+        f"{'total':<20}{totals['object']:>10.1f}{totals['default']:>10.1f}"
+        f"{totals['optimized']:>11.1f}  "
+        f"({totals['object'] / totals['optimized']:.1f}x smaller than object)"
+    )
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,63 @@
+"""Benchmark RiskIndex lookups against the previous per-request pandas scans.
+
+Usage: python benchmarks/bench_risk_index.py [n_rows ...]   (default: 10k 1M 10M)
+"""
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+from backend.risk_index import RiskIndex
+
+def make_risk_frame(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Build a synthetic risk output with the columns the API reads."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'beneficiary_id': rng.permutation(n_rows),
+        'name': 'Beneficiary',
+        'amount': rng.choice([2000, 5000, 10000], n_rows),
+        'anomaly': np.where(rng.random(n_rows) < 0.05, -1, 1),
+        'risk_score': rng.integers(4, 30, n_rows),
+    })
+
+def best_of(func, repeat: int = 5) -> float:
+    """Best wall time of func in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+def run(n_rows: int) -> None:
+    """Print scan vs index timings for one dataset size."""
+    df = make_risk_frame(n_rows)
+    target = int(df['beneficiary_id'].iloc[n_rows // 2])
+
+    started = time.perf_counter()
+    index = RiskIndex(df)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    rows = [
+        ('lookup',
+         best_of(lambda: df[df['beneficiary_id'] == target].iloc[0].to_dict()),
+         best_of(lambda: index.get(target))),
+        ('top-100 >= 20',
+         best_of(lambda: df[df['risk_score'] >= 20].sort_values('risk_score', ascending=False).head(100)),
+         best_of(lambda: index.high_risk(20, 100))),
+        ('anomalies 100',
+         best_of(lambda: df[df['anomaly'] == -1].head(100)),
+         best_of(lambda: index.anomalies(100))),
+    ]
+
+    print(f"\n{n_rows:,} rows (index build {build_ms:.1f} ms)")
+    print(f"{'query':<16}{'scan ms':>12}{'index ms':>12}{'speedup':>10}")
+    for name, scan_ms, index_ms in rows:
+        print(f"{name:<16}{scan_ms:>12.3f}{index_ms:>12.3f}{scan_ms / index_ms:>9.0f}x")
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 1_000_000, 10_000_000]
+    for size in sizes:
+        run(size)
@@ -0,0 +1,87 @@
+"""Report the accuracy/memory tradeoff of sketched group counts against exact groupby counts.
+
+For each Count-Min error bound, same_bank_count and same_address_count are
+estimated on generated data and compared with the exact group counts, overall
+and on records whose key has at most SMALL_COUNT holders; for each
+HyperLogLog error target, distinct accounts and addresses per district are
+compared with nunique. Memory is the size of the sketch tables versus the deep
+size of the exact count tables.
+
+Usage: python benchmarks/bench_sketches.py [n_rows]   (default: 1000000)
+"""
+import os
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import numpy as np
+import pandas as pd
+from config import COUNT_FEATURES
+from notebooks.data_generator import iter_beneficiaries
+from utils.sketches import DISTINCT_GROUP, FeatureSketches
+
+EPSILONS = [1e-4, 3e-5, 1e-5, 3e-6, 1e-6]
+HLL_ERRORS = [0.04, 0.02, 0.01, 0.005]
+# Counts the risk features tell apart; errors on these keys matter most
+SMALL_COUNT = 4
+
+def exact_counts(df: pd.DataFrame):
+    """Exact group counts per record, count table memory in MB and seconds."""
+    started = time.perf_counter()
+    tables = {column: df[column].value_counts() for column in COUNT_FEATURES.values()}
+    counts = pd.DataFrame({
+        feature: df[column].map(tables[column]) for feature, column in COUNT_FEATURES.items()
+    })
+    elapsed = time.perf_counter() - started
+    megabytes = sum(t.memory_usage(deep=True) for t in tables.values()) / 2**20
+    return counts, megabytes, elapsed
+
+def count_errors(df: pd.DataFrame, exact: pd.DataFrame) -> None:
+    """Print Count-Min memory and overcount statistics per error bound."""
+    print(f"{'epsilon':>9}{'width':>10}{'MB':>8}{'seconds':>9}  "
+          f"{'feature':<20}{'exact %':>9}{'mean err':>10}{'p99 err':>9}{'max err':>9}"
+          f"{'small exact %':>15}{'small p99':>11}{'small max':>11}")
+    for epsilon in EPSILONS:
+        started = time.perf_counter()
+        sketches = FeatureSketches(epsilon=epsilon).add(df)
+        estimated = sketches.annotate(df[list(COUNT_FEATURES.values())].copy())
+        elapsed = time.perf_counter() - started
+        megabytes = sum(s.nbytes for s in sketches.counts.values()) / 2**20
+        width = next(iter(sketches.counts.values())).width
+        for feature in COUNT_FEATURES:
+            error = (estimated[feature] - exact[feature]).dropna()
+            small = error[exact[feature] <= SMALL_COUNT].to_numpy()
+            error = error.to_numpy()
+            print(f"{epsilon:>9.0e}{width:>10,}{megabytes:>8.1f}{elapsed:>9.2f}  "
+                  f"{feature:<20}{(error == 0).mean() * 100:>9.3f}{error.mean():>10.4f}"
+                  f"{np.percentile(error, 99):>9.0f}{error.max():>9.0f}"
+                  f"{(small == 0).mean() * 100:>15.3f}{np.percentile(small, 99):>11.0f}{small.max():>11.0f}")
+
+def distinct_errors(df: pd.DataFrame) -> None:
+    """Print HyperLogLog memory and relative error of distinct counts per district."""
+    exact = df.groupby(DISTINCT_GROUP)[list(COUNT_FEATURES.values())].nunique()
+    print(f"{'hll error':>9}{'registers':>10}{'MB':>8}  "
+          f"{'column':<20}{'median %':>9}{'p95 %':>9}{'max %':>9}")
+    for hll_error in HLL_ERRORS:
+        sketches = FeatureSketches(epsilon=1e-3, hll_error=hll_error).add(df)
+        estimated = sketches.distinct_counts().reindex(exact.index)
+        megabytes = sum(s.nbytes for s in sketches.distinct.values()) / 2**20
+        registers = 2 ** next(iter(sketches.distinct.values())).precision
+        for column in exact.columns:
+            relative = ((estimated[column] - exact[column]).abs() / exact[column]).to_numpy() * 100
+            print(f"{hll_error:>9.3f}{registers:>10,}{megabytes:>8.1f}  {column:<20}"
+                  f"{np.median(relative):>9.2f}{np.percentile(relative, 95):>9.2f}{relative.max():>9.2f}")
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = pd.concat(iter_beneficiaries(n_rows), ignore_index=True)
+
+    exact, exact_mb, exact_seconds = exact_counts(df)
+    print(f"\n{n_rows:,} rows, {df['district'].nunique()} districts")
+    print(f"exact: {df['bank_account'].nunique():,} accounts, {df['address'].nunique():,} addresses, "
+          f"count tables {exact_mb:.1f} MB, {exact_seconds:.2f} s\n")
+    count_errors(df, exact)
+    print()
+    distinct_errors(df)
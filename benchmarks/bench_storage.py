@@ -0,0 +1,92 @@
+"""Benchmark CSV vs Parquet artifact loads: wall time and peak RSS.
+
+Each load runs in a fresh process so peak RSS reflects that load alone.
+
+Usage: python benchmarks/bench_storage.py [n_rows]   (default: 1000000)
+"""
+import resource
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+from utils.data_loader import load_data, save_data
+
+def make_processed_frame(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Build a synthetic processed artifact with realistic column types."""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(n_rows)
+    return pd.DataFrame({
+        'beneficiary_id': ids,
+        'name': pd.Series(ids % 50_000).map('Beneficiary {}'.format),
+        'phone': pd.Series(rng.integers(10**9, 10**10, n_rows)).astype(str),
+        'address': pd.Series(ids % 80_000).map('{} Main Road'.format),
+        'bank_account': rng.integers(10_000_000, 99_999_999, n_rows),
+        'scheme': rng.choice(['Food Subsidy', 'Farmer Aid', 'Scholarship'], n_rows),
+        'amount': rng.choice([2000, 5000, 10000], n_rows),
+        'district': rng.choice([f'District {i}' for i in range(700)], n_rows),
+        'date': '2024-01-01',
+        'same_bank_count': rng.integers(1, 4, n_rows),
+        'same_address_count': rng.integers(1, 4, n_rows),
+    })
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    try:
+        # VmHWM resets on exec, unlike ru_maxrss which inherits the parent's peak
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _measure(path, columns, filters, queue):
+    """Child process: load once and report seconds, rows and peak RSS growth in MB."""
+    import pyarrow.parquet  # noqa: F401  keep library import out of the measurement
+
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    df = load_data(path, columns=columns, filters=filters)
+    elapsed = time.perf_counter() - started
+    queue.put((elapsed, len(df), _peak_rss_mb() - baseline))
+
+def measure(path, columns=None, filters=None):
+    """Run one load in a fresh process."""
+    context = get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(path, columns, filters, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    features = ['amount', 'same_bank_count', 'same_address_count']
+    cases = [
+        ('full', None, None),
+        ('3 columns', features, None),
+        ('3 columns, amount > 5000', features, [('amount', '>', 5000)]),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        df = make_processed_frame(n_rows)
+        paths = {fmt: Path(tmp) / f'processed.{fmt}' for fmt in ('csv', 'parquet')}
+        for path in paths.values():
+            save_data(df, path)
+        del df
+
+        print(f"\n{n_rows:,} rows")
+        for fmt, path in paths.items():
+            print(f"{fmt}: {path.stat().st_size / 2**20:.1f} MB on disk")
+        print(f"{'case':<28}{'format':<10}{'seconds':>10}{'rows':>12}{'load RSS MB':>14}")
+        for name, columns, filters in cases:
+            for fmt, path in paths.items():
+                seconds, rows, rss = measure(path, columns, filters)
+                print(f"{name:<28}{fmt:<10}{seconds:>10.3f}{rows:>12,}{rss:>14.0f}")
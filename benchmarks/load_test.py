@@ -0,0 +1,176 @@
+"""Load test the API with concurrent clients and report throughput and latency.
+
+Each client keeps one HTTP/1.1 connection open and speaks the protocol
+directly over asyncio streams; a full HTTP client library costs more CPU
+per request than the endpoints themselves and would cap the measurement.
+
+Without --url a scratch dataset is generated, the pipeline is run on it and
+one uvicorn worker is started against it, so results are per worker.
+The request mix repeats a few popular list queries, as dashboards do, and
+looks up random beneficiaries.
+
+Usage: python benchmarks/load_test.py [--rows 100000] [--requests 5000]
+       [--concurrency 64] [--url http://host:port]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from urllib.parse import urlsplit
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import numpy as np
+from notebooks.data_generator import write_beneficiaries
+
+ROOT = Path(__file__).parent.parent
+
+# (label, path) of the repeated list queries, issued round-robin
+LIST_QUERIES = [
+    ('risk', '/risk?threshold=5&limit=100'),
+    ('anomalies', '/anomalies?limit=100'),
+    ('page', '/risk/page?limit=100'),
+    ('risk', '/risk?threshold=8&limit=500'),
+]
+# Fraction of requests that are single-beneficiary lookups
+LOOKUP_SHARE = 0.25
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with code {process.returncode}')
+        try:
+            with urllib.request.urlopen(url + '/', timeout=1):
+                return
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('server did not start in time')
+
+def requests_plan(n: int, rows: int, seed: int = 0) -> list:
+    """(label, path) of every request in issue order."""
+    rng = np.random.default_rng(seed)
+    plan = []
+    for i in range(n):
+        if rng.random() < LOOKUP_SHARE:
+            plan.append(('lookup', f'/beneficiary/{int(rng.integers(0, rows))}'))
+        else:
+            plan.append(LIST_QUERIES[i % len(LIST_QUERIES)])
+    return plan
+
+async def _get(reader, writer, host: str, path: str) -> int:
+    """Send one keep-alive GET and read the full response; returns the status."""
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode())
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    headers = dict(line.split(':', 1) for line in lines[1:] if ':' in line)
+    headers = {name.strip().lower(): value.strip() for name, value in headers.items()}
+    if 'content-length' not in headers:
+        raise ValueError(f'{path}: responses without Content-Length are not supported')
+    await reader.readexactly(int(headers['content-length']))
+    return int(lines[0].split()[1])
+
+async def _drive(url: str, plan: list, concurrency: int) -> tuple:
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    latencies = {label: [] for label, _ in plan}
+    errors = 0
+    position = 0
+
+    async def client():
+        nonlocal position, errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while position < len(plan):
+                label, path = plan[position]
+                position += 1
+                started = time.perf_counter()
+                try:
+                    status = await _get(reader, writer, parts.netloc, path)
+                except (OSError, ValueError, asyncio.IncompleteReadError):
+                    errors += 1
+                    # The connection is in an unknown state; start a new one
+                    writer.close()
+                    reader, writer = await asyncio.open_connection(host, port)
+                    continue
+                # 404 is a valid answer for an unknown beneficiary
+                if status not in (200, 404):
+                    errors += 1
+                    continue
+                latencies[label].append(time.perf_counter() - started)
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - started, latencies, errors
+
+def report(elapsed: float, latencies: dict, errors: int) -> float:
+    """Print throughput and latency percentiles; returns requests per second."""
+    total = sum(len(values) for values in latencies.values())
+    throughput = total / elapsed
+    print(f"{total:,} requests in {elapsed:.2f}s: {throughput:,.0f} req/s, {errors} errors")
+    print(f"{'endpoint':<12}{'requests':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for label, values in latencies.items():
+        if not values:
+            continue
+        p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+        print(f"{label:<12}{len(values):>10,}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}")
+    return throughput
+
+def run(url: str, rows: int, n_requests: int, concurrency: int) -> float:
+    """Warm the server up, then issue the request plan."""
+    asyncio.run(_drive(url, requests_plan(concurrency * 2, rows, seed=1), concurrency))
+    return report(*asyncio.run(_drive(url, requests_plan(n_requests, rows), concurrency)))
+
+def run_local(rows: int, n_requests: int, concurrency: int) -> float:
+    """Generate data, run the pipeline and load test one local uvicorn worker."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, 'DATA_DIR': tmp}
+        write_beneficiaries(Path(tmp) / 'raw' / 'beneficiaries.csv', rows)
+        subprocess.run([sys.executable, 'pipeline.py'], cwd=ROOT, env=env, check=True)
+
+        port = _free_port()
+        server = subprocess.Popen(
+            [
+                sys.executable, '-m', 'uvicorn', 'backend.app:app',
+                '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning',
+                '--no-access-log'
+            ],
+            cwd=ROOT, env=env
+        )
+        try:
+            url = f'http://127.0.0.1:{port}'
+            _wait_ready(url, server)
+            print(f"{rows:,} rows, 1 worker, concurrency {concurrency}")
+            return run(url, rows, n_requests, concurrency)
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--url', help='load test a running server instead of a local one')
+    args = parser.parse_args()
+
+    if args.url:
+        run(args.url.rstrip('/'), args.rows, args.requests, args.concurrency)
+    else:
+        run_local(args.rows, args.requests, args.concurrency)
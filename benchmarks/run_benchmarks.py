@@ -0,0 +1,229 @@
+"""Benchmark every pipeline stage and the API on generated data and track regressions.
+
+Each (stage, size) runs in a fresh process against a scratch DATA_DIR, so peak
+RSS reflects that stage alone. Results are appended to a JSON-lines history
+and compared with the previous run of the same stage and size.
+
+Usage: python benchmarks/run_benchmarks.py [--rows 10000 100000] [--stages ...]
+       [--history PATH] [--tolerance 0.2] [--fail-on-regression]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from bench_storage import _peak_rss_mb
+from notebooks.data_generator import write_beneficiaries
+
+STAGES = ['preprocess', 'duplicates', 'graph', 'anomaly', 'risk', 'api']
+# Stage whose output a stage reads; run unmeasured when only later stages are selected
+PREREQUISITE = {'anomaly': 'preprocess', 'risk': 'anomaly', 'api': 'risk'}
+DEFAULT_HISTORY = Path(__file__).parent / 'results' / 'history.jsonl'
+
+# Requests issued by the API benchmark
+API_REQUESTS = 500
+
+def _stage_preprocess():
+    from config import BENEFICIARIES_RAW, PROCESSED_DATA
+    from notebooks.preprocess import build_features
+    from utils.data_loader import load_csv, save_data
+
+    df = load_csv(BENEFICIARIES_RAW)
+    started = time.perf_counter()
+    df = build_features(df)
+    elapsed = time.perf_counter() - started
+    save_data(df, PROCESSED_DATA)
+    return len(df), elapsed
+
+def _stage_duplicates():
+    from config import BENEFICIARIES_RAW
+    from models import DuplicateDetector
+    from utils.data_loader import load_csv
+
+    df = load_csv(
+        BENEFICIARIES_RAW, columns=['beneficiary_id', 'name', 'phone', 'bank_account', 'address']
+    )
+    started = time.perf_counter()
+    DuplicateDetector().find_duplicates(df)
+    return len(df), time.perf_counter() - started
+
+def _stage_graph():
+    from config import BENEFICIARIES_RAW, GRAPH_ATTRIBUTES
+    from models import IdentityGraph
+    from utils.data_loader import load_csv
+
+    df = load_csv(BENEFICIARIES_RAW, columns=GRAPH_ATTRIBUTES)
+    started = time.perf_counter()
+    IdentityGraph().link(df)
+    return len(df), time.perf_counter() - started
+
+def _stage_anomaly():
+    from config import ANOMALY_FEATURES, ANOMALY_MODEL_PATH, ANOMALY_OUTPUT, PROCESSED_DATA
+    from models import AnomalyDetector
+    from utils.data_loader import load_data, save_data
+
+    df = load_data(PROCESSED_DATA)
+    detector = AnomalyDetector()
+    started = time.perf_counter()
+    df = detector.detect(df, ANOMALY_FEATURES)
+    elapsed = time.perf_counter() - started
+    save_data(df, ANOMALY_OUTPUT)
+    detector.save(ANOMALY_MODEL_PATH)
+    return len(df), elapsed
+
+def _stage_risk():
+    from config import ANOMALY_OUTPUT, RISK_OUTPUT
+    from models import RiskScorer
+    from utils.data_loader import load_data, save_data
+
+    df = load_data(ANOMALY_OUTPUT)
+    started = time.perf_counter()
+    df = RiskScorer().calculate_risk(df)
+    elapsed = time.perf_counter() - started
+    save_data(df, RISK_OUTPUT)
+    return len(df), elapsed
+
+def _stage_api():
+    from fastapi.testclient import TestClient
+    from backend.app import app
+
+    paths = ['/risk?threshold=5&limit=100', '/risk/page?limit=100', '/anomalies?limit=100']
+    with TestClient(app) as client:
+        client.get(paths[0]).raise_for_status()
+        started = time.perf_counter()
+        for i in range(API_REQUESTS):
+            path = paths[i % len(paths)] if i % 4 else f'/beneficiary/{i * 7919 % 1000}'
+            client.get(path).raise_for_status()
+        return API_REQUESTS, time.perf_counter() - started
+
+def _measure(stage, queue):
+    """Child process: run one stage and report rows, seconds and peak RSS."""
+    try:
+        rows, seconds = globals()[f'_stage_{stage}']()
+        queue.put({'rows': rows, 'seconds': seconds, 'peak_rss_mb': _peak_rss_mb()})
+    except Exception as e:
+        queue.put({'error': f'{type(e).__name__}: {e}'})
+
+def measure(stage: str) -> dict:
+    """Run one stage in a fresh process."""
+    context = get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(stage, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def git_revision() -> str:
+    """Short commit hash, suffixed with +dirty when the tree has local changes."""
+    try:
+        root = Path(__file__).parent.parent
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=root,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+            capture_output=True, text=True
+        ).stdout.strip()
+        return commit + ('+dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def load_history(path: Path) -> list:
+    """Previous results, oldest first."""
+    if not path.exists():
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def previous_result(history: list, stage: str, rows: int):
+    """Most recent earlier result of the same stage and size."""
+    for record in reversed(history):
+        if record['stage'] == stage and record['size'] == rows and 'throughput' in record:
+            return record
+    return None
+
+def run(sizes, stages, history_path: Path, tolerance: float) -> bool:
+    """Run the suite; returns False if any stage regressed beyond tolerance."""
+    history = load_history(history_path)
+    revision = git_revision()
+    context = {
+        'revision': revision,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+    }
+    records, healthy = [], True
+
+    print(f"revision {revision}, {context['cpus']} CPUs")
+    print(f"{'stage':<12}{'rows':>12}{'seconds':>10}{'throughput/s':>14}{'peak MB':>10}  vs previous")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ['DATA_DIR'] = tmp
+            write_beneficiaries(Path(tmp) / 'raw' / 'beneficiaries.csv', size)
+
+            needed = set(stages)
+            for stage in reversed(STAGES):
+                if stage in needed and stage in PREREQUISITE:
+                    needed.add(PREREQUISITE[stage])
+
+            for stage in [s for s in STAGES if s in needed]:
+                result = measure(stage)
+                if stage not in stages:
+                    continue
+                if 'error' in result:
+                    print(f"{stage:<12}{size:>12,}  failed: {result['error']}")
+                    continue
+
+                throughput = result['rows'] / result['seconds'] if result['seconds'] else float('inf')
+                record = {
+                    **context, 'stage': stage, 'size': size, 'rows': result['rows'],
+                    'seconds': round(result['seconds'], 4), 'throughput': round(throughput, 1),
+                    'peak_rss_mb': round(result['peak_rss_mb'], 1),
+                }
+                previous = previous_result(history, stage, size)
+                comparison = ''
+                if previous is not None:
+                    change = throughput / previous['throughput'] - 1
+                    regressed = change < -tolerance
+                    healthy &= not regressed
+                    comparison = (
+                        f"{change:+.1%} vs {previous['revision']}"
+                        + ('  REGRESSION' if regressed else '')
+                    )
+                print(
+                    f"{stage:<12}{size:>12,}{result['seconds']:>10.3f}{throughput:>14,.0f}"
+                    f"{result['peak_rss_mb']:>10.1f}  {comparison}"
+                )
+                records.append(record)
+
+    history_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(history_path, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+    print(f"Appended {len(records)} results to {history_path}")
+    return healthy
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--history', type=Path, default=DEFAULT_HISTORY)
+    parser.add_argument(
+        '--tolerance', type=float, default=0.2,
+        help='flag a regression when throughput drops by more than this fraction'
+    )
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    healthy = run(args.rows, args.stages, args.history, args.tolerance)
+    sys.exit(0 if healthy or not args.fail_on_regression else 1)
@@ -4,30 +4,155 @@ from pathlib import Path
 
 # Base paths
 BASE_DIR = Path(__file__).parent
-DATA_DIR = BASE_DIR / "data"
+# DATA_DIR can point elsewhere, e.g. at a scratch copy for benchmarks
+DATA_DIR = Path(os.getenv("DATA_DIR", str(BASE_DIR / "data")))
 RAW_DATA_DIR = DATA_DIR / "raw"
 PROCESSED_DATA_DIR = DATA_DIR / "processed"
+# Versioned lookup tables shipped with the repo
+REFERENCE_DATA_DIR = BASE_DIR / "data" / "reference"
+
+# Storage format of pipeline artifacts: "csv" or "parquet" (typed, columnar).
+# Raw ingestion files stay CSV.
+ARTIFACT_FORMAT = os.getenv("ARTIFACT_FORMAT", "csv")
 
 # File paths
 BENEFICIARIES_RAW = RAW_DATA_DIR / "beneficiaries.csv"
-PROCESSED_DATA = PROCESSED_DATA_DIR / "processed.csv"
-ANOMALY_OUTPUT = PROCESSED_DATA_DIR / "anomaly_output.csv"
-RISK_OUTPUT = PROCESSED_DATA_DIR / "risk_output.csv"
+DISTRICTS_REFERENCE = REFERENCE_DATA_DIR / "districts.csv"
+PROCESSED_DATA = PROCESSED_DATA_DIR / f"processed.{ARTIFACT_FORMAT}"
+ANOMALY_OUTPUT = PROCESSED_DATA_DIR / f"anomaly_output.{ARTIFACT_FORMAT}"
+RISK_OUTPUT = PROCESSED_DATA_DIR / f"risk_output.{ARTIFACT_FORMAT}"
+DUPLICATE_INDEX = PROCESSED_DATA_DIR / "duplicate_index.pkl"
+# Rewritten after every successful pipeline run so readers can detect new outputs
+PIPELINE_VERSION_FILE = PROCESSED_DATA_DIR / "pipeline.version"
+# Content-addressed stage outputs reused when inputs and parameters are unchanged
+PIPELINE_CACHE_DIR = PROCESSED_DATA_DIR / ".cache"
+# Row hashes, group counts and entity keys of the last run, read by incremental runs
+PIPELINE_STATE = PROCESSED_DATA_DIR / "pipeline_state.pkl"
+# District x scheme x month rollups of the risk output, served by /aggregates
+AGGREGATES_OUTPUT = PROCESSED_DATA_DIR / f"aggregates.{ARTIFACT_FORMAT}"
+
+# Pipeline: write processed/anomaly artifacts too, and reuse cached stage outputs
+PIPELINE_PERSIST_INTERMEDIATE = os.getenv("PIPELINE_PERSIST_INTERMEDIATE", "false").lower() == "true"
+PIPELINE_USE_CACHE = os.getenv("PIPELINE_USE_CACHE", "true").lower() == "true"
+# Recompute only the records changed since the last run (see pipeline.run_incremental)
+PIPELINE_INCREMENTAL = os.getenv("PIPELINE_INCREMENTAL", "false").lower() == "true"
+# Comma-separated columns to shard the pipeline by (e.g. "district,scheme") and the
+# processes working on the shards; an empty list runs the stages unpartitioned
+PIPELINE_PARTITION_BY = [
+    c for c in os.getenv("PIPELINE_PARTITION_BY", "").split(",") if c
+]
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", str(os.cpu_count() or 1)))
+
+# Rows per chunk for streaming preprocessing; 0 loads the raw file at once
+PREPROCESS_CHUNKSIZE = int(os.getenv("PREPROCESS_CHUNKSIZE", "0"))
+
+# Group-count features and the column they count
+COUNT_FEATURES = {"same_bank_count": "bank_account", "same_address_count": "address"}
+# "exact" counts keys in hash tables; "sketch" uses fixed-size Count-Min sketches in
+# streaming preprocessing, partitioned runs and real-time scoring. A sketched count
+# exceeds the exact one by at most SKETCH_EPSILON x records with probability
+# 1 - SKETCH_DELTA; distinct values per district are HyperLogLog estimates with
+# relative standard error SKETCH_HLL_ERROR. Sketches are saved to FEATURE_SKETCHES.
+# Overcounts are additive and grow with the number of records, not with the key's
+# count: the default (width ~272k, ~5 MB per column) overcounts by ~1.6 on average
+# at 1M records. Use exact mode when counts of 1-4 must be told apart at scale.
+FEATURE_COUNT_MODE = os.getenv("FEATURE_COUNT_MODE", "exact").lower()
+SKETCH_EPSILON = float(os.getenv("SKETCH_EPSILON", "0.00001"))
+SKETCH_DELTA = float(os.getenv("SKETCH_DELTA", "0.01"))
+SKETCH_HLL_ERROR = float(os.getenv("SKETCH_HLL_ERROR", "0.01"))
+FEATURE_SKETCHES = PROCESSED_DATA_DIR / "feature_sketches.pkl"
 
 # Model parameters
 ANOMALY_CONTAMINATION = float(os.getenv("ANOMALY_CONTAMINATION", "0.05"))
+ANOMALY_FEATURES = ['amount', 'same_bank_count', 'same_address_count', 'ring_size', 'shared_links']
+# Trained Isolation Forest; refit every run unless ANOMALY_REFIT=false
+ANOMALY_MODEL_PATH = DATA_DIR / "models" / "anomaly_detector.joblib"
+ANOMALY_REFIT = os.getenv("ANOMALY_REFIT", "true").lower() == "true"
 DUPLICATE_THRESHOLD = int(os.getenv("DUPLICATE_THRESHOLD", "90"))
+# Comma-separated columns records must share to be compared (e.g. "district,scheme")
+DUPLICATE_BLOCK_COLUMNS = [
+    c for c in os.getenv("DUPLICATE_BLOCK_COLUMNS", "").split(",") if c
+]
+DUPLICATE_WORKERS = int(os.getenv("DUPLICATE_WORKERS", "1"))
+
+# Entity resolution: attribute weights, merge threshold (0-1) and hub key cutoff
+ENTITY_WEIGHTS = {
+    "name": 0.35,
+    "phone": 0.25,
+    "bank_account": 0.25,
+    "address": 0.15
+}
+ENTITY_MATCH_THRESHOLD = float(os.getenv("ENTITY_MATCH_THRESHOLD", "0.6"))
+ENTITY_MAX_BLOCK_SIZE = int(os.getenv("ENTITY_MAX_BLOCK_SIZE", "1000"))
+
+# Fraud rings: beneficiaries linked through shared identifier values, with values
+# held by more than GRAPH_MAX_DEGREE records skipped as hubs
+GRAPH_ATTRIBUTES = ["bank_account", "address", "phone"]
+GRAPH_MAX_DEGREE = int(os.getenv("GRAPH_MAX_DEGREE", "1000"))
 
 # Risk scoring weights
 RISK_WEIGHTS = {
     "same_bank_count": 2,
     "same_address_count": 2,
-    "anomaly_multiplier": 5
+    "anomaly_multiplier": 5,
+    "cluster_size": 3,
+    "ring_size": 1
 }
 
+# Aggregates: risk score at or above which a record counts as high risk; the
+# amount at risk sums the amounts of high-risk and anomalous records
+AGGREGATE_RISK_THRESHOLD = float(os.getenv("AGGREGATE_RISK_THRESHOLD", "10"))
+# Heatmap: aggregate measure weighting the heat layer, and grid cell size in degrees
+# districts are snapped to (0 plots each district at its gazetteer coordinates)
+HEATMAP_WEIGHT = os.getenv("HEATMAP_WEIGHT", "amount_at_risk")
+HEATMAP_BIN_DEGREES = float(os.getenv("HEATMAP_BIN_DEGREES", "0"))
+
+# Row validation: records failing any rule are quarantined to QUARANTINE_OUTPUT
+# with a violation bitmask instead of failing the whole run. Amount bounds catch
+# corrupt values only; unusual but plausible amounts are left to anomaly detection.
+QUARANTINE_OUTPUT = PROCESSED_DATA_DIR / f"quarantine.{ARTIFACT_FORMAT}"
+VALIDATION_PHONE_PATTERN = os.getenv("VALIDATION_PHONE_PATTERN", r"\+?[0-9(][0-9 ().-]{6,20}(x[0-9]{1,6})?")
+VALIDATION_DATE_PATTERN = r"[0-9]{4}-(0[1-9]|1[0-2])-(0[1-9]|[12][0-9]|3[01])"
+VALIDATION_AMOUNT_MIN = float(os.getenv("VALIDATION_AMOUNT_MIN", "1"))
+VALIDATION_AMOUNT_MAX = float(os.getenv("VALIDATION_AMOUNT_MAX", "10000000"))
+VALIDATION_SCHEMES = tuple(
+    s.strip() for s in os.getenv("VALIDATION_SCHEMES", "Food Subsidy,Farmer Aid,Scholarship").split(",")
+    if s.strip()
+)
+
 # API configuration
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", "8000"))
+# Real-time scoring micro-batches: max records per batch and max queueing delay
+SCORE_MAX_BATCH = int(os.getenv("SCORE_MAX_BATCH", "256"))
+SCORE_MAX_WAIT_MS = float(os.getenv("SCORE_MAX_WAIT_MS", "2"))
+# Rows serialized per chunk by the streaming export endpoint
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "10000"))
+# Read queries run on a dedicated thread pool; identical concurrent queries are
+# coalesced and results memoized per dataset version, which is re-checked on disk
+# at most every API_DATASET_CHECK_SECONDS
+API_QUERY_WORKERS = int(os.getenv("API_QUERY_WORKERS", "4"))
+API_QUERY_MEMO_SIZE = int(os.getenv("API_QUERY_MEMO_SIZE", "256"))
+API_DATASET_CHECK_SECONDS = float(os.getenv("API_DATASET_CHECK_SECONDS", "1"))
+# Serving backend: "memory" loads the risk output into an in-process index,
+# "sqlite" queries an indexed SQLite copy the pipeline swaps in after each run
+API_STORE = os.getenv("API_STORE", "memory").lower()
+RISK_STORE = PROCESSED_DATA_DIR / "risk.db"
+STORE_POOL_SIZE = int(os.getenv("STORE_POOL_SIZE", "4"))
 
-# Logging
+# Logging: records are queued and written by a background thread unless LOG_ASYNC
+# is off; LOG_FORMAT is "text" or "json" (one object per line)
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() == "true"
+LOG_PROGRESS_INTERVAL = float(os.getenv("LOG_PROGRESS_INTERVAL", "5"))
+
+# Observability: metrics registry behind /metrics and the run report, per-run JSON
+# report path, and an opt-in sampling profiler writing folded stacks for flame graphs
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+RUN_REPORT = PROCESSED_DATA_DIR / "run_report.json"
+PROFILE_OUTPUT = os.getenv("PROFILE_OUTPUT", "")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# Stage peak memory from Python allocations (tracemalloc) instead of process RSS;
+# exact per stage but slows allocation-heavy stages several-fold
+PROFILE_TRACEMALLOC = os.getenv("PROFILE_TRACEMALLOC", "false").lower() == "true"
@@ -1,6 +1,8 @@
 """Model modules for fraud detection."""
 from models.anomaly_detector import AnomalyDetector
 from models.duplicate_detector import DuplicateDetector
+from models.entity_resolver import EntityResolver
+from models.identity_graph import IdentityGraph
 from models.risk_scorer import RiskScorer
 
-__all__ = ['AnomalyDetector', 'DuplicateDetector', 'RiskScorer']
+__all__ = ['AnomalyDetector', 'DuplicateDetector', 'EntityResolver', 'IdentityGraph', 'RiskScorer']
@@ -1,51 +1,198 @@
 """Anomaly detection using Isolation Forest."""
+import time
+import joblib
+import numpy as np
 import pandas as pd
+import sklearn
+from pathlib import Path
 from sklearn.ensemble import IsolationForest
-from typing import List
+from typing import List, Optional
 from config import ANOMALY_CONTAMINATION
 from utils.logger import setup_logger
+from utils.metrics import instrument
 
 logger = setup_logger(__name__)
 
+# Bumped whenever the persisted model layout changes
+MODEL_VERSION = 1
+
 class AnomalyDetector:
     """Detect anomalies in beneficiary data using Isolation Forest."""
-    
+
     def __init__(self, contamination: float = ANOMALY_CONTAMINATION):
         """
         Initialize anomaly detector.
-        
+
         Args:
             contamination: Expected proportion of outliers
         """
         self.contamination = contamination
         self.model = IsolationForest(contamination=contamination, random_state=42)
-        logger.info(f"Initialized AnomalyDetector with contamination={contamination}")
-    
+        self.features: Optional[List[str]] = None
+        self.metadata: dict = {}
+        logger.debug("Initialized AnomalyDetector with contamination=%s", contamination)
+
+    @property
+    def is_fitted(self) -> bool:
+        """Whether fit() has been called or a trained model was loaded."""
+        return self.features is not None
+
+    @instrument("anomaly.fit")
+    def fit(self, df: pd.DataFrame, features: List[str]) -> "AnomalyDetector":
+        """
+        Train the model on a dataset.
+
+        Args:
+            df: Training DataFrame
+            features: List of feature column names
+
+        Returns:
+            The fitted detector
+        """
+        missing = [f for f in features if f not in df.columns]
+        if missing:
+            raise ValueError(f"Missing features: {missing}")
+
+        self.model.fit(df[features])
+        self.features = list(features)
+        self.metadata = {
+            "version": MODEL_VERSION,
+            "features": self.features,
+            "contamination": self.contamination,
+            "sklearn_version": sklearn.__version__,
+            "n_samples": len(df),
+            "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }
+        logger.info("Fitted AnomalyDetector on %d records", len(df))
+        return self
+
+    @instrument("anomaly.score")
+    def score(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Compute continuous anomaly scores with the trained model.
+
+        Args:
+            df: DataFrame with the training features
+
+        Returns:
+            decision_function values; negative scores are anomalies and lower
+            is more anomalous
+        """
+        if not self.is_fitted:
+            raise ValueError("AnomalyDetector is not fitted")
+        return self.model.decision_function(df[self.features])
+
+    def predict(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Flag anomalies with the trained model without refitting.
+
+        Args:
+            df: DataFrame with the training features
+
+        Returns:
+            DataFrame with anomaly (-1 for anomalies, 1 for normal) and
+            anomaly_score columns added
+        """
+        try:
+            scores = self.score(df)
+            df['anomaly_score'] = scores
+            df['anomaly'] = np.where(scores < 0, -1, 1)
+
+            logger.debug("Detected %d anomalies out of %d records", (scores < 0).sum(), len(df))
+
+            return df
+
+        except Exception as e:
+            logger.error("Error detecting anomalies: %s", e)
+            return df
+
     def detect(self, df: pd.DataFrame, features: List[str]) -> pd.DataFrame:
         """
-        Detect anomalies in the dataset.
-        
+        Fit on the dataset and flag its anomalies.
+
         Args:
             df: Input DataFrame
             features: List of feature column names
-            
+
         Returns:
             DataFrame with anomaly column added (-1 for anomalies, 1 for normal)
+            and the continuous anomaly_score
         """
         try:
             if not all(f in df.columns for f in features):
                 missing = [f for f in features if f not in df.columns]
-                logger.error(f"Missing features: {missing}")
+                logger.error("Missing features: %s", missing)
                 return df
-            
-            feature_data = df[features]
-            df['anomaly'] = self.model.fit_predict(feature_data)
-            
-            anomaly_count = (df['anomaly'] == -1).sum()
-            logger.info(f"Detected {anomaly_count} anomalies out of {len(df)} records")
-            
+
+            df = self.fit(df, features).predict(df)
+            logger.info(
+                "Detected %d anomalies out of %d records", (df['anomaly'] == -1).sum(), len(df)
+            )
             return df
-        
+
         except Exception as e:
-            logger.error(f"Error detecting anomalies: {str(e)}")
+            logger.error("Error detecting anomalies: %s", e)
             return df
+
+    def save(self, file_path: Path) -> bool:
+        """
+        Persist the trained model with its metadata.
+
+        Args:
+            file_path: Destination path
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            if not self.is_fitted:
+                logger.error("Cannot save an unfitted AnomalyDetector")
+                return False
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            joblib.dump({"metadata": self.metadata, "model": self.model}, file_path)
+            logger.info("Saved anomaly model %s to %s", self.metadata, file_path)
+            return True
+
+        except Exception as e:
+            logger.error("Error saving anomaly model to %s: %s", file_path, e)
+            return False
+
+    @classmethod
+    def load(cls, file_path: Path) -> Optional["AnomalyDetector"]:
+        """
+        Load a model saved with save().
+
+        Args:
+            file_path: Path to the saved model
+
+        Returns:
+            Fitted AnomalyDetector if successful, None otherwise
+        """
+        try:
+            if not file_path.exists():
+                logger.error("File not found: %s", file_path)
+                return None
+
+            state = joblib.load(file_path)
+            metadata = state["metadata"]
+            if metadata.get("version") != MODEL_VERSION:
+                logger.error(
+                    "Anomaly model version %s does not match %s", metadata.get("version"), MODEL_VERSION
+                )
+                return None
+            if metadata.get("sklearn_version") != sklearn.__version__:
+                logger.warning(
+                    "Anomaly model was trained with scikit-learn %s, running %s",
+                    metadata.get("sklearn_version"), sklearn.__version__
+                )
+
+            detector = cls(metadata["contamination"])
+            detector.model = state["model"]
+            detector.features = metadata["features"]
+            detector.metadata = metadata
+            logger.info("Loaded anomaly model %s from %s", metadata, file_path)
+            return detector
+
+        except Exception as e:
+            logger.error("Error loading anomaly model from %s: %s", file_path, e)
+            return None
@@ -1,74 +1,608 @@
 """Duplicate detection using fuzzy string matching."""
+import csv
+import pickle
+import numpy as np
 import pandas as pd
-from rapidfuzz import fuzz
-from typing import List, Tuple
-from config import DUPLICATE_THRESHOLD
-from utils.logger import setup_logger
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from pathlib import Path
+from rapidfuzz import fuzz, process
+from typing import Dict, Iterator, List, Optional, Tuple
+from config import DUPLICATE_THRESHOLD, DUPLICATE_BLOCK_COLUMNS, DUPLICATE_WORKERS
+from utils.logger import ProgressLogger, setup_logger
+from utils.metrics import instrument
+from utils.normalizers import (
+    normalize_address, normalize_name, normalize_phone, phonetic_key
+)
 
 logger = setup_logger(__name__)
 
+# Number of leading/trailing characters of the sorted-token name used as block keys
+BLOCK_PREFIX_LENGTH = 4
+
+# Bumped whenever the persisted index layout or key definitions change
+INDEX_VERSION = 1
+
+def blocking_keys(
+    df: pd.DataFrame,
+    name_column: str = 'name',
+    block_columns: Optional[List[str]] = None
+) -> Dict[str, pd.Series]:
+    """
+    Build blocking keys for candidate pair generation.
+
+    Two records become a candidate pair when they share at least one key.
+    Name keys are derived from the sorted-token form of the name (the same
+    form token_sort_ratio compares), so near-duplicates land in the same
+    block. Records sharing a normalized phone, bank account or address are
+    also compared when those columns are present. Missing keys are NaN.
+
+    Args:
+        df: Input DataFrame
+        name_column: Column containing names
+        block_columns: Optional columns (e.g. district, scheme) that records
+            must share exactly to be compared
+
+    Returns:
+        Mapping of key name to a Series of block keys aligned with df
+    """
+    normalized = normalize_name(df[name_column])
+    keys = {
+        'prefix': normalized.str[:BLOCK_PREFIX_LENGTH],
+        'suffix': normalized.str[-BLOCK_PREFIX_LENGTH:],
+        'phonetic': phonetic_key(normalized),
+    }
+    if 'phone' in df.columns:
+        keys['phone'] = normalize_phone(df['phone'])
+    if 'bank_account' in df.columns:
+        keys['bank_account'] = df['bank_account'].astype(str).where(df['bank_account'].notna())
+    if 'address' in df.columns:
+        keys['address'] = normalize_address(df['address'])
+
+    if block_columns:
+        bucket = df[block_columns[0]].astype(str)
+        for column in block_columns[1:]:
+            bucket = bucket + '|' + df[column].astype(str)
+        keys = {name: bucket + '|' + key for name, key in keys.items()}
+
+    return keys
+
+# A tile is (key_level, block_positions, start_row): rows block_positions[start_row:
+# start_row + batch_size] scored against block_positions[start_row:]
+Tile = Tuple[int, np.ndarray, int]
+
+# Comparisons bundled into one pool task, amortizes inter-process overhead
+TASK_COMPARISONS = 2_000_000
+
+_worker_state: dict = {}
+
+def _init_worker(names: np.ndarray, key_codes: List[np.ndarray], threshold: int, batch_size: int):
+    """Store read-only matching inputs once per worker process."""
+    _worker_state.update(
+        names=names, key_codes=key_codes, threshold=threshold, batch_size=batch_size
+    )
+
+def _score_task_in_worker(tiles: List[Tile]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Pool entry point for _score_tiles using the worker's stored inputs."""
+    return _score_tiles(tiles, **_worker_state)
+
+def _score_tiles(
+    tiles: List[Tile],
+    names: np.ndarray,
+    key_codes: List[np.ndarray],
+    threshold: int,
+    batch_size: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Score a list of tiles and return matching row positions and scores.
+
+    A pair sharing several blocking keys is scored in each of those blocks,
+    so it is only kept in the block of the first key level the pair shares.
+    This makes the output duplicate-free without any global state.
+    """
+    firsts, seconds, scores = [], [], []
+
+    for level, idx, start in tiles:
+        end = min(start + batch_size, len(idx))
+        matrix = process.cdist(
+            names[idx[start:end]],
+            names[idx[start:]],
+            scorer=fuzz.token_sort_ratio,
+            score_cutoff=threshold,
+            dtype=np.float64
+        )
+        rows, cols = np.nonzero(matrix > threshold)
+        # Keep the strict upper triangle relative to the whole block
+        keep = cols > rows
+        rows, cols = rows[keep], cols[keep]
+        first, second = idx[start + rows], idx[start + cols]
+
+        keep = np.ones(len(first), dtype=bool)
+        for codes in key_codes[:level]:
+            keep &= (codes[first] != codes[second]) | (codes[first] == -1)
+
+        firsts.append(first[keep])
+        seconds.append(second[keep])
+        scores.append(matrix[rows, cols][keep])
+
+    if not firsts:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=np.float64)
+
+    return np.concatenate(firsts), np.concatenate(seconds), np.concatenate(scores)
+
 class DuplicateDetector:
     """Detect duplicate beneficiaries using fuzzy name matching."""
-    
-    def __init__(self, threshold: int = DUPLICATE_THRESHOLD):
+
+    def __init__(
+        self,
+        threshold: int = DUPLICATE_THRESHOLD,
+        block_columns: Optional[List[str]] = None,
+        workers: Optional[int] = None
+    ):
         """
         Initialize duplicate detector.
-        
+
         Args:
             threshold: Similarity threshold (0-100) for considering duplicates
+            block_columns: Columns records must share to be compared
+                (defaults to DUPLICATE_BLOCK_COLUMNS)
+            workers: Processes used for scoring, 1 scores in-process
+                (defaults to DUPLICATE_WORKERS)
         """
         self.threshold = threshold
-        logger.info(f"Initialized DuplicateDetector with threshold={threshold}")
-    
+        self.block_columns = (
+            DUPLICATE_BLOCK_COLUMNS if block_columns is None else block_columns
+        )
+        self.workers = DUPLICATE_WORKERS if workers is None else workers
+
+        # Incremental index: key level -> key -> positions into _ids/_names
+        self._postings: Dict[str, Dict[str, List[int]]] = {}
+        self._ids: list = []
+        self._names: List[str] = []
+        logger.debug(
+            "Initialized DuplicateDetector with threshold=%s, block_columns=%s, workers=%s",
+            threshold, self.block_columns, self.workers
+        )
+
+    @instrument("duplicates.find")
     def find_duplicates(
         self,
         df: pd.DataFrame,
         name_column: str = 'name',
         id_column: str = 'beneficiary_id',
-        batch_size: int = 100
-    ) -> List[Tuple[int, int, int]]:
+        batch_size: int = 100,
+        blocking: bool = True
+    ) -> List[Tuple[int, int, float]]:
         """
         Find potential duplicate beneficiaries.
-        
+
         Args:
             df: Input DataFrame
             name_column: Column containing names
             id_column: Column containing IDs
-            batch_size: Process in batches to manage memory
-            
+            batch_size: Rows scored per cdist call, bounds the score matrix size
+            blocking: Only score pairs sharing a blocking key; when False every
+                pair is scored (exhaustive reference)
+
         Returns:
-            List of tuples (id1, id2, similarity_score)
+            List of tuples (id1, id2, similarity_score) in row order, with
+            float scores from 0 to 100
         """
         try:
             if name_column not in df.columns or id_column not in df.columns:
-                logger.error(f"Required columns not found")
+                logger.error("Required columns not found")
                 return []
-            
-            duplicates = []
-            total = len(df)
-            
-            # Process in batches for better performance
-            for i in range(0, total, batch_size):
-                batch_end = min(i + batch_size, total)
-                for j in range(i, batch_end):
-                    for k in range(j + 1, total):
-                        score = fuzz.token_sort_ratio(
-                            str(df[name_column].iloc[j]),
-                            str(df[name_column].iloc[k])
-                        )
-                        if score > self.threshold:
-                            duplicates.append((
-                                df[id_column].iloc[j],
-                                df[id_column].iloc[k],
-                                score
-                            ))
-                
-                if (i // batch_size) % 10 == 0:
-                    logger.info(f"Processed {batch_end}/{total} records")
-            
-            logger.info(f"Found {len(duplicates)} potential duplicates")
+
+            parts = list(self._iter_positions(df, name_column, batch_size, blocking))
+            if not parts:
+                logger.info("Found 0 potential duplicates")
+                return []
+
+            first, second, scores = (np.concatenate(p) for p in zip(*parts))
+            order = np.lexsort((second, first))
+            ids = df[id_column].to_numpy()
+            duplicates = list(zip(
+                ids[first[order]].tolist(),
+                ids[second[order]].tolist(),
+                scores[order].tolist()
+            ))
+
+            logger.info("Found %d potential duplicates", len(duplicates))
             return duplicates
-        
+
         except Exception as e:
-            logger.error(f"Error finding duplicates: {str(e)}")
+            logger.error("Error finding duplicates: %s", e)
             return []
+
+    def iter_duplicates(
+        self,
+        df: pd.DataFrame,
+        name_column: str = 'name',
+        id_column: str = 'beneficiary_id',
+        batch_size: int = 100,
+        blocking: bool = True
+    ) -> Iterator[Tuple[int, int, float]]:
+        """
+        Stream potential duplicates without accumulating them in memory.
+
+        The pair space is split into tiles of batch_size rows which are scored
+        in-process or, with workers > 1, across a process pool. Matches are
+        yielded as each tile batch completes, in no particular order.
+
+        Args:
+            df: Input DataFrame
+            name_column: Column containing names
+            id_column: Column containing IDs
+            batch_size: Rows scored per cdist call, bounds the score matrix size
+            blocking: Only score pairs sharing a blocking key
+
+        Yields:
+            Tuples (id1, id2, similarity_score)
+        """
+        ids = df[id_column].to_numpy()
+        for first, second, scores in self._iter_positions(
+            df, name_column, batch_size, blocking
+        ):
+            yield from zip(ids[first].tolist(), ids[second].tolist(), scores.tolist())
+
+    def write_duplicates(
+        self,
+        df: pd.DataFrame,
+        file_path: Path,
+        name_column: str = 'name',
+        id_column: str = 'beneficiary_id',
+        batch_size: int = 100,
+        blocking: bool = True
+    ) -> int:
+        """
+        Stream potential duplicates to a CSV file.
+
+        Args:
+            df: Input DataFrame
+            file_path: Destination CSV path
+            name_column: Column containing names
+            id_column: Column containing IDs
+            batch_size: Rows scored per cdist call
+            blocking: Only score pairs sharing a blocking key
+
+        Returns:
+            Number of duplicate pairs written, -1 on error
+        """
+        try:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            count = 0
+            with open(file_path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['id1', 'id2', 'score'])
+                for match in self.iter_duplicates(
+                    df, name_column, id_column, batch_size, blocking
+                ):
+                    writer.writerow(match)
+                    count += 1
+
+            logger.info("Wrote %d potential duplicates to %s", count, file_path)
+            return count
+
+        except Exception as e:
+            logger.error("Error writing duplicates to %s: %s", file_path, e)
+            return -1
+
+    @instrument("duplicates.query")
+    def query(
+        self,
+        df: pd.DataFrame,
+        name_column: str = 'name',
+        id_column: str = 'beneficiary_id'
+    ) -> List[Tuple[int, int, float]]:
+        """
+        Match records against the incremental index without inserting them.
+
+        Only indexed records sharing a blocking key are scored, so the cost is
+        proportional to len(df) times the number of candidates per record.
+
+        Args:
+            df: New records
+            name_column: Column containing names
+            id_column: Column containing IDs
+
+        Returns:
+            List of tuples (new_id, indexed_id, similarity_score)
+        """
+        try:
+            if name_column not in df.columns or id_column not in df.columns:
+                logger.error("Required columns not found")
+                return []
+
+            new_pos, old_pos = [], []
+            keys = blocking_keys(df, name_column, self.block_columns)
+            for level, series in keys.items():
+                postings = self._postings.get(level, {})
+                for position, key in enumerate(series.tolist()):
+                    hits = postings.get(key) if isinstance(key, str) else None
+                    if hits:
+                        new_pos.extend([position] * len(hits))
+                        old_pos.extend(hits)
+
+            if not new_pos:
+                return []
+
+            pair_codes = np.unique(
+                np.array(new_pos, dtype=np.int64) * len(self._ids) + np.array(old_pos)
+            )
+            new_pos, old_pos = pair_codes // len(self._ids), pair_codes % len(self._ids)
+
+            new_names = df[name_column].astype(str).to_numpy(dtype=object)
+            old_names = np.array(self._names, dtype=object)
+            scores = process.cpdist(
+                new_names[new_pos],
+                old_names[old_pos],
+                scorer=fuzz.token_sort_ratio,
+                score_cutoff=self.threshold,
+                dtype=np.float64
+            )
+            keep = scores > self.threshold
+
+            new_ids = df[id_column].to_numpy()[new_pos[keep]]
+            old_ids = np.array(self._ids)[old_pos[keep]]
+            return list(zip(new_ids.tolist(), old_ids.tolist(), scores[keep].tolist()))
+
+        except Exception as e:
+            logger.error("Error querying duplicate index: %s", e)
+            return []
+
+    def add(
+        self,
+        df: pd.DataFrame,
+        name_column: str = 'name',
+        id_column: str = 'beneficiary_id'
+    ) -> List[Tuple[int, int, float]]:
+        """
+        Match new records against the index and among themselves, then index them.
+
+        Adding a dataset in any number of batches yields the same pairs as one
+        blocked find_duplicates over the whole dataset.
+
+        Args:
+            df: New records
+            name_column: Column containing names
+            id_column: Column containing IDs
+
+        Returns:
+            List of tuples (new_id, other_id, similarity_score)
+        """
+        matches = self.query(df, name_column, id_column)
+        matches += self.find_duplicates(df, name_column, id_column)
+
+        offset = len(self._ids)
+        keys = blocking_keys(df, name_column, self.block_columns)
+        for level, series in keys.items():
+            postings = self._postings.setdefault(level, {})
+            for position, key in enumerate(series.tolist(), start=offset):
+                if isinstance(key, str):
+                    postings.setdefault(key, []).append(position)
+
+        self._ids.extend(df[id_column].tolist())
+        self._names.extend(df[name_column].astype(str).tolist())
+
+        logger.info("Indexed %d records, index now holds %d", len(df), len(self._ids))
+        return matches
+
+    @property
+    def indexed_ids(self) -> set:
+        """IDs of all records in the incremental index."""
+        return set(self._ids)
+
+    def save(self, file_path: Path) -> bool:
+        """
+        Persist the incremental index.
+
+        Args:
+            file_path: Destination path
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            state = {
+                'version': INDEX_VERSION,
+                'threshold': self.threshold,
+                'block_columns': self.block_columns,
+                'postings': self._postings,
+                'ids': self._ids,
+                'names': self._names,
+            }
+            with open(file_path, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            logger.info("Saved duplicate index with %d records to %s", len(self._ids), file_path)
+            return True
+
+        except Exception as e:
+            logger.error("Error saving duplicate index to %s: %s", file_path, e)
+            return False
+
+    @classmethod
+    def load(cls, file_path: Path, workers: Optional[int] = None) -> Optional['DuplicateDetector']:
+        """
+        Load a detector with a previously saved incremental index.
+
+        Args:
+            file_path: Path written by save()
+            workers: Processes used for scoring
+
+        Returns:
+            DuplicateDetector if successful, None otherwise
+        """
+        try:
+            if not file_path.exists():
+                logger.error("File not found: %s", file_path)
+                return None
+
+            with open(file_path, 'rb') as f:
+                state = pickle.load(f)
+            if state.get('version') != INDEX_VERSION:
+                logger.error(
+                    "Duplicate index version %s does not match %s", state.get('version'), INDEX_VERSION
+                )
+                return None
+
+            detector = cls(state['threshold'], state['block_columns'], workers)
+            detector._postings = state['postings']
+            detector._ids = state['ids']
+            detector._names = state['names']
+            logger.info("Loaded duplicate index with %d records from %s", len(detector._ids), file_path)
+            return detector
+
+        except Exception as e:
+            logger.error("Error loading duplicate index from %s: %s", file_path, e)
+            return None
+
+    def blocking_recall(
+        self,
+        df: pd.DataFrame,
+        name_column: str = 'name',
+        id_column: str = 'beneficiary_id',
+        batch_size: int = 100
+    ) -> Dict[str, float]:
+        """
+        Compare blocked matching against exhaustive pairwise matching.
+
+        Args:
+            df: Input DataFrame
+            name_column: Column containing names
+            id_column: Column containing IDs
+            batch_size: Rows scored per cdist call
+
+        Returns:
+            Dictionary with pair counts, recall and the fraction of comparisons
+            avoided by blocking
+        """
+        exhaustive = self.find_duplicates(
+            df, name_column, id_column, batch_size, blocking=False
+        )
+        blocked = self.find_duplicates(
+            df, name_column, id_column, batch_size, blocking=True
+        )
+
+        expected = {(a, b) for a, b, _ in exhaustive}
+        found = {(a, b) for a, b, _ in blocked}
+        total = len(df) * (len(df) - 1) // 2
+        candidates = self.candidate_pair_count(df, name_column)
+
+        report = {
+            'exhaustive_pairs': len(expected),
+            'blocked_pairs': len(found),
+            'recall': len(expected & found) / len(expected) if expected else 1.0,
+            'candidate_comparisons': candidates,
+            'total_comparisons': total,
+            'comparison_reduction': 1 - candidates / total if total else 0.0,
+        }
+        logger.info("Blocking recall report: %s", report)
+        return report
+
+    def candidate_pair_count(self, df: pd.DataFrame, name_column: str = 'name') -> int:
+        """
+        Count the upper bound of comparisons performed with blocking.
+
+        Args:
+            df: Input DataFrame
+            name_column: Column containing names
+
+        Returns:
+            Sum over all blocks of block_size * (block_size - 1) / 2
+        """
+        total = 0
+        for keys in blocking_keys(df, name_column, self.block_columns).values():
+            sizes = keys.value_counts().to_numpy()
+            total += int((sizes * (sizes - 1) // 2).sum())
+        return total
+
+
+    def _iter_positions(
+        self,
+        df: pd.DataFrame,
+        name_column: str,
+        batch_size: int,
+        blocking: bool
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Yield matching row positions and scores, one array triple per task."""
+        names = df[name_column].astype(str).to_numpy(dtype=object)
+
+        if blocking:
+            key_codes = [
+                pd.factorize(keys)[0]
+                for keys in blocking_keys(df, name_column, self.block_columns).values()
+            ]
+        else:
+            key_codes = []
+
+        tasks = _batch_tiles(self._tiles(key_codes, len(df), batch_size), batch_size)
+        inputs = dict(
+            names=names, key_codes=key_codes,
+            threshold=self.threshold, batch_size=batch_size
+        )
+
+        progress = ProgressLogger(logger, "Scored duplicate tasks")
+        if self.workers > 1:
+            results = self._score_in_pool(tasks, inputs)
+        else:
+            results = (_score_tiles(tiles, **inputs) for tiles in tasks)
+        for result in results:
+            progress.update()
+            yield result
+
+    def _tiles(self, key_codes: List[np.ndarray], n: int, batch_size: int) -> Iterator[Tile]:
+        """Yield tiles covering every block of every key level."""
+        if not key_codes:
+            for start in range(0, n, batch_size):
+                yield 0, np.arange(n), start
+            return
+
+        positions = pd.Series(np.arange(n))
+        for level, codes in enumerate(key_codes):
+            for code, idx in positions.groupby(codes).indices.items():
+                if code != -1 and len(idx) > 1:
+                    for start in range(0, len(idx), batch_size):
+                        yield level, idx, start
+
+    def _score_in_pool(
+        self,
+        tasks: Iterator[List[Tile]],
+        inputs: dict
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Score tasks across a process pool with a bounded number in flight.
+
+        Results are yielded in completion order, so one slow task does not
+        hold back the ones submitted after it.
+        """
+        max_in_flight = self.workers * 2
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(
+                inputs['names'], inputs['key_codes'],
+                inputs['threshold'], inputs['batch_size']
+            )
+        ) as executor:
+            pending = set()
+            for tiles in tasks:
+                pending.add(executor.submit(_score_task_in_worker, tiles))
+                if len(pending) >= max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in as_completed(pending):
+                yield future.result()
+
+def _batch_tiles(tiles: Iterator[Tile], batch_size: int) -> Iterator[List[Tile]]:
+    """Group tiles into tasks of roughly TASK_COMPARISONS comparisons."""
+    task, comparisons = [], 0
+    for tile in tiles:
+        _, idx, start = tile
+        task.append(tile)
+        comparisons += min(batch_size, len(idx) - start) * (len(idx) - start)
+        if comparisons >= TASK_COMPARISONS:
+            yield task
+            task, comparisons = [], 0
+    if task:
+        yield task
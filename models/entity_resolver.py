@@ -0,0 +1,224 @@
+"""Multi-attribute entity resolution with union-find clustering."""
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+from typing import Dict, Optional, Tuple
+from config import ENTITY_WEIGHTS, ENTITY_MATCH_THRESHOLD, ENTITY_MAX_BLOCK_SIZE
+from utils.logger import setup_logger
+from utils.metrics import instrument
+from utils.normalizers import normalize_address, normalize_name, normalize_phone
+
+logger = setup_logger(__name__)
+
+class UnionFind:
+    """Disjoint-set forest over integer positions with union by size."""
+
+    def __init__(self, n: int):
+        """
+        Initialize n singleton sets.
+
+        Args:
+            n: Number of elements
+        """
+        self.parent = np.arange(n)
+        self.size = np.ones(n, dtype=np.int64)
+
+    def find(self, x: int) -> int:
+        """Return the root of x, halving the path on the way."""
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> None:
+        """Merge the sets containing a and b."""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+
+    def labels(self) -> np.ndarray:
+        """Return compact set labels 0..k-1 for every element."""
+        roots = self.parent.copy()
+        while True:
+            # Pointer jumping resolves every element's root in O(log depth) passes
+            parents = roots[roots]
+            if np.array_equal(parents, roots):
+                break
+            roots = parents
+        return np.unique(roots, return_inverse=True)[1]
+
+class EntityResolver:
+    """Cluster records that refer to the same person across several attributes."""
+
+    def __init__(
+        self,
+        weights: Optional[Dict[str, float]] = None,
+        match_threshold: float = ENTITY_MATCH_THRESHOLD,
+        max_block_size: int = ENTITY_MAX_BLOCK_SIZE,
+        workers: int = 1
+    ):
+        """
+        Initialize entity resolver.
+
+        Args:
+            weights: Attribute weights for pair scoring (name, phone,
+                bank_account, address)
+            match_threshold: Minimum weighted score (0-1) to merge a pair
+            max_block_size: Inverted index postings larger than this are
+                skipped as uninformative hubs
+            workers: Threads used for fuzzy pair scoring, -1 uses all cores
+        """
+        self.weights = weights or ENTITY_WEIGHTS
+        self.match_threshold = match_threshold
+        self.max_block_size = max_block_size
+        self.workers = workers
+        logger.debug(
+            "Initialized EntityResolver with weights=%s, match_threshold=%s",
+            self.weights, match_threshold
+        )
+
+    @instrument("entity.resolve")
+    def resolve(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Assign a cluster to every record.
+
+        Candidate pairs come from per-attribute inverted indexes (records
+        sharing a normalized phone, bank account, sorted-token name or address
+        prefix), are scored on all attributes and merged with union-find.
+
+        Args:
+            df: Input DataFrame
+
+        Returns:
+            DataFrame with cluster_id and cluster_size columns added
+        """
+        try:
+            attributes = self._normalize(df)
+            if not attributes:
+                logger.error("No attributes available for entity resolution")
+                return df
+
+            first, second = self._candidate_pairs(attributes)
+            scores = self._score_pairs(attributes, first, second)
+            matched = scores >= self.match_threshold
+
+            forest = UnionFind(len(df))
+            for a, b in zip(first[matched].tolist(), second[matched].tolist()):
+                forest.union(a, b)
+
+            labels = forest.labels()
+            df['cluster_id'] = labels.astype(np.int32)
+            df['cluster_size'] = np.bincount(labels)[labels]
+
+            logger.info(
+                "Resolved %d records into %d clusters from %d matched pairs; "
+                "%d records share a cluster",
+                len(df), labels.max() + 1 if len(df) else 0, matched.sum(),
+                (df['cluster_size'] > 1).sum()
+            )
+            return df
+
+        except Exception as e:
+            logger.error("Error resolving entities: %s", e)
+            return df
+
+    def blocking_keys(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Return the inverted index keys candidate pairs are drawn from.
+
+        Two records can only be matched when they share at least one key, so
+        callers can find the records a change may affect without resolving
+        the whole dataset.
+
+        Args:
+            df: Input DataFrame
+
+        Returns:
+            DataFrame with one column per weighted attribute, aligned with df
+        """
+        keys = pd.DataFrame(self._keys(self._normalize(df)))
+        keys.index = df.index
+        return keys
+
+    def _normalize(self, df: pd.DataFrame) -> Dict[str, pd.Series]:
+        """Return normalized values for every weighted attribute present in df."""
+        attributes = {}
+        if 'name' in df.columns and 'name' in self.weights:
+            attributes['name'] = normalize_name(df['name'])
+        if 'phone' in df.columns and 'phone' in self.weights:
+            attributes['phone'] = normalize_phone(df['phone'])
+        if 'bank_account' in df.columns and 'bank_account' in self.weights:
+            attributes['bank_account'] = (
+                df['bank_account'].astype(str).where(df['bank_account'].notna())
+            )
+        if 'address' in df.columns and 'address' in self.weights:
+            attributes['address'] = normalize_address(df['address'])
+        return {name: values.reset_index(drop=True) for name, values in attributes.items()}
+
+    @staticmethod
+    def _keys(attributes: Dict[str, pd.Series]) -> Dict[str, pd.Series]:
+        """Derive blocking keys from normalized attributes."""
+        keys = dict(attributes)
+        if 'address' in keys:
+            # House number and street usually survive rewording of the rest
+            keys['address'] = keys['address'].str.split().str[:2].str.join(' ')
+        return keys
+
+    def _candidate_pairs(self, attributes: Dict[str, pd.Series]) -> Tuple[np.ndarray, np.ndarray]:
+        """Self-join each attribute's inverted index into unique position pairs."""
+        keys = self._keys(attributes)
+        n = len(next(iter(attributes.values())))
+        codes = []
+        for name, values in keys.items():
+            postings = pd.DataFrame({'key': values, 'pos': np.arange(n)}).dropna()
+            sizes = postings.groupby('key')['pos'].transform('size')
+            hubs = sizes > self.max_block_size
+            if hubs.any():
+                logger.warning(
+                    "Skipping %d %s keys shared by more than %d records",
+                    postings.loc[hubs, 'key'].nunique(), name, self.max_block_size
+                )
+            postings = postings[(sizes > 1) & ~hubs]
+
+            pairs = postings.merge(postings, on='key')
+            pairs = pairs[pairs['pos_x'] < pairs['pos_y']]
+            codes.append(pairs['pos_x'].to_numpy() * n + pairs['pos_y'].to_numpy())
+
+        unique = np.unique(np.concatenate(codes)) if codes else np.array([], dtype=np.int64)
+        return unique // n, unique % n
+
+    def _score_pairs(
+        self,
+        attributes: Dict[str, pd.Series],
+        first: np.ndarray,
+        second: np.ndarray
+    ) -> np.ndarray:
+        """Weighted similarity (0-1) over attributes present for both records."""
+        total = np.zeros(len(first))
+        weight_sum = np.zeros(len(first))
+
+        for name, values in attributes.items():
+            left = values.to_numpy(dtype=object)[first]
+            right = values.to_numpy(dtype=object)[second]
+            present = pd.notna(left) & pd.notna(right)
+
+            if name in ('name', 'address'):
+                similarity = np.zeros(len(first))
+                if present.any():
+                    scorer = fuzz.token_sort_ratio if name == 'name' else fuzz.token_set_ratio
+                    similarity[present] = process.cpdist(
+                        left[present], right[present], scorer=scorer, dtype=np.float64,
+                        workers=self.workers
+                    ) / 100
+            else:
+                similarity = (left == right).astype(float)
+
+            total += np.where(present, similarity * self.weights[name], 0)
+            weight_sum += np.where(present, self.weights[name], 0)
+
+        return np.divide(total, weight_sum, out=np.zeros(len(first)), where=weight_sum > 0)
@@ -0,0 +1,371 @@
+"""Fraud-ring detection on the beneficiary-identifier graph."""
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+from typing import Dict, List, Optional
+from config import GRAPH_ATTRIBUTES, GRAPH_MAX_DEGREE
+from utils.logger import setup_logger
+from utils.metrics import instrument
+from utils.normalizers import normalize_address, normalize_phone
+
+logger = setup_logger(__name__)
+
+# Hash standing for a missing identifier value
+MISSING = np.uint64(0)
+
+class IdentityGraph:
+    """Link beneficiaries through shared bank accounts, addresses and phones.
+
+    Beneficiaries are linked through the identifier values they share. A
+    ring is a connected set of beneficiaries: chains such as A sharing an
+    account with B and B sharing an address with C put all three in one ring
+    even though A and C share nothing. Identifiers held by one beneficiary
+    link nothing, and identifiers held by more than max_degree beneficiaries
+    are skipped as uninformative hubs.
+
+    Components are computed on the graph of shared values, where two values
+    are adjacent when one record holds both, so memory follows the number of
+    shared identifiers rather than the number of records. Records can be
+    streamed in three passes over the same records in the same order:
+    count() every chunk, connect() every chunk, components(), then assign()
+    every chunk.
+    """
+
+    def __init__(self, attributes: List[str] = GRAPH_ATTRIBUTES, max_degree: int = GRAPH_MAX_DEGREE):
+        """
+        Initialize identity graph.
+
+        Args:
+            attributes: Identifier columns linking beneficiaries
+            max_degree: Identifiers shared by more beneficiaries are skipped
+        """
+        self.attributes = list(attributes)
+        self.max_degree = max_degree
+        # Running value counts per attribute: the total followed by pending chunk tables
+        self._counts: Dict[str, List[pd.Series]] = {a: [] for a in self.attributes}
+        # Shared values per attribute and the node number of the first one
+        self._values: Dict[str, pd.Index] = {}
+        self._offsets: Dict[str, int] = {}
+        self._degree: Optional[np.ndarray] = None
+        self._members: Optional[np.ndarray] = None
+        self._edges: List[np.ndarray] = []
+        self._labels: Optional[np.ndarray] = None
+        self._sizes: Optional[np.ndarray] = None
+        self._ring_ids: Optional[np.ndarray] = None
+        self._next_ring = 0
+
+    def keys(self, df: pd.DataFrame) -> Dict[str, pd.Series]:
+        """
+        Normalize identifier values so formatting differences still link.
+
+        Args:
+            df: Records with the identifier columns
+
+        Returns:
+            String Series per attribute present in df, NaN where missing
+        """
+        keys = {}
+        for attribute in self.attributes:
+            if attribute not in df.columns:
+                continue
+            values = df[attribute]
+            if attribute == 'phone':
+                keys[attribute] = normalize_phone(values)
+            elif attribute == 'address':
+                keys[attribute] = normalize_address(values)
+            elif pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+                # Whole numbers parsed as float because of missing values print as integers
+                keys[attribute] = values.astype('Int64').astype('str').where(values.notna())
+            else:
+                keys[attribute] = values.astype('str').where(values.notna())
+        return keys
+
+    def hashes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Hash the normalized identifiers of records.
+
+        Args:
+            df: Records with the identifier columns
+
+        Returns:
+            uint64 column per attribute, MISSING where the value is missing
+        """
+        keys = self.keys(df)
+        hashes = {}
+        for attribute in self.attributes:
+            values = keys.get(attribute)
+            if values is None:
+                hashes[attribute] = np.full(len(df), MISSING, dtype=np.uint64)
+                continue
+            hashed = pd.util.hash_pandas_object(values.fillna(''), index=False).to_numpy().copy()
+            hashed[values.isna().to_numpy()] = MISSING
+            hashes[attribute] = hashed
+        return pd.DataFrame(hashes, index=df.index)
+
+    def count(self, hashes: pd.DataFrame) -> None:
+        """
+        First pass: count the holders of each identifier value.
+
+        Args:
+            hashes: Identifier hashes of a chunk of records from hashes()
+        """
+        for attribute in self.attributes:
+            values = hashes[attribute].to_numpy()
+            tables = self._counts[attribute] + [pd.Series(values[values != MISSING]).value_counts()]
+            # Merged once pending tables reach the total, so counting stays linear
+            if len(tables) == 1 or sum(len(t) for t in tables[1:]) >= len(tables[0]):
+                tables = [pd.concat(tables).groupby(level=0, sort=False).sum()]
+            self._counts[attribute] = tables
+
+    def add_counts(self, counts: Dict[str, pd.Series]) -> None:
+        """
+        First pass from holder counts kept elsewhere, e.g. by incremental runs.
+
+        Args:
+            counts: Records holding each identifier hash, per attribute
+        """
+        for attribute in self.attributes:
+            self._counts[attribute].append(counts[attribute])
+
+    def connect(self, hashes: pd.DataFrame) -> None:
+        """
+        Second pass: link the shared values each record holds.
+
+        Args:
+            hashes: Identifier hashes of a chunk of records, in count() order
+        """
+        if self._degree is None:
+            self._build_nodes()
+        nodes = self._nodes(hashes)
+        first = self._first(nodes)
+        linked = first >= 0
+        # Each linked record is counted once, at the first shared value it holds
+        self._members += np.bincount(first[linked], minlength=len(self._degree))
+        for column in nodes.T:
+            edge = (column >= 0) & (column != first)
+            self._edges.append(np.stack([first[edge], column[edge]]))
+
+    @instrument("graph.components")
+    def components(self) -> None:
+        """Find the rings once every record has been connected."""
+        if self._degree is None:
+            self._build_nodes()
+        n_nodes = len(self._degree)
+        edges = np.concatenate(self._edges, axis=1) if self._edges else np.zeros((2, 0), np.int64)
+        graph = sp.csr_matrix(
+            (np.ones(edges.shape[1], dtype=np.int8), (edges[0], edges[1])), shape=(n_nodes, n_nodes)
+        )
+        n_rings, self._labels = connected_components(graph, directed=False)
+        self._sizes = np.bincount(self._labels, weights=self._members, minlength=n_rings).astype(np.int64)
+        self._ring_ids = np.full(n_rings, -1, dtype=np.int64)
+        self._edges = []
+        logger.info(
+            "Linked %d records through %d shared identifier values into %d rings",
+            int(self._members.sum()), n_nodes, n_rings
+        )
+
+    def assign(self, hashes: pd.DataFrame, number: bool = True) -> pd.DataFrame:
+        """
+        Third pass: compute the ring features of records.
+
+        Args:
+            hashes: Identifier hashes of a chunk of records, in count() order
+            number: Number rings as chunks arrive; when False, chunks can
+                come in any order and ring_id holds a key unique to each ring
+                (hashes must be indexed by row position) for number_rings()
+
+        Returns:
+            DataFrame on the index of hashes with ring_id (numbered in order
+            of the first record of each ring), ring_size (beneficiaries in the
+            ring) and shared_links (other beneficiaries holding each of the
+            record's identifiers, summed over identifiers)
+        """
+        nodes = self._nodes(hashes)
+        first = self._first(nodes)
+        linked = first >= 0
+        rings = np.full(len(first), -1, dtype=np.int64)
+        rings[linked] = self._labels[first[linked]]
+
+        ring_size = np.ones(len(first), dtype=np.int64)
+        ring_size[linked] = self._sizes[rings[linked]]
+        shared_links = np.zeros(len(first), dtype=np.int64)
+        for column in nodes.T:
+            shared = column >= 0
+            shared_links[shared] += self._degree[column[shared]] - 1
+
+        if not number:
+            keys = np.where(linked, rings, -1 - hashes.index.to_numpy(dtype=np.int64))
+            return pd.DataFrame({
+                'ring_id': keys, 'ring_size': ring_size, 'shared_links': shared_links
+            }, index=hashes.index)
+
+        # Unlinked records are rings of their own; numbering continues across chunks
+        codes, uniques = pd.factorize(np.where(linked, rings, -1 - np.arange(len(first))))
+        ids = np.full(len(uniques), -1, dtype=np.int64)
+        known = uniques >= 0
+        ids[known] = self._ring_ids[uniques[known]]
+        new = ids < 0
+        ids[new] = self._next_ring + np.arange(int(new.sum()))
+        self._next_ring += int(new.sum())
+        self._ring_ids[uniques[known]] = ids[known]
+
+        return pd.DataFrame({
+            'ring_id': ids[codes].astype(np.int32),
+            'ring_size': ring_size,
+            'shared_links': shared_links,
+        }, index=hashes.index)
+
+    @staticmethod
+    def number_rings(keys: pd.Series) -> np.ndarray:
+        """
+        Number ring keys from assign(number=False) like assign() would.
+
+        Args:
+            keys: Ring key of every record, in file order
+
+        Returns:
+            int32 ring_id per record, in order of the first record of each ring
+        """
+        return pd.factorize(keys)[0].astype(np.int32)
+
+    def link(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add ring features to a complete dataset.
+
+        Args:
+            df: Records with the identifier columns
+
+        Returns:
+            DataFrame with ring_id, ring_size and shared_links columns added
+        """
+        graph = IdentityGraph(self.attributes, self.max_degree)
+        hashes = graph.hashes(df)
+        graph.count(hashes)
+        graph.connect(hashes)
+        graph.components()
+        rings = graph.assign(hashes)
+        for column in rings.columns:
+            df[column] = rings[column].to_numpy()
+        return df
+
+    def _build_nodes(self) -> None:
+        """Turn the value counts into nodes for the shared, non-hub values."""
+        degrees, offset = [], 0
+        for attribute in self.attributes:
+            tables = self._counts[attribute]
+            counts = pd.concat(tables).groupby(level=0, sort=False).sum() if tables else pd.Series(dtype="int64")
+            hubs = counts > self.max_degree
+            if hubs.any():
+                logger.warning(
+                    "Skipping %d %s values shared by more than %d records",
+                    int(hubs.sum()), attribute, self.max_degree
+                )
+            shared = counts[(counts > 1) & ~hubs]
+            self._values[attribute] = pd.Index(shared.index.to_numpy(dtype=np.uint64))
+            self._offsets[attribute] = offset
+            offset += len(shared)
+            degrees.append(shared.to_numpy(dtype=np.int64))
+        self._counts = {}
+        self._degree = np.concatenate(degrees) if degrees else np.zeros(0, dtype=np.int64)
+        self._members = np.zeros(len(self._degree), dtype=np.int64)
+
+    def _nodes(self, hashes: pd.DataFrame) -> np.ndarray:
+        """Node of each record's value per attribute, -1 where the value is not shared."""
+        nodes = np.full((len(hashes), len(self.attributes)), -1, dtype=np.int64)
+        for j, attribute in enumerate(self.attributes):
+            codes = self._values[attribute].get_indexer(hashes[attribute].to_numpy())
+            nodes[:, j] = np.where(codes >= 0, codes + self._offsets[attribute], -1)
+        return nodes
+
+    @staticmethod
+    def _first(nodes: np.ndarray) -> np.ndarray:
+        """First shared-value node of each record, -1 for records sharing nothing."""
+        linked = nodes >= 0
+        first = nodes[np.arange(len(nodes)), linked.argmax(axis=1)]
+        first[~linked.any(axis=1)] = -1
+        return first
+
+    def lookup(self, df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """
+        Index the identifiers of a linked dataset for extend().
+
+        Args:
+            df: Dataset with the identifier columns and the ring_id and
+                ring_size columns from link()
+
+        Returns:
+            Per attribute, a DataFrame indexed by identifier hash with the
+            ring_id and ring_size of its holders and its degree
+        """
+        tables = {}
+        for attribute, values in self.keys(df).items():
+            present = values.notna().to_numpy()
+            holders = pd.DataFrame({
+                'ring_id': df['ring_id'].to_numpy()[present],
+                'ring_size': df['ring_size'].to_numpy()[present],
+            }, index=pd.util.hash_pandas_object(values[present], index=False).to_numpy())
+            grouped = holders.groupby(level=0, sort=False)
+            tables[attribute] = grouped.first().assign(degree=grouped.size())
+        return tables
+
+    def extend(self, df: pd.DataFrame, tables: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """
+        Add the ring features new records would get if appended to a linked dataset.
+
+        New records join the rings of existing holders of their identifiers
+        and each other, so ring_size counts every ring they merge.
+
+        Args:
+            df: New records with the identifier columns
+            tables: Identifier index of the linked dataset from lookup()
+
+        Returns:
+            DataFrame with ring_size and shared_links columns added
+        """
+        m = len(df)
+        empty = np.zeros(0, dtype=np.int64)
+        edge_rows, edge_nodes, ring_rows, ring_ids = [empty], [empty], [empty], [empty]
+        ring_sizes: Dict[int, int] = {}
+        shared_links = np.zeros(m, dtype=np.int64)
+        n_nodes = m
+
+        for attribute, values in self.keys(df).items():
+            present = values.notna().to_numpy()
+            hashes = pd.util.hash_pandas_object(values.fillna(''), index=False).to_numpy()
+            table = tables.get(attribute)
+            known = table.reindex(hashes) if table is not None else pd.DataFrame(
+                np.nan, index=hashes, columns=['ring_id', 'ring_size', 'degree']
+            )
+            codes = pd.factorize(hashes)[0]
+            degree = known['degree'].fillna(0).to_numpy() + np.bincount(codes)[codes]
+            linking = present & (degree > 1) & (degree <= self.max_degree)
+            shared_links += np.where(linking, degree - 1, 0).astype(np.int64)
+
+            # Records of this batch sharing a value link through its node
+            edge_rows.append(np.flatnonzero(linking))
+            edge_nodes.append(codes[linking] + n_nodes)
+            n_nodes += codes.max() + 1 if m else 0
+
+            # Existing holders link through their ring
+            joins = linking & known['ring_id'].notna().to_numpy()
+            ring_rows.append(np.flatnonzero(joins))
+            ring_ids.append(known['ring_id'].to_numpy()[joins].astype(np.int64))
+            ring_sizes.update(zip(ring_ids[-1].tolist(), known['ring_size'].to_numpy()[joins].tolist()))
+
+        rings, ring_codes = np.unique(np.concatenate(ring_ids), return_inverse=True)
+        rows = np.concatenate(edge_rows + ring_rows)
+        nodes = np.concatenate(edge_nodes + [ring_codes + n_nodes])
+        n_nodes += len(rings)
+        graph = sp.csr_matrix(
+            (np.ones(len(rows), dtype=np.int8), (rows, nodes)), shape=(n_nodes, n_nodes)
+        )
+        _, labels = connected_components(graph, directed=False)
+
+        # Ring size is the new records of the component plus every existing ring it merges
+        sizes = np.bincount(labels[:m], minlength=n_nodes).astype(np.int64)
+        existing = np.array([ring_sizes[r] for r in rings.tolist()], dtype=np.int64)
+        np.add.at(sizes, labels[n_nodes - len(rings):], existing)
+        df['ring_size'] = sizes[labels[:m]]
+        df['shared_links'] = shared_links
+        return df
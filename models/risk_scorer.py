@@ -3,6 +3,7 @@ import pandas as pd
 from typing import Dict
 from config import RISK_WEIGHTS
 from utils.logger import setup_logger
+from utils.metrics import instrument
 
 logger = setup_logger(__name__)
 
@@ -17,8 +18,9 @@ class RiskScorer:
             weights: Dictionary of feature weights for risk calculation
         """
         self.weights = weights or RISK_WEIGHTS
-        logger.info(f"Initialized RiskScorer with weights={self.weights}")
+        logger.debug("Initialized RiskScorer with weights=%s", self.weights)
     
+    @instrument("risk.calculate")
     def calculate_risk(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Calculate risk scores for all beneficiaries.
@@ -33,7 +35,7 @@ class RiskScorer:
             required_cols = ['same_bank_count', 'same_address_count', 'anomaly']
             if not all(col in df.columns for col in required_cols):
                 missing = [col for col in required_cols if col not in df.columns]
-                logger.error(f"Missing required columns: {missing}")
+                logger.error("Missing required columns: %s", missing)
                 return df
             
             df['risk_score'] = (
@@ -42,11 +44,20 @@ class RiskScorer:
                 (df['anomaly'] == -1).astype(int) * self.weights['anomaly_multiplier']
             )
             
-            high_risk = (df['risk_score'] > 10).sum()
-            logger.info(f"Calculated risk scores. {high_risk} high-risk beneficiaries found")
+            # Records resolved into a shared entity cluster add risk per extra member
+            if 'cluster_size' in df.columns and 'cluster_size' in self.weights:
+                df['risk_score'] += (df['cluster_size'] - 1) * self.weights['cluster_size']
+            
+            # Records linked into a ring through shared identifiers add risk per extra member
+            if 'ring_size' in df.columns and 'ring_size' in self.weights:
+                df['risk_score'] += (df['ring_size'] - 1) * self.weights['ring_size']
+            
+            logger.debug(
+                "Calculated risk scores. %d high-risk beneficiaries found", (df['risk_score'] > 10).sum()
+            )
             
             return df
         
         except Exception as e:
-            logger.error(f"Error calculating risk scores: {str(e)}")
+            logger.error("Error calculating risk scores: %s", e)
             return df
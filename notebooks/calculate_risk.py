@@ -3,8 +3,9 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from config import ANOMALY_OUTPUT, RISK_OUTPUT
-from utils.data_loader import load_csv, save_csv
+import pandas as pd
+from config import ANOMALY_OUTPUT, RISK_OUTPUT, API_STORE, RISK_STORE
+from utils.data_loader import load_data, save_data, save_sqlite
 from utils.logger import setup_logger
 from models import RiskScorer
 
@@ -20,21 +21,49 @@ def calculate_risk_scores() -> bool:
     logger.info("Starting risk score calculation")
     
     # Load anomaly data
-    df = load_csv(ANOMALY_OUTPUT)
+    df = load_data(ANOMALY_OUTPUT)
     if df is None:
         return False
     
     # Calculate risk scores
-    scorer = RiskScorer()
-    df = scorer.calculate_risk(df)
+    df = apply_risk_scores(df)
     
     # Save results
-    if save_csv(df, RISK_OUTPUT):
+    if save_risk_output(df):
         logger.info("Risk calculation complete")
         return True
     
     return False
 
+def apply_risk_scores(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Score beneficiaries by risk.
+    
+    Args:
+        df: Data with feature and anomaly columns
+        
+    Returns:
+        DataFrame with risk_score column added
+    """
+    scorer = RiskScorer()
+    return scorer.calculate_risk(df)
+
+def save_risk_output(df: pd.DataFrame) -> bool:
+    """
+    Save the risk output, and load it into the serving store if one is used.
+    
+    Args:
+        df: Risk output
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    if not save_data(df, RISK_OUTPUT):
+        return False
+    if API_STORE == "sqlite":
+        return save_sqlite(df, RISK_STORE)
+    return True
+
 if __name__ == "__main__":
     success = calculate_risk_scores()
     exit(0 if success else 1)
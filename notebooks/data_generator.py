@@ -1,34 +1,261 @@
-"""Generate synthetic beneficiary data."""
+"""Generate synthetic beneficiary data with injected fraud patterns."""
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from faker import Faker
+import argparse
+import numpy as np
 import pandas as pd
-import random
-from config import BENEFICIARIES_RAW
-
-fake = Faker()
-
-data = []
-
-for i in range(1000):
-    data.append({
-        "beneficiary_id": i,
-        "name": fake.name(),
-        "phone": fake.phone_number(),
-        "address": fake.address(),
-        "bank_account": random.randint(10000000,99999999),
-        "scheme": random.choice(["Food Subsidy","Farmer Aid","Scholarship"]),
-        "amount": random.choice([2000,5000,10000]),
-        "district": fake.city(),
-        "date": fake.date()
+from faker import Faker
+from typing import Iterator, Tuple
+from config import BENEFICIARIES_RAW, DISTRICTS_REFERENCE
+from utils.data_loader import ChunkedWriter
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SCHEMES = ["Food Subsidy", "Farmer Aid", "Scholarship"]
+AMOUNTS = [2000, 5000, 10000]
+
+# Average number of records per shared bank account or address
+SHARED_GROUP_SIZE = 4
+
+# Account numbers: unique ones map the row index through a bijection of
+# [0, 10**11), shared (mule) accounts use a disjoint range
+ACCOUNT_SPACE = 10**11
+ACCOUNT_MULTIPLIER = 2654435761
+
+DATE_RANGE = (np.datetime64("2018-01-01"), np.datetime64("2026-01-01"))
+
+def generate_beneficiaries(
+    n_rows: int,
+    seed: int = 42,
+    shared_bank_rate: float = 0.02,
+    shared_address_rate: float = 0.03,
+    duplicate_name_rate: float = 0.01,
+    abnormal_amount_rate: float = 0.005,
+    chunk_size: int = 1_000_000
+) -> pd.DataFrame:
+    """
+    Generate beneficiary records in memory.
+
+    Args:
+        n_rows: Number of records
+        seed: Random seed; the same arguments always give the same data
+        shared_bank_rate: Fraction of records paid into a shared (mule) account
+        shared_address_rate: Fraction of records registered at a shared address
+        duplicate_name_rate: Fraction of records that re-enroll another
+            beneficiary of the same chunk under a slightly altered name
+        abnormal_amount_rate: Fraction of records with an off-schedule amount
+        chunk_size: Records generated per vectorized batch
+
+    Returns:
+        DataFrame with the raw beneficiary columns
+    """
+    chunks = iter_beneficiaries(
+        n_rows, seed, shared_bank_rate, shared_address_rate,
+        duplicate_name_rate, abnormal_amount_rate, chunk_size
+    )
+    return pd.concat(list(chunks), ignore_index=True)
+
+def iter_beneficiaries(
+    n_rows: int,
+    seed: int = 42,
+    shared_bank_rate: float = 0.02,
+    shared_address_rate: float = 0.03,
+    duplicate_name_rate: float = 0.01,
+    abnormal_amount_rate: float = 0.005,
+    chunk_size: int = 1_000_000
+) -> Iterator[pd.DataFrame]:
+    """
+    Generate beneficiary records chunk by chunk in constant memory.
+
+    Name, street and district pools are drawn once with Faker; every chunk is
+    then assembled with vectorized NumPy operations from its own seeded
+    generator. Shared accounts and addresses come from global pools, so
+    sharing crosses chunk boundaries.
+
+    Args:
+        n_rows: Number of records
+        seed: Random seed
+        shared_bank_rate: Fraction of records paid into a shared account
+        shared_address_rate: Fraction of records registered at a shared address
+        duplicate_name_rate: Fraction of near-duplicate re-enrollments
+        abnormal_amount_rate: Fraction of records with an off-schedule amount
+        chunk_size: Records per chunk
+
+    Yields:
+        DataFrames of at most chunk_size records
+    """
+    rng = np.random.default_rng(seed)
+    first_names, last_names, streets = _name_pools(seed)
+    districts = pd.read_csv(DISTRICTS_REFERENCE)["district"].to_numpy(dtype=object)
+    # Skewed district sizes, like real enrollment
+    district_weights = rng.dirichlet(np.full(len(districts), 0.8))
+
+    n_bank_groups = max(1, round(n_rows * shared_bank_rate / SHARED_GROUP_SIZE))
+    n_address_groups = max(1, round(n_rows * shared_address_rate / SHARED_GROUP_SIZE))
+    shared_addresses = _addresses(
+        rng, n_address_groups, streets, districts[rng.integers(0, len(districts), n_address_groups)]
+    )
+
+    for chunk_index, start in enumerate(range(0, n_rows, chunk_size)):
+        size = min(chunk_size, n_rows - start)
+        chunk_rng = np.random.default_rng([seed, chunk_index])
+        yield _chunk(
+            chunk_rng, start, size, first_names, last_names, streets,
+            districts, district_weights, n_bank_groups, shared_addresses,
+            shared_bank_rate, shared_address_rate, duplicate_name_rate,
+            abnormal_amount_rate
+        )
+
+def write_beneficiaries(file_path: Path = BENEFICIARIES_RAW, n_rows: int = 1000, **kwargs) -> bool:
+    """
+    Generate records and stream them to a CSV or Parquet file.
+
+    Args:
+        file_path: Destination path
+        n_rows: Number of records
+        **kwargs: Rates, seed and chunk_size for iter_beneficiaries()
+
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        with ChunkedWriter(file_path) as writer:
+            for chunk in iter_beneficiaries(n_rows, **kwargs):
+                writer.write(chunk)
+        return True
+
+    except Exception as e:
+        logger.error(f"Error generating data to {file_path}: {str(e)}")
+        return False
+
+def _name_pools(seed: int, size: int = 5000) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Draw unique first names, last names and street names once with Faker."""
+    fake = Faker("en_IN")
+    fake.seed_instance(seed)
+    first = sorted({fake.first_name() for _ in range(size)})
+    last = sorted({fake.last_name() for _ in range(size)})
+    streets = sorted({fake.street_name() for _ in range(size)})
+    return (
+        np.array(first, dtype=object), np.array(last, dtype=object), np.array(streets, dtype=object)
+    )
+
+def _addresses(
+    rng: np.random.Generator,
+    size: int,
+    streets: np.ndarray,
+    districts: np.ndarray
+) -> np.ndarray:
+    """Assemble "house, street, district PIN" addresses."""
+    houses = rng.integers(1, 1000, size).astype(str).astype(object)
+    pins = rng.integers(110001, 855118, size).astype(str).astype(object)
+    return houses + ", " + streets[rng.integers(0, len(streets), size)] + ", " + districts + " " + pins
+
+def _chunk(
+    rng: np.random.Generator,
+    start: int,
+    size: int,
+    first_names: np.ndarray,
+    last_names: np.ndarray,
+    streets: np.ndarray,
+    districts: np.ndarray,
+    district_weights: np.ndarray,
+    n_bank_groups: int,
+    shared_addresses: np.ndarray,
+    shared_bank_rate: float,
+    shared_address_rate: float,
+    duplicate_name_rate: float,
+    abnormal_amount_rate: float
+) -> pd.DataFrame:
+    """Build one chunk of records starting at global row index start."""
+    ids = np.arange(start, start + size, dtype=np.int64)
+
+    names = first_names[rng.integers(0, len(first_names), size)] + " " + \
+        last_names[rng.integers(0, len(last_names), size)]
+    phones = "+91 " + rng.integers(6 * 10**9, 10**10, size).astype(str).astype(object)
+    district = districts[rng.choice(len(districts), size, p=district_weights)]
+    addresses = _addresses(rng, size, streets, district)
+
+    accounts = ACCOUNT_SPACE + (ids * ACCOUNT_MULTIPLIER) % ACCOUNT_SPACE
+    shared = rng.random(size) < shared_bank_rate
+    groups = rng.integers(0, n_bank_groups, int(shared.sum()))
+    accounts[shared] = 2 * ACCOUNT_SPACE + (groups * ACCOUNT_MULTIPLIER) % ACCOUNT_SPACE
+
+    shared = rng.random(size) < shared_address_rate
+    addresses[shared] = shared_addresses[rng.integers(0, len(shared_addresses), int(shared.sum()))]
+
+    amounts = rng.choice(AMOUNTS, size)
+    abnormal = rng.random(size) < abnormal_amount_rate
+    amounts[abnormal] = rng.integers(200, 5000, int(abnormal.sum())) * 100
+
+    days = (DATE_RANGE[1] - DATE_RANGE[0]).astype(int)
+    dates = (DATE_RANGE[0] + rng.integers(0, days, size)).astype(str).astype(object)
+
+    df = pd.DataFrame({
+        "beneficiary_id": ids,
+        "name": names,
+        "phone": phones,
+        "address": addresses,
+        "bank_account": accounts,
+        "scheme": rng.choice(SCHEMES, size).astype(object),
+        "amount": amounts,
+        "district": district,
+        "date": dates,
     })
+    return _inject_duplicates(rng, df, duplicate_name_rate)
+
+def _inject_duplicates(rng: np.random.Generator, df: pd.DataFrame, rate: float) -> pd.DataFrame:
+    """Turn a fraction of records into re-enrollments of other records with altered names."""
+    targets = np.flatnonzero(rng.random(len(df)) < rate)
+    if len(targets) == 0:
+        return df
+    sources = rng.integers(0, len(df), len(targets))
+
+    names = df["name"].to_numpy()[sources]
+    tokens = pd.Series(names).str.split(" ", n=1, expand=True).reindex(columns=[0, 1]).fillna("")
+    first, last = tokens[0].to_numpy(dtype=object), tokens[1].to_numpy(dtype=object)
+    variant = rng.integers(0, 4, len(targets))
+    altered = np.select(
+        [variant == 0, variant == 1, variant == 2],
+        [last + " " + first, first + "a " + last, "Mr. " + names],  # swap, typo, honorific
+        pd.Series(names).str.upper().to_numpy(dtype=object)         # case
+    )
+
+    # Same person: same address and district, usually the same phone, new account
+    df.loc[targets, "name"] = altered
+    df.loc[targets, "address"] = df["address"].to_numpy()[sources]
+    df.loc[targets, "district"] = df["district"].to_numpy()[sources]
+    keep_phone = rng.random(len(targets)) < 0.5
+    df.loc[targets[keep_phone], "phone"] = df["phone"].to_numpy()[sources[keep_phone]]
+    return df
 
-# Ensure directory exists
-BENEFICIARIES_RAW.parent.mkdir(parents=True, exist_ok=True)
+def main() -> bool:
+    """Parse command-line options and write the raw beneficiary file."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000, help="number of records")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--shared-bank-rate", type=float, default=0.02)
+    parser.add_argument("--shared-address-rate", type=float, default=0.03)
+    parser.add_argument("--duplicate-name-rate", type=float, default=0.01)
+    parser.add_argument("--abnormal-amount-rate", type=float, default=0.005)
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--output", type=Path, default=BENEFICIARIES_RAW)
+    args = parser.parse_args()
 
-df = pd.DataFrame(data)
-df.to_csv(BENEFICIARIES_RAW, index=False)
+    logger.info(f"Generating {args.rows} records to {args.output}")
+    success = write_beneficiaries(
+        args.output, args.rows, seed=args.seed,
+        shared_bank_rate=args.shared_bank_rate,
+        shared_address_rate=args.shared_address_rate,
+        duplicate_name_rate=args.duplicate_name_rate,
+        abnormal_amount_rate=args.abnormal_amount_rate,
+        chunk_size=args.chunk_size
+    )
+    if success:
+        print(f"Dataset generated! Saved to {args.output}")
+    return success
 
-print(f"Dataset generated! Saved to {BENEFICIARIES_RAW}")
+if __name__ == "__main__":
+    exit(0 if main() else 1)
@@ -3,8 +3,12 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from config import PROCESSED_DATA, ANOMALY_OUTPUT
-from utils.data_loader import load_csv, save_csv
+import pandas as pd
+from typing import Optional
+from config import (
+    PROCESSED_DATA, ANOMALY_OUTPUT, ANOMALY_FEATURES, ANOMALY_MODEL_PATH, ANOMALY_REFIT
+)
+from utils.data_loader import load_data, save_data
 from utils.logger import setup_logger
 from models import AnomalyDetector
 
@@ -20,22 +24,62 @@ def run_anomaly_detection() -> bool:
     logger.info("Starting anomaly detection")
     
     # Load processed data
-    df = load_csv(PROCESSED_DATA)
+    df = load_data(PROCESSED_DATA)
     if df is None:
         return False
     
     # Run anomaly detection
-    detector = AnomalyDetector()
-    features = ['amount', 'same_bank_count', 'same_address_count']
-    df = detector.detect(df, features)
+    df = apply_anomaly_detection(df)
     
     # Save results
-    if save_csv(df, ANOMALY_OUTPUT):
+    if save_data(df, ANOMALY_OUTPUT):
         logger.info("Anomaly detection complete")
         return True
     
     return False
 
+def apply_anomaly_detection(df: pd.DataFrame, refit: bool = ANOMALY_REFIT) -> pd.DataFrame:
+    """
+    Flag anomalous beneficiaries.
+    
+    With refit disabled, the saved model is reused when it was trained on
+    ANOMALY_FEATURES; otherwise a new model is fitted and saved.
+    
+    Args:
+        df: Processed data with ANOMALY_FEATURES columns
+        refit: Train a new model instead of reusing the saved one
+        
+    Returns:
+        DataFrame with anomaly and anomaly_score columns added
+    """
+    detector = load_or_fit_detector(df, refit)
+    return detector.predict(df) if detector is not None else df
+
+def load_or_fit_detector(df: pd.DataFrame, refit: bool = ANOMALY_REFIT) -> Optional[AnomalyDetector]:
+    """
+    Return the saved anomaly model, or fit and save a new one on df.
+    
+    Args:
+        df: Processed data with ANOMALY_FEATURES columns
+        refit: Train a new model instead of reusing the saved one
+        
+    Returns:
+        Fitted AnomalyDetector, None if fitting failed
+    """
+    if not refit and ANOMALY_MODEL_PATH.exists():
+        detector = AnomalyDetector.load(ANOMALY_MODEL_PATH)
+        if detector is not None and detector.features == ANOMALY_FEATURES:
+            return detector
+        logger.warning("Saved anomaly model is unusable, refitting")
+    
+    try:
+        detector = AnomalyDetector().fit(df, ANOMALY_FEATURES)
+    except Exception as e:
+        logger.error(f"Error detecting anomalies: {str(e)}")
+        return None
+    detector.save(ANOMALY_MODEL_PATH)
+    return detector
+
 if __name__ == "__main__":
     success = run_anomaly_detection()
     exit(0 if success else 1)
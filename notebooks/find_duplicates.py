@@ -3,30 +3,52 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from config import PROCESSED_DATA
-from utils.data_loader import load_csv
+from config import PROCESSED_DATA, DUPLICATE_INDEX, DUPLICATE_BLOCK_COLUMNS
+from utils.data_loader import load_data
 from utils.logger import setup_logger
 from models import DuplicateDetector
 
 logger = setup_logger(__name__)
 
-def find_duplicates() -> bool:
+def find_duplicates(report_recall: bool = False, full_rescan: bool = False) -> bool:
     """
     Find potential duplicate beneficiaries.
     
+    Records already in the persistent duplicate index are skipped; only newly
+    enrolled beneficiaries are matched against the index and then inserted.
+    
+    Args:
+        report_recall: Also run exhaustive matching and log blocking recall
+        full_rescan: Ignore the persistent index and rebuild it from scratch
+        
     Returns:
         True if successful, False otherwise
     """
     logger.info("Starting duplicate detection")
     
-    # Load processed data
-    df = load_csv(PROCESSED_DATA)
+    # Load only the columns used for matching
+    columns = ['beneficiary_id', 'name', 'phone', 'address', 'bank_account']
+    df = load_data(PROCESSED_DATA, columns=columns + DUPLICATE_BLOCK_COLUMNS)
     if df is None:
         return False
     
+    # Load the persistent index, falling back to a full rescan
+    detector = None
+    if not full_rescan and DUPLICATE_INDEX.exists():
+        detector = DuplicateDetector.load(DUPLICATE_INDEX)
+    if detector is None:
+        detector = DuplicateDetector()
+    
+    new_records = df[~df['beneficiary_id'].isin(detector.indexed_ids)]
+    logger.info(f"Matching {len(new_records)} new records against the duplicate index")
+    
     # Find duplicates
-    detector = DuplicateDetector()
-    duplicates = detector.find_duplicates(df)
+    duplicates = detector.add(new_records)
+    if not detector.save(DUPLICATE_INDEX):
+        return False
+    
+    if report_recall:
+        detector.blocking_recall(df)
     
     # Display results
     if duplicates:
@@ -40,5 +62,8 @@ def find_duplicates() -> bool:
     return True
 
 if __name__ == "__main__":
-    success = find_duplicates()
+    success = find_duplicates(
+        report_recall="--recall" in sys.argv,
+        full_rescan="--full" in sys.argv
+    )
     exit(0 if success else 1)
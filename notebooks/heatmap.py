@@ -4,42 +4,133 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import folium
+import numpy as np
 import pandas as pd
-from config import RISK_OUTPUT
-from utils.data_loader import load_csv
+from folium.plugins import HeatMap
+from typing import Optional
+from config import (
+    AGGREGATES_OUTPUT, RISK_OUTPUT, DISTRICTS_REFERENCE, HEATMAP_BIN_DEGREES, HEATMAP_WEIGHT
+)
+from utils.aggregates import INPUT_COLUMNS, MEASURES, build_cube, load_cube
+from utils.data_loader import load_csv, load_data
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# Measures summed per geo-bin; mean_risk_score is derived from the sums
+BIN_MEASURES = [m for m in MEASURES if m != "risk_score_sum"]
+
+def load_gazetteer(file_path: Path = DISTRICTS_REFERENCE) -> Optional[pd.DataFrame]:
+    """
+    Load the district coordinate lookup table.
+
+    Args:
+        file_path: CSV with district, latitude and longitude columns
+
+    Returns:
+        DataFrame indexed by district if successful, None otherwise
+    """
+    gazetteer = load_csv(
+        file_path, required_columns=['district', 'latitude', 'longitude'], optimize=False
+    )
+    if gazetteer is None:
+        return None
+    return gazetteer.drop_duplicates('district').set_index('district')[['latitude', 'longitude']]
+
+def geo_bins(
+    cube: pd.DataFrame,
+    gazetteer: pd.DataFrame,
+    bin_degrees: float = HEATMAP_BIN_DEGREES
+) -> pd.DataFrame:
+    """
+    Sum aggregate cells into geographic bins.
+
+    Args:
+        cube: District x scheme x month cube from build_cube()
+        gazetteer: Coordinates by district from load_gazetteer()
+        bin_degrees: Grid cell size in degrees; 0 keeps one bin per district
+
+    Returns:
+        One row per bin with latitude, longitude, the number of districts,
+        the summed measures and mean_risk_score
+    """
+    districts = cube.groupby('district', sort=False)[MEASURES].sum()
+    located = districts.join(gazetteer, how='inner')
+    unknown = districts.index.difference(gazetteer.index)
+    if len(unknown):
+        logger.warning(
+            "No coordinates for %d districts (%d records), left off the map: %s",
+            len(unknown), int(districts.loc[unknown, 'records'].sum()), list(unknown[:10])
+        )
+
+    if bin_degrees > 0:
+        # Snap to the grid cell centre so nearby districts share a bin
+        for column in ('latitude', 'longitude'):
+            located[column] = (np.floor(located[column] / bin_degrees) + 0.5) * bin_degrees
+    located['districts'] = 1
+    bins = located.groupby(['latitude', 'longitude'], sort=False)[['districts'] + MEASURES].sum()
+    bins['mean_risk_score'] = bins['risk_score_sum'] / bins['records']
+    return bins.drop(columns='risk_score_sum').reset_index()
+
+def load_aggregates() -> Optional[pd.DataFrame]:
+    """Load the pipeline's aggregate cube, building it from the risk output if missing."""
+    if AGGREGATES_OUTPUT.exists():
+        return load_cube(AGGREGATES_OUTPUT)
+    logger.info(f"No aggregates at {AGGREGATES_OUTPUT}, building them from {RISK_OUTPUT}")
+    df = load_data(RISK_OUTPUT, columns=INPUT_COLUMNS)
+    return build_cube(df) if df is not None else None
+
 def generate_heatmap():
     """Generate heatmap of risk scores."""
     logger.info("Generating risk heatmap")
-    
-    df = load_csv(RISK_OUTPUT)
-    if df is None:
-        logger.error("Failed to load risk data")
+
+    # Work on pre-aggregated cells so the map scales with bins, not beneficiaries
+    cube = load_aggregates()
+    gazetteer = load_gazetteer()
+    if cube is None or gazetteer is None:
+        logger.error("Failed to load risk aggregates or district coordinates")
+        return False
+
+    bins = geo_bins(cube, gazetteer)
+    if HEATMAP_WEIGHT not in bins.columns:
+        logger.error(f"Unknown heatmap weight {HEATMAP_WEIGHT}, expected one of {BIN_MEASURES + ['mean_risk_score']}")
         return False
-    
+    weights = bins[HEATMAP_WEIGHT].to_numpy(dtype=np.float64)
+    if len(weights) and weights.max() > 0:
+        weights = weights / weights.max()
+
     # Center map on India
     m = folium.Map(location=[20.59, 78.96], zoom_start=5)
-    
-    # Add markers for high-risk beneficiaries
-    high_risk = df[df['risk_score'] > 5].head(100)
-    
-    for _, row in high_risk.iterrows():
-        # Use actual coordinates if available, otherwise use default
+
+    # One weighted point per bin
+    HeatMap(
+        np.column_stack([bins['latitude'], bins['longitude'], weights]).tolist(),
+        name=f"Heat by {HEATMAP_WEIGHT}",
+        radius=25,
+        blur=15
+    ).add_to(m)
+
+    # One marker per bin carrying its totals
+    markers = folium.FeatureGroup(name="Bin totals", show=False)
+    for row in bins.itertuples(index=False):
         folium.CircleMarker(
-            location=[20.59, 78.96],  # TODO: Add actual lat/lon to data
-            radius=min(row['risk_score'], 20),
-            popup=f"ID: {row['beneficiary_id']}<br>Risk: {row['risk_score']}",
+            location=[row.latitude, row.longitude],
+            radius=4,
+            popup=(
+                f"Records: {row.records}<br>Anomalies: {row.anomalies}<br>"
+                f"High risk: {row.high_risk}<br>Amount at risk: {row.amount_at_risk}<br>"
+                f"Mean risk: {row.mean_risk_score:.2f}"
+            ),
             color='red',
             fill=True,
             fillOpacity=0.6
-        ).add_to(m)
-    
+        ).add_to(markers)
+    markers.add_to(m)
+    folium.LayerControl().add_to(m)
+
     output_path = Path(__file__).parent / "heatmap.html"
     m.save(str(output_path))
-    logger.info(f"Heatmap saved to {output_path}")
+    logger.info(f"Heatmap of {len(bins)} bins ({int(bins['records'].sum())} records) saved to {output_path}")
     return True
 
 if __name__ == "__main__":
@@ -0,0 +1,354 @@
+"""Incremental pipeline updates driven by added, changed and removed records."""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pickle
+import numpy as np
+import pandas as pd
+from typing import Optional, Tuple
+from config import COUNT_FEATURES
+from utils.logger import setup_logger
+from models import AnomalyDetector, EntityResolver, IdentityGraph, RiskScorer
+from models.identity_graph import MISSING
+
+logger = setup_logger(__name__)
+
+# Bumped whenever the persisted state layout changes
+STATE_VERSION = 2
+
+RAW_COLUMNS = [
+    'beneficiary_id', 'name', 'phone', 'address',
+    'bank_account', 'scheme', 'amount', 'district', 'date'
+]
+
+# Fraud-ring features; recomputed for the rings the changed records touch
+RING_FEATURES = ["ring_size", "shared_links"]
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hash each record's raw columns.
+
+    Args:
+        df: Raw or processed beneficiary data
+
+    Returns:
+        uint64 hash per row
+    """
+    return pd.util.hash_pandas_object(df[RAW_COLUMNS], index=False).to_numpy()
+
+def build_state(
+    df: pd.DataFrame,
+    raw_digest: str,
+    output_key: Optional[str] = None,
+    resolver: Optional[EntityResolver] = None,
+    graph: Optional[IdentityGraph] = None
+) -> dict:
+    """
+    Capture what an incremental run needs from a full pipeline output.
+
+    Args:
+        df: Risk output of a full run
+        raw_digest: Digest of the raw file the output was computed from
+        output_key: Stage key of the output, lets full runs skip rebuilding
+            an up-to-date state
+        resolver: Entity resolver whose blocking keys are stored
+        graph: Identity graph whose identifier hashes are stored
+
+    Returns:
+        State dictionary with per-record hashes, entity keys, clusters,
+        identifier hashes and rings, and the group and identifier count tables
+    """
+    rows = pd.DataFrame({"row_hash": row_hashes(df)}, index=df["beneficiary_id"].to_numpy())
+    if "cluster_id" in df.columns:
+        keys = (resolver or EntityResolver()).blocking_keys(df).add_prefix("key_")
+        keys.index = rows.index
+        rows = rows.join(keys)
+        rows["cluster_id"] = df["cluster_id"].to_numpy()
+    links = None
+    if "ring_id" in df.columns:
+        hashes = (graph or IdentityGraph()).hashes(df)
+        hashes.index = rows.index
+        links = _link_counts(hashes)
+        rows = rows.join(hashes.add_prefix("hash_"))
+        rows["ring_id"] = df["ring_id"].to_numpy()
+
+    return {
+        "version": STATE_VERSION,
+        "raw_digest": raw_digest,
+        "output_key": output_key,
+        "rows": rows,
+        "counts": {column: df[column].value_counts() for column in COUNT_FEATURES.values()},
+        "links": links,
+    }
+
+def _link_counts(hashes: pd.DataFrame) -> dict:
+    """Records holding each identifier hash, per attribute."""
+    return {
+        attribute: hashes[attribute][hashes[attribute] != MISSING].value_counts()
+        for attribute in hashes.columns
+    }
+
+def save_state(state: dict, file_path: Path) -> bool:
+    """
+    Persist incremental state.
+
+    Args:
+        state: State from build_state() or apply_incremental()
+        file_path: Destination path
+
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = file_path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(file_path)
+        logger.info(f"Saved incremental state for {len(state['rows'])} records to {file_path}")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error saving incremental state to {file_path}: {str(e)}")
+        return False
+
+def load_state(file_path: Path) -> Optional[dict]:
+    """
+    Load state saved with save_state().
+
+    Args:
+        file_path: Path to the saved state
+
+    Returns:
+        State dictionary if successful, None otherwise
+    """
+    try:
+        if not file_path.exists():
+            logger.info(f"No incremental state at {file_path}")
+            return None
+
+        with open(file_path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("version") != STATE_VERSION:
+            logger.warning(
+                f"Incremental state version {state.get('version')} does not match {STATE_VERSION}"
+            )
+            return None
+        return state
+
+    except Exception as e:
+        logger.error(f"Error loading incremental state from {file_path}: {str(e)}")
+        return None
+
+def apply_incremental(
+    raw: pd.DataFrame,
+    previous: pd.DataFrame,
+    state: dict,
+    detector: AnomalyDetector,
+    raw_digest: str,
+    resolver: Optional[EntityResolver] = None,
+    scorer: Optional[RiskScorer] = None,
+    graph: Optional[IdentityGraph] = None
+) -> Optional[Tuple[pd.DataFrame, dict]]:
+    """
+    Update a previous risk output for a new version of the raw file.
+
+    Records are matched on beneficiary_id and compared by row hash. Group
+    counts are patched for the bank accounts and addresses of the changed
+    records, entities are re-resolved only for the changed records, the
+    records sharing a blocking key with them and the previous clusters of
+    both, and only rows whose features may have moved are rescored with the
+    saved model. Identifier counts are patched the same way and fraud rings
+    are relinked only for the changed records and the previous rings of the
+    changed records and of the records sharing an identifier with them; rows
+    whose ring features changed are rescored too. The rest of the previous
+    output is reused as is, so the expensive work scales with the change
+    rather than the file.
+
+    The result matches a full run with the same model except that re-resolved
+    clusters and relinked rings get fresh cluster_id and ring_id values, and
+    that hub keys skipped by a full run (more than ENTITY_MAX_BLOCK_SIZE
+    records) can still pair records here.
+
+    Args:
+        raw: New raw beneficiary data
+        previous: Risk output of the run the state describes
+        state: State from build_state() or a previous apply_incremental()
+        detector: Fitted anomaly model the previous output was scored with
+        raw_digest: Digest of the new raw file
+        resolver: Entity resolver, defaults to the configured one
+        scorer: Risk scorer, defaults to the configured one
+        graph: Empty identity graph to relink rings with, defaults to the
+            configured one; must match the graph the state was built with
+
+    Returns:
+        Tuple of (risk output in raw file order, new state), None if the
+        previous output cannot be updated incrementally
+    """
+    raw = raw.reset_index(drop=True)
+    ids = raw["beneficiary_id"].to_numpy()
+    if raw["beneficiary_id"].duplicated().any():
+        logger.error("Incremental mode requires unique beneficiary_id values")
+        return None
+
+    rows = state["rows"]
+    previous = previous.copy()
+    previous.index = previous["beneficiary_id"].to_numpy()
+    if len(previous) != len(rows) or not previous.index.isin(rows.index).all():
+        logger.error("Previous risk output does not match the incremental state")
+        return None
+
+    # Classify records: unchanged rows keep their hash, everything else is delta
+    hashes = row_hashes(raw)
+    positions = rows.index.get_indexer(ids)
+    known = positions >= 0
+    unchanged = known & (rows["row_hash"].to_numpy()[positions] == hashes)
+    is_delta = ~unchanged
+    delta = raw[is_delta]
+
+    removed = rows.index[~rows.index.isin(ids)]
+    stale_ids = removed.append(pd.Index(ids[is_delta & known]))
+    stale = previous.loc[stale_ids]
+    logger.info(
+        f"Incremental update: {int((~known).sum())} added, {int((is_delta & known).sum())} "
+        f"changed, {len(removed)} removed out of {len(raw)} records"
+    )
+
+    # Patch group counts; every record sharing an affected key is rescored
+    counts = {}
+    rescore = is_delta.copy()
+    for column in COUNT_FEATURES.values():
+        updated = (
+            state["counts"][column]
+            .sub(stale[column].value_counts(), fill_value=0)
+            .add(delta[column].value_counts(), fill_value=0)
+        )
+        counts[column] = updated[updated > 0].astype("int64")
+        affected = pd.concat([stale[column], delta[column]]).dropna().unique()
+        rescore |= raw[column].isin(affected).to_numpy()
+
+    new_rows = rows.drop(stale_ids)
+    added_rows = pd.DataFrame({"row_hash": hashes[is_delta]}, index=ids[is_delta])
+
+    clusters = None
+    if "cluster_id" in rows.columns and "cluster_id" in previous.columns:
+        resolver = resolver or EntityResolver()
+        delta_keys = resolver.blocking_keys(delta).add_prefix("key_")
+        delta_keys.index = added_rows.index
+        key_columns = [c for c in delta_keys.columns if c in rows.columns]
+
+        # Unchanged records that may now pair with a changed one
+        touched = np.zeros(len(new_rows), dtype=bool)
+        for column in key_columns:
+            touched |= new_rows[column].isin(delta_keys[column].dropna()).to_numpy()
+
+        # Whole previous clusters are re-resolved so merges and splits are exact
+        affected_clusters = pd.concat([
+            new_rows.loc[touched, "cluster_id"], rows.loc[stale_ids, "cluster_id"]
+        ]).unique()
+        members = new_rows.index[touched | new_rows["cluster_id"].isin(affected_clusters).to_numpy()]
+        in_subset = is_delta | np.isin(ids, members)
+
+        resolved = resolver.resolve(raw[in_subset].copy())
+        if "cluster_id" not in resolved.columns:
+            return None
+        offset = int(rows["cluster_id"].max()) + 1 if len(rows) else 0
+        clusters = pd.DataFrame({
+            "cluster_id": resolved["cluster_id"].to_numpy() + offset,
+            "cluster_size": resolved["cluster_size"].to_numpy(),
+        }, index=resolved["beneficiary_id"].to_numpy())
+        rescore |= in_subset
+
+        added_rows = added_rows.join(delta_keys[key_columns])
+        added_rows["cluster_id"] = clusters.loc[added_rows.index, "cluster_id"]
+
+    rings, links = None, None
+    if state.get("links") is not None and "ring_id" in previous.columns:
+        graph = graph or IdentityGraph()
+        hash_columns = ["hash_" + attribute for attribute in graph.attributes]
+        delta_hashes = graph.hashes(delta)
+        delta_hashes.index = added_rows.index
+        stale_hashes = rows.loc[stale_ids, hash_columns].set_axis(graph.attributes, axis=1)
+        links = dict(state["links"])
+        stale_links, delta_links = _link_counts(stale_hashes), _link_counts(delta_hashes)
+
+        # Values gaining or losing holders, unless they are hubs before and after
+        touched = np.zeros(len(new_rows), dtype=bool)
+        for attribute, column in zip(graph.attributes, hash_columns):
+            changed = stale_links[attribute].index.union(delta_links[attribute].index)
+            before = links[attribute].reindex(changed, fill_value=0)
+            updated = (
+                links[attribute]
+                .sub(stale_links[attribute], fill_value=0)
+                .add(delta_links[attribute], fill_value=0)
+            )
+            links[attribute] = updated[updated > 0].astype("int64")
+            after = links[attribute].reindex(changed, fill_value=0)
+            changed = changed[((before <= graph.max_degree) | (after <= graph.max_degree)).to_numpy()]
+            touched |= new_rows[column].isin(changed).to_numpy()
+
+        # Rings outside the affected ones keep exactly the same members and links
+        affected_rings = pd.concat([
+            new_rows.loc[touched, "ring_id"], rows.loc[stale_ids, "ring_id"]
+        ]).unique()
+        members = new_rows.index[new_rows["ring_id"].isin(affected_rings).to_numpy()]
+        in_rings = is_delta | np.isin(ids, members)
+        subset = pd.concat([
+            new_rows.loc[members, hash_columns].set_axis(graph.attributes, axis=1), delta_hashes
+        ]).loc[ids[in_rings]]
+
+        graph.add_counts({
+            attribute: links[attribute].reindex(subset[attribute].unique()).dropna()
+            for attribute in graph.attributes
+        })
+        graph.connect(subset)
+        graph.components()
+        rings = graph.assign(subset)
+        rings["ring_id"] += int(rows["ring_id"].max()) + 1 if len(rows) else 0
+        moved = previous[RING_FEATURES].reindex(rings.index).to_numpy() != rings[RING_FEATURES].to_numpy()
+        rescore[in_rings] |= moved.any(axis=1)
+        logger.info("Relinked %d records in %d affected rings", len(rings), len(affected_rings))
+
+        added_rows = added_rows.join(delta_hashes.add_prefix("hash_"))
+        added_rows["ring_id"] = rings.loc[added_rows.index, "ring_id"]
+
+    # Rescore affected rows with the saved model
+    scored = raw[rescore].copy()
+    for feature, column in COUNT_FEATURES.items():
+        scored[feature] = scored[column].map(counts[column])
+    if rings is not None:
+        for column in rings.columns:
+            values = scored["beneficiary_id"].map(rings[column])
+            values = values.fillna(scored["beneficiary_id"].map(previous[column]))
+            scored[column] = values.astype(previous[column].dtype)
+    if clusters is not None:
+        for column in ("cluster_id", "cluster_size"):
+            values = scored["beneficiary_id"].map(clusters[column])
+            values = values.fillna(scored["beneficiary_id"].map(previous[column]))
+            scored[column] = values.astype(previous[column].dtype)
+    scored = detector.predict(scored)
+    scored = (scorer or RiskScorer()).calculate_risk(scored)
+    scored.index = scored["beneficiary_id"].to_numpy()
+    logger.info(f"Rescored {len(scored)} of {len(raw)} records")
+
+    kept = previous[~previous.index.isin(stale_ids) & ~previous.index.isin(scored.index)]
+    df = pd.concat([kept, scored[previous.columns]]).loc[ids].reset_index(drop=True)
+    if rings is not None:
+        # Unrescored members of relinked rings still take the fresh ring_id
+        df.loc[in_rings, "ring_id"] = rings["ring_id"].to_numpy()
+
+    new_rows = pd.concat([new_rows, added_rows])
+    if clusters is not None:
+        new_rows.loc[clusters.index, "cluster_id"] = clusters["cluster_id"]
+    if rings is not None:
+        new_rows.loc[rings.index, "ring_id"] = rings["ring_id"]
+
+    return df, {
+        "version": STATE_VERSION,
+        "raw_digest": raw_digest,
+        "output_key": None,
+        "rows": new_rows,
+        "counts": counts,
+        "links": links,
+    }
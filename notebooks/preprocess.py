@@ -4,20 +4,32 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import pandas as pd
-from config import BENEFICIARIES_RAW, PROCESSED_DATA
-from utils.data_loader import load_csv, save_csv
-from utils.validators import validate_beneficiary_data
-from utils.logger import setup_logger
+from typing import List, Optional
+from config import (
+    BENEFICIARIES_RAW, PROCESSED_DATA, PREPROCESS_CHUNKSIZE, QUARANTINE_OUTPUT, FEATURE_COUNT_MODE
+)
+from utils.data_loader import ChunkedWriter, iter_csv_chunks, load_csv, save_data
+from utils.sketches import FeatureSketches
+from utils.validators import RuleValidator, quarantine_invalid, validate_beneficiary_data
+from utils.logger import ProgressLogger, setup_logger
+from models import EntityResolver, IdentityGraph
 
 logger = setup_logger(__name__)
 
-def preprocess_data() -> bool:
+def preprocess_data(chunksize: int = PREPROCESS_CHUNKSIZE) -> bool:
     """
     Preprocess raw beneficiary data with feature engineering.
     
+    Args:
+        chunksize: Stream the raw file in chunks of this many rows; 0 loads
+            it into memory at once
+    
     Returns:
         True if successful, False otherwise
     """
+    if chunksize:
+        return preprocess_streaming(chunksize)
+    
     logger.info("Starting data preprocessing")
     
     # Load raw data
@@ -25,22 +37,167 @@ def preprocess_data() -> bool:
     if df is None:
         return False
     
+    df = build_features(df)
+    if df is None:
+        return False
+    
+    # Save processed data
+    if save_data(df, PROCESSED_DATA):
+        logger.info("Preprocessing complete")
+        return True
+    
+    return False
+
+def build_features(df: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """
+    Validate raw beneficiary records and add engineered features.
+    
+    Records violating a validation rule are quarantined, not featurized.
+    
+    Args:
+        df: Raw beneficiary data
+        
+    Returns:
+        DataFrame with feature columns, None if validation fails
+    """
     # Validate data
     if not validate_beneficiary_data(df):
         logger.error("Data validation failed")
-        return False
+        return None
+    df = quarantine_invalid(df)
     
     # Feature engineering
     logger.info("Performing feature engineering")
     df["same_bank_count"] = df.groupby("bank_account")["bank_account"].transform("count")
     df["same_address_count"] = df.groupby("address")["address"].transform("count")
     
-    # Save processed data
-    if save_csv(df, PROCESSED_DATA):
+    # Fraud rings linked through shared bank accounts, addresses and phones
+    df = IdentityGraph().link(df)
+    
+    # Entity resolution across name, phone, bank account and address
+    return EntityResolver().resolve(df)
+
+def preprocess_streaming(chunksize: int) -> bool:
+    """
+    Preprocess a raw file larger than memory in three passes.
+    
+    The first pass only reads bank_account and address and accumulates their
+    counts along with the counts of every ring identifier; the second pass
+    re-reads the identifiers and links the values shared between records,
+    after which the rings are found; the third pass re-reads full chunks,
+    maps the counts and ring features and appends each chunk to the output.
+    Peak memory is set by the chunk size and the number of distinct keys, not
+    by the file size. Every pass applies the validation rules, so counts and
+    rings only include records that are kept and violating records are
+    appended to the quarantine file. Entity resolution needs the full dataset
+    and is skipped in this mode.
+    
+    With FEATURE_COUNT_MODE=sketch the counts are accumulated in fixed-size
+    Count-Min sketches instead of exact tables, so memory no longer grows
+    with the number of distinct keys.
+    
+    Args:
+        chunksize: Rows per chunk
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    logger.info("Starting streaming data preprocessing with chunksize=%d", chunksize)
+    
+    if not BENEFICIARIES_RAW.exists():
+        logger.error("File not found: %s", BENEFICIARIES_RAW)
+        return False
+    
+    try:
+        # Pass 1: group counts of valid records over the whole file
+        validator = RuleValidator(stateful=True)
+        graph = IdentityGraph()
+        sketches = FeatureSketches() if FEATURE_COUNT_MODE == "sketch" else None
+        columns = list(dict.fromkeys(
+            ["bank_account", "address", "district"] + graph.attributes + validator.columns
+        ))
+        bank_tables, address_tables = [], []
+        for chunk in iter_csv_chunks(BENEFICIARIES_RAW, chunksize, columns):
+            chunk = chunk[validator.evaluate(chunk) == 0]
+            if sketches is not None:
+                sketches.add(chunk)
+            else:
+                bank_tables = _compact_counts(bank_tables + [chunk["bank_account"].value_counts()])
+                address_tables = _compact_counts(address_tables + [chunk["address"].value_counts()])
+            graph.count(graph.hashes(chunk))
+        bank_counts = _compact_counts(bank_tables, force=True)[0].astype("int64")
+        address_counts = _compact_counts(address_tables, force=True)[0].astype("int64")
+        if sketches is not None:
+            logger.info(
+                "Sketched counts of %d records in %.1f MB", sketches.records, sketches.nbytes / 2**20
+            )
+        else:
+            logger.info(
+                "Counted %d bank accounts and %d addresses", len(bank_counts), len(address_counts)
+            )
+        
+        # Pass 2: link the identifiers valid records share, in the same order
+        validator = RuleValidator(stateful=True)
+        for chunk in iter_csv_chunks(BENEFICIARIES_RAW, chunksize, columns):
+            chunk = chunk[validator.evaluate(chunk) == 0]
+            graph.connect(graph.hashes(chunk))
+        graph.components()
+        
+        # Pass 3: validate, attach counts and rings and write chunk by chunk
+        validator = RuleValidator(stateful=True)
+        progress = ProgressLogger(logger, "Preprocessed records")
+        QUARANTINE_OUTPUT.unlink(missing_ok=True)
+        with ChunkedWriter(PROCESSED_DATA) as writer, ChunkedWriter(QUARANTINE_OUTPUT) as quarantine:
+            for i, chunk in enumerate(iter_csv_chunks(BENEFICIARIES_RAW, chunksize)):
+                # Every chunk has the file's columns; row rules are applied by split()
+                if i == 0 and not validate_beneficiary_data(chunk):
+                    logger.error("Data validation failed")
+                    return False
+                chunk, rejected = validator.split(chunk)
+                if len(rejected):
+                    quarantine.write(rejected)
+                if sketches is not None:
+                    chunk = sketches.annotate(chunk)
+                else:
+                    chunk["same_bank_count"] = chunk["bank_account"].map(bank_counts)
+                    chunk["same_address_count"] = chunk["address"].map(address_counts)
+                rings = graph.assign(graph.hashes(chunk))
+                for column in rings.columns:
+                    chunk[column] = rings[column]
+                writer.write(chunk)
+                progress.update(len(chunk) + len(rejected))
+        
+        if quarantine.rows:
+            logger.warning("Quarantined %d records to %s", quarantine.rows, QUARANTINE_OUTPUT)
+        
+        logger.warning("Entity resolution is skipped in streaming mode")
         logger.info("Preprocessing complete")
         return True
     
-    return False
+    except Exception as e:
+        logger.error("Error in streaming preprocessing: %s", e)
+        return False
+
+def _compact_counts(tables: List[pd.Series], force: bool = False) -> List[pd.Series]:
+    """
+    Sum per-chunk count tables into the running total once they outgrow it.
+    
+    Merging every chunk into the total would realign the whole table each
+    time; deferring until the pending tables are as large as the total keeps
+    the cost linear in the number of counted keys.
+    
+    Args:
+        tables: Running total followed by pending per-chunk tables
+        force: Merge regardless of size
+        
+    Returns:
+        Tables with the total first
+    """
+    if not tables:
+        return [pd.Series(dtype="int64")]
+    if force or sum(len(t) for t in tables[1:]) >= len(tables[0]):
+        return [pd.concat(tables).groupby(level=0, sort=False).sum()]
+    return tables
 
 if __name__ == "__main__":
     success = preprocess_data()
@@ -1,35 +1,492 @@
 """Main pipeline orchestrator for fraud detection system."""
+import heapq
 import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from typing import Iterator, List, Optional
+import numpy as np
+import pandas as pd
+from config import (
+    BENEFICIARIES_RAW, PROCESSED_DATA, ANOMALY_OUTPUT, RISK_OUTPUT, AGGREGATES_OUTPUT,
+    PIPELINE_VERSION_FILE, PIPELINE_CACHE_DIR, PIPELINE_STATE,
+    PIPELINE_PERSIST_INTERMEDIATE, PIPELINE_USE_CACHE, PIPELINE_INCREMENTAL,
+    PIPELINE_PARTITION_BY, PIPELINE_WORKERS, PREPROCESS_CHUNKSIZE, ANOMALY_CONTAMINATION,
+    ANOMALY_FEATURES, ANOMALY_MODEL_PATH, ANOMALY_REFIT, ENTITY_WEIGHTS,
+    ENTITY_MATCH_THRESHOLD, RISK_WEIGHTS, RUN_REPORT, PROFILE_OUTPUT, COUNT_FEATURES,
+    FEATURE_COUNT_MODE, FEATURE_SKETCHES
+)
+from utils.aggregates import build_cube, load_cube, update_cube
+from utils.artifact_cache import ArtifactCache, file_digest, stage_key
+from utils.data_loader import load_csv, load_data, save_data
 from utils.logger import setup_logger
-from notebooks.preprocess import preprocess_data
-from notebooks.detect_anomalies import run_anomaly_detection
-from notebooks.calculate_risk import calculate_risk_scores
+from utils.profiling import SamplingProfiler, StageProfiler
+from utils.sketches import FeatureSketches
+from utils.validators import DEFAULT_RULES, quarantine_invalid, validate_beneficiary_data
+from models import AnomalyDetector, EntityResolver, IdentityGraph
+from notebooks.preprocess import build_features, preprocess_streaming
+from notebooks.detect_anomalies import apply_anomaly_detection, load_or_fit_detector
+from notebooks.calculate_risk import apply_risk_scores, save_risk_output
+from notebooks.incremental import apply_incremental, build_state, load_state, save_state
 
 logger = setup_logger(__name__)
 
-def run_pipeline():
-    """Execute the complete fraud detection pipeline."""
+# Partition tasks per worker; more tasks even out skewed partition sizes
+TASKS_PER_WORKER = 4
+# Partition columns when none are configured
+DEFAULT_PARTITION_BY = ["district"]
+
+_partition_state: dict = {}
+
+def run_pipeline(
+    persist_intermediate: bool = PIPELINE_PERSIST_INTERMEDIATE,
+    use_cache: bool = PIPELINE_USE_CACHE
+) -> bool:
+    """
+    Execute the complete fraud detection pipeline.
+
+    Stages hand DataFrames to each other in memory; only the final risk
+    output and its district/scheme/month aggregates are written unless
+    persist_intermediate is set. Each stage output is cached under a hash
+    of the raw file, the stage function's source and its parameters, so
+    unchanged stages are skipped on the next run.
+
+    Args:
+        persist_intermediate: Also write the processed and anomaly artifacts
+        use_cache: Reuse and update cached stage outputs
+
+    Returns:
+        True if successful, False otherwise
+    """
     logger.info("=" * 60)
     logger.info("Starting Fraud Detection Pipeline")
     logger.info("=" * 60)
-    
+
+    anomaly_params = (ANOMALY_FEATURES, ANOMALY_CONTAMINATION, ANOMALY_REFIT)
+    if not ANOMALY_REFIT and ANOMALY_MODEL_PATH.exists():
+        # A reused model is an input of the stage
+        anomaly_params += (file_digest(ANOMALY_MODEL_PATH),)
+
     steps = [
-        ("Data Preprocessing", preprocess_data),
-        ("Anomaly Detection", run_anomaly_detection),
-        ("Risk Score Calculation", calculate_risk_scores)
+        ("Data Preprocessing", build_features,
+         (ENTITY_WEIGHTS, ENTITY_MATCH_THRESHOLD, PREPROCESS_CHUNKSIZE, DEFAULT_RULES),
+         PROCESSED_DATA),
+        ("Anomaly Detection", apply_anomaly_detection,
+         anomaly_params, ANOMALY_OUTPUT),
+        ("Risk Score Calculation", apply_risk_scores,
+         (RISK_WEIGHTS,), RISK_OUTPUT)
     ]
-    
-    for step_name, step_func in steps:
-        logger.info(f"\n--- {step_name} ---")
-        if not step_func():
-            logger.error(f"Pipeline failed at: {step_name}")
-            return False
-    
+    cache = ArtifactCache(PIPELINE_CACHE_DIR)
+
+    with StageProfiler() as profiler:
+        with profiler.stage("Hash Raw Input"):
+            if not BENEFICIARIES_RAW.exists():
+                logger.error("File not found: %s", BENEFICIARIES_RAW)
+                return False
+            raw_digest = key = file_digest(BENEFICIARIES_RAW)
+            df = None
+
+        for step_name, step_func, params, output_path in steps:
+            logger.info("\n--- %s ---", step_name)
+            with profiler.stage(step_name) as record:
+                key = stage_key(key, step_name, step_func, params)
+                cached = cache.get(step_name, key) if use_cache else None
+                record["cached"] = cached is not None
+
+                if cached is not None:
+                    logger.info("Reusing cached output of %s", step_name)
+                    df = cached
+                else:
+                    df = _run_step(step_func, df)
+                    if df is None:
+                        logger.error("Pipeline failed at: %s", step_name)
+                        return False
+                    if use_cache:
+                        cache.put(step_name, key, df)
+                record["rows"] = len(df)
+
+                if output_path == RISK_OUTPUT:
+                    saved = save_risk_output(df)
+                else:
+                    saved = not persist_intermediate or save_data(df, output_path)
+                if not saved:
+                    logger.error("Pipeline failed at: %s", step_name)
+                    return False
+
+        with profiler.stage("Aggregation") as record:
+            cube = build_cube(df)
+            record["rows"] = len(cube)
+            if not save_data(cube, AGGREGATES_OUTPUT):
+                logger.error("Pipeline failed at: Aggregation")
+                return False
+
+        with profiler.stage("Feature Sketches"):
+            if not save_feature_sketches(df):
+                logger.error("Pipeline failed at: Feature Sketches")
+                return False
+
+        state = load_state(PIPELINE_STATE)
+        if state is None or state["output_key"] != key:
+            with profiler.stage("Save Incremental State"):
+                save_state(build_state(df, raw_digest, key), PIPELINE_STATE)
+
+    publish_version()
+    profiler.log_report()
+    profiler.write_report(RUN_REPORT, mode="full")
+
     logger.info("\n" + "=" * 60)
     logger.info("Pipeline completed successfully!")
     logger.info("=" * 60)
     return True
 
+def run_incremental() -> bool:
+    """
+    Update the risk output for the records that changed since the last run.
+
+    Added, changed and removed records are found by beneficiary_id and row
+    hash against the state of the previous run, and only the rows they affect
+    are recomputed with the saved anomaly model. Falls back to a full run when
+    there is no usable previous run.
+
+    Returns:
+        True if successful, False otherwise
+    """
+    logger.info("=" * 60)
+    logger.info("Starting Incremental Fraud Detection Pipeline")
+    logger.info("=" * 60)
+
+    state = load_state(PIPELINE_STATE)
+    detector = AnomalyDetector.load(ANOMALY_MODEL_PATH) if ANOMALY_MODEL_PATH.exists() else None
+    previous = load_data(RISK_OUTPUT) if state is not None and RISK_OUTPUT.exists() else None
+    if previous is None or detector is None or detector.features != ANOMALY_FEATURES:
+        logger.warning("No usable previous run, falling back to a full run")
+        return run_pipeline()
+
+    with StageProfiler() as profiler:
+        with profiler.stage("Hash Raw Input"):
+            if not BENEFICIARIES_RAW.exists():
+                logger.error("File not found: %s", BENEFICIARIES_RAW)
+                return False
+            raw_digest = file_digest(BENEFICIARIES_RAW)
+
+        if raw_digest == state["raw_digest"]:
+            logger.info("Raw input unchanged since the last run")
+            return True
+
+        with profiler.stage("Load Raw Input") as record:
+            raw = load_csv(BENEFICIARIES_RAW)
+            if raw is None or not validate_beneficiary_data(raw):
+                logger.error("Pipeline failed at: Load Raw Input")
+                return False
+            raw = quarantine_invalid(raw)
+            record["rows"] = len(raw)
+
+        with profiler.stage("Incremental Update") as record:
+            updated = apply_incremental(raw, previous, state, detector, raw_digest)
+            if updated is not None:
+                df, state = updated
+                record["rows"] = len(df)
+
+        if updated is not None:
+            with profiler.stage("Aggregation") as record:
+                cube = load_cube(AGGREGATES_OUTPUT) if AGGREGATES_OUTPUT.exists() else None
+                # Patch the previous cube unless it does not describe the previous output
+                if cube is None or cube["records"].sum() != len(previous):
+                    cube = build_cube(df)
+                else:
+                    cube = update_cube(cube, previous, df)
+                record["rows"] = len(cube)
+
+            with profiler.stage("Save Outputs"):
+                if (
+                    not save_risk_output(df)
+                    or not save_data(cube, AGGREGATES_OUTPUT)
+                    or not save_state(state, PIPELINE_STATE)
+                    or not save_feature_sketches(df)
+                ):
+                    logger.error("Pipeline failed at: Save Outputs")
+                    return False
+
+    if updated is None:
+        logger.warning("Incremental update not possible, falling back to a full run")
+        return run_pipeline()
+
+    publish_version()
+    profiler.log_report()
+    profiler.write_report(RUN_REPORT, mode="incremental")
+
+    logger.info("\n" + "=" * 60)
+    logger.info("Incremental pipeline completed successfully!")
+    logger.info("=" * 60)
+    return True
+
+def run_partitioned(
+    partition_by: List[str] = PIPELINE_PARTITION_BY,
+    workers: int = PIPELINE_WORKERS
+) -> bool:
+    """
+    Execute the pipeline with per-partition stages spread over a process pool.
+
+    Whole partitions of the partition columns are packed into balanced tasks
+    and every per-record stage runs on the tasks in the pool: counting bank
+    accounts, addresses and identifier values, then mapping the counts and
+    ring features, then anomaly and risk scoring. Between them the parent
+    only merges the per-task count tables into global ones and finds the
+    rings on the graph of shared identifier values. Entity resolution and the
+    anomaly model fit need the whole dataset and run in the parent between
+    mapping and scoring; pair scoring uses all workers, and the fit is
+    skipped when ANOMALY_REFIT=false reuses a saved model. Outputs are merged
+    back into raw file order, so the result matches run_pipeline(). With
+    FEATURE_COUNT_MODE=sketch the counts come from per-task Count-Min
+    sketches merged into one, and are approximate.
+
+    Args:
+        partition_by: Columns to shard by, e.g. ["district", "scheme"];
+            defaults to DEFAULT_PARTITION_BY when empty
+        workers: Worker processes, 1 runs the tasks in-process
+
+    Returns:
+        True if successful, False otherwise
+    """
+    partition_by = list(partition_by) or DEFAULT_PARTITION_BY
+    logger.info("=" * 60)
+    logger.info(
+        "Starting Partitioned Fraud Detection Pipeline by %s on %d workers", partition_by, workers
+    )
+    logger.info("=" * 60)
+
+    with StageProfiler() as profiler:
+        with profiler.stage("Load Raw Input") as record:
+            if not BENEFICIARIES_RAW.exists():
+                logger.error("File not found: %s", BENEFICIARIES_RAW)
+                return False
+            raw_digest = file_digest(BENEFICIARIES_RAW)
+            df = load_csv(BENEFICIARIES_RAW)
+            if df is None or not validate_beneficiary_data(df):
+                logger.error("Pipeline failed at: Load Raw Input")
+                return False
+            df = quarantine_invalid(df)
+            missing = [c for c in partition_by if c not in df.columns]
+            if missing:
+                logger.error("Missing partition columns: %s", missing)
+                return False
+            df = df.reset_index(drop=True)
+            tasks = _partition_tasks(df, partition_by, max(workers, 1) * TASKS_PER_WORKER)
+            record["rows"] = len(df)
+            logger.info("Split %d records into %d partition tasks", len(df), len(tasks))
+
+        with profiler.stage("Partitioned Counts") as record:
+            graph = IdentityGraph()
+            count_tables = {column: [] for column in COUNT_FEATURES.values()}
+            shard_sketches, hashes = [], []
+            for result in _map_partitions(
+                _count_partition, ((df.iloc[positions],) for positions in tasks), workers, {}
+            ):
+                for column, table in result["counts"].items():
+                    count_tables[column].append(table)
+                if result["sketches"] is not None:
+                    shard_sketches.append(result["sketches"])
+                hashes.append(result["hashes"])
+                graph.count(result["hashes"])
+            counts = {
+                column: pd.concat(tables).groupby(level=0, sort=False).sum()
+                for column, tables in count_tables.items() if tables
+            }
+            sketches = FeatureSketches.merged(shard_sketches)
+            record["rows"] = len(df)
+
+        with profiler.stage("Ring Components") as record:
+            for shard in hashes:
+                graph.connect(shard)
+            graph.components()
+            record["rows"] = len(df)
+
+        with profiler.stage("Partitioned Features") as record:
+            shared = {"counts": counts, "sketches": sketches, "graph": graph}
+            df = pd.concat(_map_partitions(
+                _feature_partition,
+                ((df.iloc[shard.index], shard) for shard in hashes),
+                workers, shared
+            )).sort_index()
+            del hashes, shared
+            df["ring_id"] = IdentityGraph.number_rings(df["ring_id"])
+            record["rows"] = len(df)
+
+        with profiler.stage("Entity Resolution") as record:
+            df = EntityResolver(
+                ENTITY_WEIGHTS, ENTITY_MATCH_THRESHOLD, workers=max(workers, 1)
+            ).resolve(df)
+            record["rows"] = len(df)
+
+        with profiler.stage("Anomaly Model"):
+            detector = load_or_fit_detector(df)
+            if detector is None:
+                logger.error("Pipeline failed at: Anomaly Model")
+                return False
+
+        with profiler.stage("Partitioned Scoring") as record:
+            df = pd.concat(_map_partitions(
+                _score_partition, ((df.iloc[positions],) for positions in tasks),
+                workers, {"detector": detector}
+            )).sort_index()
+            record["rows"] = len(df)
+
+        with profiler.stage("Aggregation") as record:
+            cube = build_cube(df)
+            record["rows"] = len(cube)
+
+        with profiler.stage("Save Outputs"):
+            if (
+                not save_risk_output(df)
+                or not save_data(cube, AGGREGATES_OUTPUT)
+                or not save_feature_sketches(df, sketches)
+                or not save_state(build_state(df, raw_digest), PIPELINE_STATE)
+            ):
+                logger.error("Pipeline failed at: Save Outputs")
+                return False
+
+    publish_version()
+    profiler.log_report()
+    profiler.write_report(RUN_REPORT, mode="partitioned")
+
+    logger.info("\n" + "=" * 60)
+    logger.info("Partitioned pipeline completed successfully!")
+    logger.info("=" * 60)
+    return True
+
+def _partition_tasks(df: pd.DataFrame, partition_by: List[str], n_tasks: int) -> List[np.ndarray]:
+    """Pack whole partitions into at most n_tasks row position arrays of similar size."""
+    groups = df.groupby(partition_by, sort=False, dropna=False, observed=True).indices.values()
+    bins = [(0, i, []) for i in range(n_tasks)]
+    # Largest partitions first, each into the currently smallest task
+    for positions in sorted(groups, key=len, reverse=True):
+        size, i, members = heapq.heappop(bins)
+        members.append(positions)
+        heapq.heappush(bins, (size + len(positions), i, members))
+    return [np.sort(np.concatenate(members)) for _, _, members in sorted(bins) if members]
+
+def _init_partition_worker(shared: dict) -> None:
+    """Store the state shared by every task once per worker process."""
+    _partition_state.clear()
+    _partition_state.update(shared)
+
+def _count_partition(df: pd.DataFrame) -> dict:
+    """Count tables or sketches and identifier hashes of one task."""
+    sketches = FeatureSketches().add(df) if FEATURE_COUNT_MODE == "sketch" else None
+    return {
+        "counts": {} if sketches is not None else {
+            column: df[column].value_counts() for column in COUNT_FEATURES.values()
+        },
+        "sketches": sketches,
+        "hashes": IdentityGraph().hashes(df),
+    }
+
+def _feature_partition(df: pd.DataFrame, hashes: pd.DataFrame) -> pd.DataFrame:
+    """Map the global counts and ring features onto one task."""
+    if _partition_state["sketches"] is not None:
+        df = _partition_state["sketches"].annotate(df)
+    else:
+        for feature, column in COUNT_FEATURES.items():
+            df[feature] = df[column].map(_partition_state["counts"][column])
+    # Ring keys are numbered in file order once the tasks are merged
+    rings = _partition_state["graph"].assign(hashes, number=False)
+    for column in rings.columns:
+        df[column] = rings[column]
+    return df
+
+def _score_partition(df: pd.DataFrame) -> pd.DataFrame:
+    """Anomaly and risk stages for one task with the shared model."""
+    return apply_risk_scores(_partition_state["detector"].predict(df))
+
+def _map_partitions(func, tasks: Iterator[tuple], workers: int, shared: dict) -> Iterator:
+    """
+    Run func over task arguments, across a process pool when workers > 1.
+
+    At most twice as many tasks as workers are in flight, and results come
+    back in completion order.
+
+    Args:
+        func: Module-level task function reading _partition_state
+        tasks: Argument tuple per task
+        workers: Worker processes, 1 runs the tasks in-process
+        shared: State installed in every worker before its first task
+
+    Yields:
+        Result of each task
+    """
+    if workers <= 1:
+        _init_partition_worker(shared)
+        for args in tasks:
+            yield func(*args)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_partition_worker, initargs=(shared,)
+    ) as executor:
+        pending = set()
+        for args in tasks:
+            pending.add(executor.submit(func, *args))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
+
+def _run_step(step_func, df):
+    """Run one stage on the previous stage's output, loading raw data for the first."""
+    if df is not None:
+        return step_func(df)
+
+    if PREPROCESS_CHUNKSIZE:
+        # Streaming preprocessing writes the processed artifact itself
+        if not preprocess_streaming(PREPROCESS_CHUNKSIZE):
+            return None
+        return load_data(PROCESSED_DATA)
+
+    raw = load_csv(BENEFICIARIES_RAW)
+    return step_func(raw) if raw is not None else None
+
+def save_feature_sketches(df: pd.DataFrame, sketches: Optional[FeatureSketches] = None) -> bool:
+    """
+    Save the group-count sketches of a risk output for real-time scoring.
+
+    Outside sketch mode, sketches left by an earlier run are removed so the
+    API never scores against counts of an older output.
+
+    Args:
+        df: Risk output
+        sketches: Sketches of df if already built
+
+    Returns:
+        True if successful, False otherwise
+    """
+    if FEATURE_COUNT_MODE != "sketch":
+        FEATURE_SKETCHES.unlink(missing_ok=True)
+        return True
+    return (sketches or FeatureSketches().add(df)).save(FEATURE_SKETCHES)
+
+def publish_version() -> None:
+    """Stamp the processed outputs so the API cache reloads them."""
+    PIPELINE_VERSION_FILE.parent.mkdir(parents=True, exist_ok=True)
+    PIPELINE_VERSION_FILE.write_text(f"{time.time_ns()}\n")
+    logger.info("Published pipeline version to %s", PIPELINE_VERSION_FILE)
+
+def main() -> bool:
+    """Run the pipeline mode selected by configuration and command-line flags."""
+    if PIPELINE_INCREMENTAL or "--incremental" in sys.argv:
+        return run_incremental()
+    if PIPELINE_PARTITION_BY or "--partition" in sys.argv:
+        return run_partitioned(PIPELINE_PARTITION_BY)
+    return run_pipeline(
+        persist_intermediate=PIPELINE_PERSIST_INTERMEDIATE or "--persist" in sys.argv,
+        use_cache=PIPELINE_USE_CACHE and "--no-cache" not in sys.argv
+    )
+
 if __name__ == "__main__":
-    success = run_pipeline()
+    profile_output = PROFILE_OUTPUT or ("pipeline.folded" if "--profile" in sys.argv else "")
+    if profile_output:
+        with SamplingProfiler(profile_output):
+            success = main()
+    else:
+        success = main()
     sys.exit(0 if success else 1)
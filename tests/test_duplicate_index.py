@@ -0,0 +1,56 @@
+"""Incremental duplicate index matches a blocked scan of the whole dataset."""
+import numpy as np
+import pandas as pd
+import pytest
+from models import DuplicateDetector
+from notebooks.data_generator import iter_beneficiaries
+
+@pytest.fixture(scope="module")
+def beneficiaries() -> pd.DataFrame:
+    df = pd.concat(iter_beneficiaries(3000, duplicate_name_rate=0.05), ignore_index=True)
+    # Records sharing a name but no other identifier only pair through name keys
+    copies = df.sample(60, random_state=1).copy()
+    copies["beneficiary_id"] = np.arange(len(df), len(df) + len(copies))
+    copies["phone"] = copies["bank_account"] = copies["address"] = None
+    return pd.concat([df, copies], ignore_index=True)
+
+def pair_set(pairs) -> set:
+    """Order-independent (id, id, score) triples."""
+    return {(min(a, b), max(a, b), round(score, 6)) for a, b, score in pairs}
+
+@pytest.mark.parametrize("n_batches", [1, 3, 10])
+def test_batched_index_matches_full_scan(beneficiaries, n_batches):
+    expected = pair_set(DuplicateDetector(workers=1).find_duplicates(beneficiaries))
+    assert expected
+
+    index = DuplicateDetector(workers=1)
+    found = []
+    bounds = np.linspace(0, len(beneficiaries), n_batches + 1).astype(int)
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        found += index.add(beneficiaries.iloc[start:stop])
+
+    assert len(found) == len(expected)
+    assert pair_set(found) == expected
+    assert index.indexed_ids == set(beneficiaries["beneficiary_id"])
+
+def test_saved_index_matches_full_scan(beneficiaries, tmp_path):
+    expected = pair_set(DuplicateDetector(workers=1).find_duplicates(beneficiaries))
+    first, rest = beneficiaries.iloc[:2000], beneficiaries.iloc[2000:]
+
+    index = DuplicateDetector(workers=1)
+    found = index.add(first)
+    assert index.save(tmp_path / "duplicate_index.pkl")
+    reloaded = DuplicateDetector.load(tmp_path / "duplicate_index.pkl", workers=1)
+    found += reloaded.add(rest)
+
+    assert pair_set(found) == expected
+
+def test_query_does_not_insert(beneficiaries):
+    index = DuplicateDetector(workers=1)
+    index.add(beneficiaries.iloc[:2000])
+    new = beneficiaries.iloc[2000:]
+
+    matches = index.query(new)
+    assert index.indexed_ids == set(beneficiaries["beneficiary_id"].iloc[:2000])
+    assert {new_id for new_id, _, _ in matches} <= set(new["beneficiary_id"])
+    assert pair_set(matches) <= pair_set(DuplicateDetector(workers=1).find_duplicates(beneficiaries))
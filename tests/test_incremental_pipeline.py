@@ -0,0 +1,75 @@
+"""Incremental pipeline runs reproduce a full run on the updated raw file."""
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from notebooks.data_generator import write_beneficiaries
+
+ROOT = Path(__file__).parent.parent
+
+def run_pipeline(data_dir: Path, *args: str, **env: str) -> None:
+    """Run pipeline.py in a fresh process, since config is read at import."""
+    env = {**os.environ, "DATA_DIR": str(data_dir), "LOG_LEVEL": "WARNING", **env}
+    result = subprocess.run(
+        [sys.executable, str(ROOT / "pipeline.py"), *args],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+
+def modify(raw_path: Path) -> None:
+    """Change, remove and add records so counts, clusters and rings all move."""
+    rng = np.random.default_rng(3)
+    raw = pd.read_csv(raw_path)
+    changed = rng.choice(len(raw), 60, replace=False)
+    donors = rng.choice(len(raw), 60, replace=False)
+    for column, rows in zip(["bank_account", "address", "name"], np.split(np.arange(60), 3)):
+        raw.loc[changed[rows], column] = raw.loc[donors[rows], column].to_numpy()
+    raw.loc[changed[:10], "amount"] = raw["amount"].max() * 5
+
+    raw = raw.drop(index=rng.choice(len(raw), 40, replace=False))
+    added = raw.sample(30, random_state=4).copy()
+    added["beneficiary_id"] = np.arange(len(added)) + raw["beneficiary_id"].max() + 1
+    pd.concat([raw, added], ignore_index=True).to_csv(raw_path, index=False)
+
+def assert_same_labels(a: pd.Series, b: pd.Series) -> None:
+    """Labels describe the same partition of the records."""
+    np.testing.assert_array_equal(pd.factorize(a)[0], pd.factorize(b)[0])
+
+@pytest.fixture(scope="module")
+def runs(tmp_path_factory):
+    incremental = tmp_path_factory.mktemp("incremental")
+    write_beneficiaries(incremental / "raw" / "beneficiaries.csv", 3000)
+    run_pipeline(incremental)
+    modify(incremental / "raw" / "beneficiaries.csv")
+    run_pipeline(incremental, "--incremental")
+
+    # The full run scores with the same saved model the incremental run reused
+    full = tmp_path_factory.mktemp("full")
+    shutil.copytree(incremental / "raw", full / "raw")
+    shutil.copytree(incremental / "models", full / "models")
+    run_pipeline(full, ANOMALY_REFIT="false")
+    return incremental / "processed", full / "processed"
+
+def test_incremental_run_was_incremental(runs):
+    incremental, _ = runs
+    report = pd.read_json(incremental / "run_report.json", typ="series")
+    assert report["mode"] == "incremental"
+
+def test_risk_output_matches_full_run(runs):
+    incremental, full = (pd.read_csv(path / "risk_output.csv") for path in runs)
+    labels = ["cluster_id", "ring_id"]
+    assert list(incremental.columns) == list(full.columns)
+    pd.testing.assert_frame_equal(incremental.drop(columns=labels), full.drop(columns=labels))
+    for column in labels:
+        assert_same_labels(incremental[column], full[column])
+
+def test_aggregates_match_full_run(runs):
+    incremental, full = (pd.read_csv(path / "aggregates.csv") for path in runs)
+    keys = [c for c in full.columns if not pd.api.types.is_numeric_dtype(full[c])]
+    incremental = incremental.sort_values(keys).reset_index(drop=True)
+    full = full.sort_values(keys).reset_index(drop=True)
+    pd.testing.assert_frame_equal(incremental, full, check_dtype=False)
@@ -0,0 +1,173 @@
+"""District x scheme x month rollups of the risk output."""
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import List, Optional
+from config import AGGREGATE_RISK_THRESHOLD
+from utils.data_loader import load_data
+from utils.logger import setup_logger
+from utils.metrics import instrument
+
+logger = setup_logger(__name__)
+
+# Cube dimensions, finest grain first in the sort order
+DIMENSIONS = ["district", "scheme", "month"]
+# Additive measures; means are derived when rolling up so cells can be summed
+MEASURES = [
+    "records", "anomalies", "high_risk", "amount_total", "amount_at_risk", "risk_score_sum"
+]
+# Columns of the risk output a cube is computed from
+INPUT_TYPES = {
+    "district": "str", "scheme": "str", "date": "str",
+    "amount": "int64", "anomaly": "int64", "risk_score": "float64",
+}
+INPUT_COLUMNS = list(INPUT_TYPES)
+# Dimension value for records without a district, scheme or date
+UNKNOWN = "unknown"
+
+@instrument("aggregates.build")
+def build_cube(df: pd.DataFrame, threshold: float = AGGREGATE_RISK_THRESHOLD) -> pd.DataFrame:
+    """
+    Aggregate risk output rows into district x scheme x month cells.
+
+    Args:
+        df: Risk output
+        threshold: Risk score at or above which a record counts as high risk
+
+    Returns:
+        One row per non-empty cell with DIMENSIONS and MEASURES columns,
+        sorted by DIMENSIONS
+    """
+    high_risk = (df["risk_score"] >= threshold).to_numpy()
+    anomalies = (df["anomaly"] == -1).to_numpy()
+    amount = df["amount"].to_numpy(dtype=np.int64)
+    at_risk = high_risk | anomalies
+
+    cells = pd.DataFrame({
+        "district": df["district"].astype("str").fillna(UNKNOWN).to_numpy(),
+        "scheme": df["scheme"].astype("str").fillna(UNKNOWN).to_numpy(),
+        "month": df["date"].astype("str").str[:7].fillna(UNKNOWN).to_numpy(),
+        "records": np.ones(len(df), dtype=np.int64),
+        "anomalies": anomalies.astype(np.int64),
+        "high_risk": high_risk.astype(np.int64),
+        "amount_total": amount,
+        "amount_at_risk": np.where(at_risk, amount, 0),
+        "risk_score_sum": df["risk_score"].to_numpy(dtype=np.float64),
+    })
+    return cells.groupby(DIMENSIONS, sort=True).sum().reset_index()
+
+@instrument("aggregates.update")
+def update_cube(
+    cube: pd.DataFrame,
+    previous: pd.DataFrame,
+    current: pd.DataFrame,
+    threshold: float = AGGREGATE_RISK_THRESHOLD
+) -> pd.DataFrame:
+    """
+    Patch a cube built from one risk output so it describes the next one.
+
+    Rows are matched on beneficiary_id and compared by a hash of the columns
+    the cube reads; only the contributions of rows that were added, removed
+    or changed are aggregated, so the cost of the groupby follows the change.
+
+    Args:
+        cube: Cube of the previous risk output
+        previous: Previous risk output
+        current: New risk output
+        threshold: Risk score at or above which a record counts as high risk
+
+    Returns:
+        Cube equal to build_cube(current), rebuilt in full if the outputs
+        cannot be matched by beneficiary_id
+    """
+    if previous["beneficiary_id"].duplicated().any() or current["beneficiary_id"].duplicated().any():
+        logger.warning("Duplicate beneficiary_id values, rebuilding aggregates in full")
+        return build_cube(current, threshold)
+
+    old_hashes = _input_hashes(previous)
+    positions = pd.Index(previous["beneficiary_id"]).get_indexer(current["beneficiary_id"])
+    known = positions >= 0
+    unchanged = known.copy()
+    unchanged[known] = old_hashes[positions[known]] == _input_hashes(current)[known]
+
+    kept = np.zeros(len(previous), dtype=bool)
+    kept[positions[unchanged]] = True
+    added, removed = current[~unchanged], previous[~kept]
+    logger.info(
+        "Updating aggregates for %d added and %d removed row versions", len(added), len(removed)
+    )
+
+    patched = (
+        cube.set_index(DIMENSIONS)[MEASURES]
+        .add(build_cube(added, threshold).set_index(DIMENSIONS), fill_value=0)
+        .sub(build_cube(removed, threshold).set_index(DIMENSIONS), fill_value=0)
+    )
+    patched = patched[patched["records"] > 0]
+    counts = [m for m in MEASURES if m != "risk_score_sum"]
+    patched[counts] = patched[counts].round().astype(np.int64)
+    return patched.sort_index().reset_index()
+
+def rollup(
+    cube: pd.DataFrame,
+    group_by: List[str],
+    district: Optional[str] = None,
+    scheme: Optional[str] = None,
+    month_from: Optional[str] = None,
+    month_to: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Sum the cells of a cube up to coarser groups.
+
+    Args:
+        cube: Cube from build_cube()
+        group_by: Dimensions to keep, any subset of DIMENSIONS; empty for one total
+        district: Only this district
+        scheme: Only this scheme
+        month_from: Earliest month, YYYY-MM
+        month_to: Latest month, YYYY-MM
+
+    Returns:
+        One row per group with the group_by columns, the summed measures and
+        mean_risk_score, sorted by group_by
+    """
+    keep = np.ones(len(cube), dtype=bool)
+    if district is not None:
+        keep &= (cube["district"] == district).to_numpy()
+    if scheme is not None:
+        keep &= (cube["scheme"] == scheme).to_numpy()
+    if month_from is not None:
+        keep &= (cube["month"] >= month_from).to_numpy()
+    if month_to is not None:
+        keep &= (cube["month"] <= month_to).to_numpy()
+    cells = cube[keep]
+
+    if group_by:
+        groups = cells.groupby(group_by, sort=True)[MEASURES].sum().reset_index()
+    else:
+        groups = cells[MEASURES].sum().to_frame().T.astype(cells[MEASURES].dtypes)
+    records = groups["records"].to_numpy()
+    groups["mean_risk_score"] = np.divide(
+        groups["risk_score_sum"].to_numpy(), records,
+        out=np.zeros(len(groups)), where=records > 0
+    )
+    return groups.drop(columns="risk_score_sum")
+
+def load_cube(file_path: Path) -> Optional[pd.DataFrame]:
+    """
+    Load a cube saved with save_data().
+
+    Args:
+        file_path: Cube path
+
+    Returns:
+        Cube if successful, None otherwise
+    """
+    # Dimensions stay plain strings so patched and rebuilt cubes align
+    return load_data(file_path, required_columns=DIMENSIONS + MEASURES, optimize=False)
+
+def _input_hashes(df: pd.DataFrame) -> np.ndarray:
+    """uint64 hash per row of the columns a cube is computed from."""
+    # Hashes depend on dtype (int8 -1 differs from int64 -1), and loaded and
+    # recomputed outputs narrow columns differently
+    columns = df[INPUT_COLUMNS].astype(INPUT_TYPES)
+    return pd.util.hash_pandas_object(columns, index=False).to_numpy()
@@ -0,0 +1,137 @@
+"""Content-addressed cache of pipeline stage outputs."""
+import hashlib
+import inspect
+import pickle
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Optional
+import pandas as pd
+import config
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Packages whose code runs inside pipeline stages
+STAGE_PACKAGES = ["models", "notebooks", "utils"]
+
+def file_digest(file_path: Path, block_size: int = 1 << 20) -> str:
+    """
+    Hash a file's contents.
+    
+    Args:
+        file_path: File to hash
+        block_size: Bytes read per iteration
+        
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+@lru_cache(maxsize=1)
+def code_digest() -> str:
+    """Hash the source of config.py and every module of STAGE_PACKAGES, once per process."""
+    root = Path(config.__file__).parent
+    digest = hashlib.sha256()
+    for path in [root / "config.py"] + sorted(
+        p for package in STAGE_PACKAGES for p in (root / package).rglob("*.py")
+    ):
+        digest.update(str(path.relative_to(root)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+def config_snapshot() -> str:
+    """Stable repr of every setting in config, as resolved from the environment."""
+    settings = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+    return repr(sorted(settings.items()))
+
+def stage_key(input_key: str, stage: str, func: Callable, params: Any) -> str:
+    """
+    Derive a stage output key from its input key, code, configuration and parameters.
+    
+    Keys chain from the raw file digest through every stage, so a change to
+    the input, a stage's source or its parameters invalidates that stage and
+    everything downstream without hashing intermediate DataFrames. Settings
+    and code read by the functions a stage calls are covered by the whole
+    config snapshot and the source of the stage packages.
+    
+    Args:
+        input_key: Key of the stage input
+        stage: Stage name
+        func: Stage function, its source code is part of the key
+        params: Parameters affecting the output that config does not hold,
+            e.g. a model file digest; must have a stable repr
+        
+    Returns:
+        Hex SHA-256 key
+    """
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = func.__qualname__
+    payload = "\n".join([input_key, stage, source, repr(params), code_digest(), config_snapshot()])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ArtifactCache:
+    """Store one cached output per stage, keyed by content hash."""
+    
+    def __init__(self, directory: Path):
+        """
+        Initialize artifact cache.
+        
+        Args:
+            directory: Directory holding cached outputs
+        """
+        self.directory = directory
+    
+    def get(self, stage: str, key: str) -> Optional[pd.DataFrame]:
+        """
+        Load a cached stage output.
+        
+        Args:
+            stage: Stage name
+            key: Stage key from stage_key()
+            
+        Returns:
+            Cached DataFrame, None on a miss or unreadable entry
+        """
+        path = self._path(stage, key)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache entry {path}: {str(e)}")
+            return None
+    
+    def put(self, stage: str, key: str, df: pd.DataFrame) -> None:
+        """
+        Cache a stage output, replacing older entries for the same stage.
+        
+        Args:
+            stage: Stage name
+            key: Stage key from stage_key()
+            df: Stage output
+        """
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for stale in self.directory.glob(f"{self._slug(stage)}-*.pkl"):
+                stale.unlink()
+            path = self._path(stage, key)
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+            tmp.replace(path)
+        except Exception as e:
+            logger.warning(f"Could not cache {stage} output: {str(e)}")
+    
+    def _path(self, stage: str, key: str) -> Path:
+        return self.directory / f"{self._slug(stage)}-{key[:16]}.pkl"
+    
+    @staticmethod
+    def _slug(stage: str) -> str:
+        return stage.lower().replace(" ", "_")
@@ -1,14 +1,27 @@
 """Data loading and validation utilities."""
+import os
+import sqlite3
+from contextlib import closing
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import Optional, List
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from utils.logger import setup_logger
+from utils.metrics import instrument
+from utils.schemas import MEMORY_SCHEMA, RISK_STORE_INDEXES, RISK_STORE_TABLE, arrow_schema
 
 logger = setup_logger(__name__)
 
+# Row filter as (column, op, value); op is one of ==, !=, <, <=, >, >=, in, not in.
+# A list of filters is AND-ed, matching pyarrow's filter format.
+Filter = Tuple[str, str, Any]
+
+@instrument("io.load_csv")
 def load_csv(
     file_path: Path,
-    required_columns: Optional[List[str]] = None
+    required_columns: Optional[List[str]] = None,
+    columns: Optional[List[str]] = None,
+    optimize: bool = True
 ) -> Optional[pd.DataFrame]:
     """
     Load CSV file with error handling and validation.
@@ -16,6 +29,8 @@ def load_csv(
     Args:
         file_path: Path to CSV file
         required_columns: List of required column names
+        columns: Only parse these columns
+        optimize: Convert known columns to compact types with optimize_dtypes()
         
     Returns:
         DataFrame if successful, None otherwise
@@ -25,7 +40,9 @@ def load_csv(
             logger.error(f"File not found: {file_path}")
             return None
         
-        df = pd.read_csv(file_path)
+        df = pd.read_csv(file_path, usecols=columns)
+        if optimize:
+            df = optimize_dtypes(df)
         logger.info(f"Loaded {len(df)} records from {file_path}")
         
         if required_columns:
@@ -40,6 +57,7 @@ def load_csv(
         logger.error(f"Error loading {file_path}: {str(e)}")
         return None
 
+@instrument("io.save_csv")
 def save_csv(df: pd.DataFrame, file_path: Path) -> bool:
     """
     Save DataFrame to CSV with error handling.
@@ -60,3 +78,338 @@ def save_csv(df: pd.DataFrame, file_path: Path) -> bool:
     except Exception as e:
         logger.error(f"Error saving to {file_path}: {str(e)}")
         return False
+
+@instrument("io.load_parquet")
+def load_parquet(
+    file_path: Path,
+    required_columns: Optional[List[str]] = None,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+    optimize: bool = True
+) -> Optional[pd.DataFrame]:
+    """
+    Load Parquet file with column projection and predicate pushdown.
+    
+    Only the requested columns and the row groups that can match the filters
+    are read, through a memory-mapped file.
+    
+    Args:
+        file_path: Path to Parquet file
+        required_columns: List of required column names
+        columns: Only read these columns
+        filters: Row filters pushed down to the reader
+        optimize: Convert known columns to compact types with optimize_dtypes()
+        
+    Returns:
+        DataFrame if successful, None otherwise
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        logger.error("pyarrow is required to read Parquet artifacts")
+        return None
+    
+    try:
+        if not file_path.exists():
+            logger.error(f"File not found: {file_path}")
+            return None
+        
+        if required_columns:
+            available = pq.read_schema(file_path, memory_map=True).names
+            missing_cols = set(required_columns) - set(available)
+            if missing_cols:
+                logger.error(f"Missing required columns: {missing_cols}")
+                return None
+        
+        table = pq.read_table(
+            file_path, columns=columns, filters=filters or None, memory_map=True
+        )
+        df = table.to_pandas()
+        if optimize:
+            df = optimize_dtypes(df)
+        logger.info(f"Loaded {len(df)} records from {file_path}")
+        return df
+    
+    except Exception as e:
+        logger.error(f"Error loading {file_path}: {str(e)}")
+        return None
+
+@instrument("io.save_parquet")
+def save_parquet(df: pd.DataFrame, file_path: Path) -> bool:
+    """
+    Save DataFrame to Parquet using the artifact schema.
+    
+    Args:
+        df: DataFrame to save
+        file_path: Destination path
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        logger.error("pyarrow is required to write Parquet artifacts")
+        return False
+    
+    try:
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(df, schema=arrow_schema(df), preserve_index=False)
+        pq.write_table(table, file_path)
+        logger.info(f"Saved {len(df)} records to {file_path}")
+        return True
+    
+    except Exception as e:
+        logger.error(f"Error saving to {file_path}: {str(e)}")
+        return False
+
+@instrument("io.save_sqlite")
+def save_sqlite(
+    df: pd.DataFrame,
+    file_path: Path,
+    table: str = RISK_STORE_TABLE,
+    indexes: Optional[Dict[str, str]] = None
+) -> bool:
+    """
+    Bulk-load a DataFrame into a fresh SQLite database and swap it into place.
+    
+    The database is built and indexed under a temporary name and then
+    renamed over file_path, so readers see either the previous file or the
+    complete new one, never a partial load.
+    
+    Args:
+        df: DataFrame to save
+        file_path: Destination database path
+        table: Table name
+        indexes: Index name to column list, RISK_STORE_INDEXES if None
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    indexes = RISK_STORE_INDEXES if indexes is None else indexes
+    tmp = file_path.with_name(file_path.name + ".tmp")
+    try:
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.unlink(missing_ok=True)
+        with closing(sqlite3.connect(tmp)) as conn:
+            # A private file until the rename, so skip journaling; commit syncs it
+            conn.execute("PRAGMA journal_mode=OFF")
+            df.to_sql(table, conn, index=False, chunksize=100_000)
+            for name, columns in indexes.items():
+                if all(column.split()[0] in df.columns for column in columns.split(",")):
+                    conn.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+            conn.execute("ANALYZE")
+            conn.commit()
+        os.replace(tmp, file_path)
+        logger.info(f"Saved {len(df)} records to {file_path}")
+        return True
+    
+    except Exception as e:
+        logger.error(f"Error saving to {file_path}: {str(e)}")
+        tmp.unlink(missing_ok=True)
+        return False
+
+def load_data(
+    file_path: Path,
+    required_columns: Optional[List[str]] = None,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Filter]] = None,
+    optimize: bool = True
+) -> Optional[pd.DataFrame]:
+    """
+    Load a pipeline artifact, choosing the reader from the file suffix.
+    
+    Args:
+        file_path: Path to a .parquet or .csv file
+        required_columns: List of required column names
+        columns: Only load these columns
+        filters: Row filters; pushed down for Parquet, applied after parsing for CSV
+        optimize: Convert known columns to compact types with optimize_dtypes()
+        
+    Returns:
+        DataFrame if successful, None otherwise
+    """
+    if file_path.suffix == ".parquet":
+        return load_parquet(file_path, required_columns, columns, filters, optimize)
+    
+    if filters and columns:
+        # Filter columns must be parsed even when not projected
+        parse_columns = list(dict.fromkeys(columns + [f[0] for f in filters]))
+    else:
+        parse_columns = columns
+    
+    df = load_csv(file_path, required_columns, parse_columns, optimize)
+    if df is None or not filters:
+        return df
+    
+    try:
+        df = apply_filters(df, filters)
+        return df[columns] if columns else df
+    except Exception as e:
+        logger.error(f"Error filtering {file_path}: {str(e)}")
+        return None
+
+def save_data(df: pd.DataFrame, file_path: Path) -> bool:
+    """
+    Save a pipeline artifact, choosing the writer from the file suffix.
+    
+    Args:
+        df: DataFrame to save
+        file_path: Destination .parquet or .csv path
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    if file_path.suffix == ".parquet":
+        return save_parquet(df, file_path)
+    return save_csv(df, file_path)
+
+def iter_csv_chunks(
+    file_path: Path,
+    chunksize: int,
+    columns: Optional[List[str]] = None,
+    optimize: bool = True
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV file in chunks of at most chunksize rows.
+    
+    Args:
+        file_path: Path to CSV file
+        chunksize: Rows per chunk
+        columns: Only parse these columns
+        optimize: Convert known columns to compact types with optimize_dtypes()
+        
+    Yields:
+        DataFrame chunks
+    """
+    with pd.read_csv(file_path, usecols=columns, chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield optimize_dtypes(chunk) if optimize else chunk
+
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert known columns to the compact in-memory types of MEMORY_SCHEMA.
+    
+    Text columns become Arrow-backed strings, scheme and district become
+    categoricals and counts, amounts and flags are narrowed to the integer
+    width in MEMORY_SCHEMA when all values fit. Columns that are missing, hold
+    nulls or cannot be converted keep their type.
+    
+    Args:
+        df: DataFrame to convert in place
+        
+    Returns:
+        The converted DataFrame
+    """
+    for column, dtype in MEMORY_SCHEMA.items():
+        if column not in df.columns:
+            continue
+        values = df[column]
+        try:
+            if dtype == "string":
+                if pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+                    target = _compact_string_dtype()
+                    if values.dtype != target:
+                        df[column] = values.astype(target)
+            elif dtype == "category":
+                if not isinstance(values.dtype, pd.CategoricalDtype):
+                    df[column] = values.astype("category")
+            elif pd.api.types.is_integer_dtype(values) and values.dtype != dtype:
+                limits = np.iinfo(dtype)
+                if len(values) == 0 or (values.min() >= limits.min and values.max() <= limits.max):
+                    df[column] = values.astype(dtype)
+        except (ImportError, TypeError, ValueError) as e:
+            logger.warning(f"Keeping {column} as {values.dtype}: {str(e)}")
+    return df
+
+def _compact_string_dtype() -> pd.StringDtype:
+    """Arrow-backed string dtype that, like object columns, uses NaN for missing values."""
+    try:
+        return pd.StringDtype("pyarrow", na_value=np.nan)
+    except TypeError:
+        # pandas < 2.3 spells the NaN-semantics Arrow storage differently
+        return pd.StringDtype("pyarrow_numpy")
+
+class ChunkedWriter:
+    """Append DataFrame chunks to a CSV or Parquet artifact without holding them all."""
+    
+    def __init__(self, file_path: Path):
+        """
+        Initialize chunked writer.
+        
+        Args:
+            file_path: Destination .parquet or .csv path
+        """
+        self.file_path = file_path
+        self.rows = 0
+        self._parquet_writer = None
+    
+    def __enter__(self) -> "ChunkedWriter":
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        return self
+    
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Append one chunk.
+        
+        Args:
+            df: Chunk with the same columns as the previous chunks
+        """
+        if self.file_path.suffix == ".parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            
+            if self._parquet_writer is None:
+                schema = arrow_schema(df)
+                self._parquet_writer = pq.ParquetWriter(self.file_path, schema)
+            table = pa.Table.from_pandas(
+                df, schema=self._parquet_writer.schema, preserve_index=False
+            )
+            self._parquet_writer.write_table(table)
+        else:
+            df.to_csv(
+                self.file_path, mode="w" if self.rows == 0 else "a",
+                header=self.rows == 0, index=False
+            )
+        self.rows += len(df)
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        if exc_type is None:
+            logger.info(f"Saved {self.rows} records to {self.file_path}")
+
+def apply_filters(df: pd.DataFrame, filters: List[Filter]) -> pd.DataFrame:
+    """
+    Apply pyarrow-style AND-ed row filters to a DataFrame.
+    
+    Args:
+        df: Input DataFrame
+        filters: List of (column, op, value)
+        
+    Returns:
+        Filtered DataFrame
+    """
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in filters:
+        values = df[column]
+        if op in ("=", "=="):
+            mask &= values == value
+        elif op == "!=":
+            mask &= values != value
+        elif op == "<":
+            mask &= values < value
+        elif op == "<=":
+            mask &= values <= value
+        elif op == ">":
+            mask &= values > value
+        elif op == ">=":
+            mask &= values >= value
+        elif op == "in":
+            mask &= values.isin(value)
+        elif op == "not in":
+            mask &= ~values.isin(value)
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+    return df[mask]
@@ -1,19 +1,142 @@
 """Logging configuration."""
+import atexit
+import json
 import logging
+import os
+import queue
 import sys
-from config import LOG_LEVEL
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from config import LOG_ASYNC, LOG_FORMAT, LOG_LEVEL, LOG_PROGRESS_INTERVAL
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# LogRecord attributes; anything else on a record came from extra= and is emitted as a field
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_lock = threading.Lock()
+_handler: Optional[logging.Handler] = None
+_listener: Optional[QueueListener] = None
+
+class JsonFormatter(logging.Formatter):
+    """Format each record as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).astimezone().isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queue records unformatted so message formatting happens on the listener thread.
+
+    The stock QueueHandler formats in the caller to make records picklable;
+    this queue never leaves the process, so that work is skipped. Arguments
+    are therefore rendered a moment later and should not be mutated after
+    the logging call.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def _output_handler() -> logging.Handler:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT))
+    return handler
+
+def _start_listener(handler: QueueHandler) -> None:
+    global _listener
+    handler.queue = queue.SimpleQueue()
+    _listener = QueueListener(handler.queue, _output_handler(), respect_handler_level=True)
+    _listener.start()
+
+def _after_fork() -> None:
+    # The listener thread does not survive fork; give the child its own queue
+    # and thread so worker processes keep logging without duplicating the
+    # parent's pending records
+    if isinstance(_handler, QueueHandler):
+        _start_listener(_handler)
+
+def _shared_handler() -> logging.Handler:
+    """The one handler every project logger writes to, created on first use."""
+    global _handler
+    with _lock:
+        if _handler is None:
+            if LOG_ASYNC:
+                _handler = _DeferredQueueHandler(queue.SimpleQueue())
+                _start_listener(_handler)
+                atexit.register(shutdown)
+                if hasattr(os, 'register_at_fork'):
+                    os.register_at_fork(after_in_child=_after_fork)
+            else:
+                _handler = _output_handler()
+        return _handler
+
+def shutdown() -> None:
+    """Write out queued records and stop the background writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
 def setup_logger(name: str) -> logging.Logger:
     """Set up a logger with consistent formatting."""
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, LOG_LEVEL))
-    
+
     if not logger.handlers:
-        handler = logging.StreamHandler(sys.stdout)
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-    
+        logger.addHandler(_shared_handler())
+
     return logger
+
+class ProgressLogger:
+    """Log loop progress at most once per interval.
+
+    update() only counts and compares a clock reading, so it is cheap enough
+    to call on every iteration; loops that finish within one interval log
+    nothing.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        label: str,
+        total: Optional[int] = None,
+        interval: float = LOG_PROGRESS_INTERVAL
+    ):
+        self.logger = logger
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.count = 0
+        self._started = time.monotonic()
+        self._next = self._started + interval
+
+    def update(self, n: int = 1) -> None:
+        """Count n more items and log if the interval has elapsed."""
+        self.count += n
+        now = time.monotonic()
+        if now < self._next:
+            return
+        self._next = now + self.interval
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        rate = self.count / (now - self._started)
+        if self.total:
+            self.logger.info(
+                "%s: %d/%d (%.0f%%, %.0f/s)",
+                self.label, self.count, self.total, 100 * self.count / self.total, rate
+            )
+        else:
+            self.logger.info("%s: %d (%.0f/s)", self.label, self.count, rate)
@@ -0,0 +1,219 @@
+"""Process-wide metrics registry with Prometheus text exposition."""
+import bisect
+import functools
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import pandas as pd
+from config import METRICS_ENABLED
+
+# Default latency buckets in seconds, from sub-millisecond lookups to long stages
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class _Metric:
+    """Labelled values of one metric, guarded by a lock."""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, object] = {}
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class _ScalarMetric(_Metric):
+    """Metric holding one number per label set."""
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self._header() + [f"{self.name}{_format_labels(k)} {v}" for k, v in items]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {_format_labels(k) or "total": v for k, v in self._values.items()}
+
+class Counter(_ScalarMetric):
+    """Monotonically increasing total."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Add amount to the labelled total."""
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_ScalarMetric):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        """Set the labelled value."""
+        with self._lock:
+            self._values[_key(labels)] = value
+
+class Histogram(_Metric):
+    """Distribution of observations over fixed cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one observation."""
+        key = _key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            bucket = bisect.bisect_left(self.buckets, value)
+            if bucket < len(self.buckets):
+                state[0][bucket] += 1
+            state[1] += 1
+            state[2] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, (list(s[0]), s[1], s[2])) for k, s in self._values.items()]
+        lines = self._header()
+        for key, (counts, count, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', repr(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                _format_labels(k) or "total": {"count": s[1], "sum": round(s[2], 6)}
+                for k, s in self._values.items()
+            }
+
+class MetricsRegistry:
+    """Named metrics shared by the whole process."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        """Return the counter called name, creating it on first use."""
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        """Return the gauge called name, creating it on first use."""
+        return self._get(Gauge, name, help_text)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """Return the histogram called name, creating it on first use."""
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, help_text, buckets)
+            return self._metrics[name]
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            Exposition text ending with a newline
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = [line for metric in metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """
+        Return every metric as plain data for JSON reports.
+
+        Returns:
+            Mapping of metric name to its labelled values
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def _get(self, cls, name: str, help_text: str):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, help_text)
+            return self._metrics[name]
+
+registry = MetricsRegistry()
+
+def instrument(operation: str) -> Callable:
+    """
+    Time a function and count the rows it handles.
+
+    Records operation_seconds{operation} and operation_rows_total{operation},
+    taking rows from a returned DataFrame or else the first DataFrame
+    argument. With METRICS_ENABLED off the function is returned unwrapped,
+    so disabled instrumentation costs nothing per call.
+
+    Args:
+        operation: Label identifying the operation, e.g. "anomaly.fit"
+
+    Returns:
+        Decorator
+    """
+    def decorator(func: Callable) -> Callable:
+        if not METRICS_ENABLED:
+            return func
+
+        seconds = registry.histogram("operation_seconds", "Wall time of instrumented operations")
+        rows = registry.counter("operation_rows_total", "Rows handled by instrumented operations")
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            result = func(*args, **kwargs)
+            seconds.observe(time.perf_counter() - started, operation=operation)
+            frame = _first_frame(result, args)
+            if frame is not None:
+                rows.inc(len(frame), operation=operation)
+            return result
+        return wrapper
+    return decorator
+
+def _first_frame(result, args) -> Optional[pd.DataFrame]:
+    """The DataFrame an operation produced or consumed, if any."""
+    if isinstance(result, pd.DataFrame):
+        return result
+    for arg in args:
+        if isinstance(arg, pd.DataFrame):
+            return arg
+    return None
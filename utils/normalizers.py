@@ -0,0 +1,110 @@
+"""Normalization helpers for matching beneficiary attributes."""
+import pandas as pd
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+def normalize_name(names: pd.Series) -> pd.Series:
+    """
+    Normalize names to lowercase, space-separated, alphabetically sorted tokens.
+
+    Args:
+        names: Series of raw names
+
+    Returns:
+        Series of normalized names, e.g. "Dr. John  SMITH" -> "dr john smith"
+    """
+    cleaned = (
+        names.astype(str)
+        .str.lower()
+        .str.replace(r"[^a-z0-9 ]+", " ", regex=True)
+        .str.split()
+    )
+    return cleaned.map(lambda tokens: " ".join(sorted(tokens)))
+
+def soundex(token: str) -> str:
+    """
+    Compute the American Soundex code of a single token.
+
+    Args:
+        token: Lowercase alphabetic token
+
+    Returns:
+        Four character Soundex code, or an empty string for empty input
+    """
+    letters = [c for c in token if c.isalpha()]
+    if not letters:
+        return ""
+
+    code = letters[0].upper()
+    previous = _SOUNDEX_CODES.get(letters[0], "")
+    for char in letters[1:]:
+        digit = _SOUNDEX_CODES.get(char, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if char not in "hw":
+            previous = digit
+
+    return code.ljust(4, "0")
+
+def phonetic_key(normalized_names: pd.Series) -> pd.Series:
+    """
+    Build a phonetic key from already normalized names.
+
+    Args:
+        normalized_names: Output of normalize_name
+
+    Returns:
+        Series of space-separated, sorted Soundex codes per name
+    """
+    unique = pd.Series(normalized_names.unique())
+    codes = unique.map(lambda name: " ".join(sorted(soundex(t) for t in name.split())))
+    return normalized_names.map(dict(zip(unique, codes)))
+
+def normalize_phone(phones: pd.Series) -> pd.Series:
+    """
+    Normalize phone numbers to their last ten digits.
+
+    Extensions ("x123") and formatting are dropped, so "+1 (424) 716-4529x68"
+    and "424.716.4529" map to the same key.
+
+    Args:
+        phones: Series of raw phone numbers
+
+    Returns:
+        Series of digit strings, NaN where fewer than seven digits remain
+    """
+    digits = (
+        phones.astype(str)
+        .str.lower()
+        .str.replace(r"(?s)x.*", "", regex=True)
+        .str.replace(r"\D+", "", regex=True)
+        .str[-10:]
+    )
+    return digits.where(digits.str.len() >= 7)
+
+def normalize_address(addresses: pd.Series) -> pd.Series:
+    """
+    Normalize addresses to lowercase alphanumeric tokens.
+
+    Args:
+        addresses: Series of raw addresses
+
+    Returns:
+        Series of normalized addresses, NaN where nothing remains
+    """
+    cleaned = (
+        addresses.astype(str)
+        .str.lower()
+        .str.replace(r"[^a-z0-9]+", " ", regex=True)
+        .str.strip()
+    )
+    return cleaned.where(addresses.notna() & (cleaned != ""))
@@ -0,0 +1,224 @@
+"""Wall time and peak memory measurement for pipeline stages."""
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from config import PROFILE_INTERVAL_MS, PROFILE_TRACEMALLOC
+from utils.logger import setup_logger
+from utils.metrics import registry
+
+logger = setup_logger(__name__)
+
+_stage_seconds = registry.histogram("pipeline_stage_seconds", "Wall time of pipeline stages")
+_stage_rows = registry.gauge("pipeline_stage_rows", "Rows produced by the last run of a stage")
+_stage_peak = registry.gauge("pipeline_stage_peak_mb", "Peak memory above baseline of the last run of a stage")
+
+def _status_kb(field: str) -> Optional[int]:
+    """Read one kB field from /proc/self/status, None where unavailable."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _reset_peak_rss() -> bool:
+    """Reset VmHWM to the current RSS; False if the kernel does not allow it."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_kb() -> int:
+    """Peak resident set size of this process in kB."""
+    peak = _status_kb("VmHWM:")
+    if peak is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin":
+            peak //= 1024
+    return peak
+
+class StageProfiler:
+    """Record wall time and peak memory of consecutive stages.
+
+    Peak memory is the process RSS high-water mark above the RSS at stage
+    start, reset per stage where Linux allows it. With trace_python_memory
+    the peak of Python allocations from tracemalloc is used instead; that is
+    exact per stage but slows allocation-heavy stages several-fold.
+    """
+
+    def __init__(self, trace_python_memory: bool = PROFILE_TRACEMALLOC):
+        self.stages: List[Dict] = []
+        self.trace_python_memory = trace_python_memory
+        self._started_tracing = False
+        self._started_at = time.time()
+
+    def __enter__(self) -> "StageProfiler":
+        if self.trace_python_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._started_tracing:
+            tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Dict]:
+        """
+        Measure one stage.
+
+        Args:
+            name: Stage name
+
+        Yields:
+            The stage record; callers may add fields such as rows or cached
+        """
+        record = {"stage": name}
+        if self.trace_python_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        else:
+            # Without a reset the high-water mark may predate the stage
+            resettable = _reset_peak_rss()
+            baseline = (_status_kb("VmRSS:") if resettable else None) or _peak_rss_kb()
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = round(time.perf_counter() - started, 4)
+            if self.trace_python_memory:
+                peak_mb = (tracemalloc.get_traced_memory()[1] - baseline) / 2**20
+            else:
+                peak_mb = max(_peak_rss_kb() - baseline, 0) / 1024
+            record["peak_mb"] = round(peak_mb, 2)
+            self.stages.append(record)
+
+            _stage_seconds.observe(record["seconds"], stage=name)
+            _stage_peak.set(record["peak_mb"], stage=name)
+            if "rows" in record:
+                _stage_rows.set(record["rows"], stage=name)
+
+    def log_report(self) -> None:
+        """Log one line per stage plus the total wall time."""
+        logger.info("%-26s%10s%10s%10s  cached", "Stage", "seconds", "peak MB", "rows")
+        for record in self.stages:
+            logger.info(
+                "%-26s%10.3f%10.1f%10s  %s", record["stage"], record["seconds"],
+                record["peak_mb"], record.get("rows", ""), record.get("cached", "")
+            )
+        total = sum(record["seconds"] for record in self.stages)
+        logger.info("%-26s%10.3f", "Total", total)
+
+    def report(self, **extra) -> Dict:
+        """
+        Build the run report.
+
+        Args:
+            **extra: Additional top-level fields, e.g. mode
+
+        Returns:
+            Dictionary with the stage records, totals and a metrics snapshot
+        """
+        return {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self._started_at)),
+            "pid": os.getpid(),
+            **extra,
+            "memory": "tracemalloc" if self.trace_python_memory else "rss",
+            "total_seconds": round(sum(record["seconds"] for record in self.stages), 4),
+            "peak_rss_mb": round(_peak_rss_kb() / 1024, 1),
+            "stages": self.stages,
+            "metrics": registry.snapshot(),
+        }
+
+    def write_report(self, path: Path, **extra) -> bool:
+        """
+        Write the run report as JSON.
+
+        Args:
+            path: Destination path
+            **extra: Additional top-level fields
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_text(json.dumps(self.report(**extra), indent=2, default=str))
+            tmp.replace(path)
+            logger.info("Run report written to %s", path)
+            return True
+
+        except Exception as e:
+            logger.error("Error writing run report to %s: %s", path, e)
+            return False
+
+class SamplingProfiler:
+    """Sample the calling thread's stack and write folded stacks for flame graphs.
+
+    The output has one "frame;frame;frame count" line per distinct stack,
+    the input format of flamegraph.pl and speedscope. Only the thread that
+    enters the profiler is sampled.
+    """
+
+    def __init__(self, output: Path, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.output = Path(output)
+        self.interval = interval_ms / 1000
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._target = None
+
+    def __enter__(self) -> "SamplingProfiler":
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.write()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def write(self) -> bool:
+        """
+        Write the collected samples as folded stacks.
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            self.output.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.output, "w") as f:
+                for stack, count in self.samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            logger.info("Wrote %d profile samples to %s", sum(self.samples.values()), self.output)
+            return True
+
+        except Exception as e:
+            logger.error("Error writing profile to %s: %s", self.output, e)
+            return False
@@ -0,0 +1,77 @@
+"""Explicit column schemas for pipeline artifacts."""
+
+# Logical Arrow types of every column the pipeline writes. Columns not listed
+# here are stored with their inferred type.
+ARTIFACT_SCHEMA = {
+    "beneficiary_id": "int64",
+    "name": "string",
+    "phone": "string",
+    "address": "string",
+    "bank_account": "int64",
+    "scheme": "string",
+    "amount": "int64",
+    "district": "string",
+    "date": "string",
+    "same_bank_count": "int64",
+    "same_address_count": "int64",
+    "cluster_id": "int32",
+    "cluster_size": "int64",
+    "ring_id": "int32",
+    "ring_size": "int64",
+    "shared_links": "int64",
+    "anomaly": "int64",
+    "anomaly_score": "float64",
+    "risk_score": "float64",
+}
+
+# Compact pandas types applied to known columns after loading. "string" is an
+# Arrow-backed string column; integers are only narrowed when every value fits.
+MEMORY_SCHEMA = {
+    "name": "string",
+    "phone": "string",
+    "address": "string",
+    "date": "string",
+    "scheme": "category",
+    "district": "category",
+    "amount": "int32",
+    "same_bank_count": "int32",
+    "same_address_count": "int32",
+    "cluster_id": "int32",
+    "cluster_size": "int32",
+    "ring_id": "int32",
+    "ring_size": "int32",
+    "shared_links": "int32",
+    "anomaly": "int8",
+}
+
+def arrow_schema(df):
+    """
+    Build the pyarrow schema used to write a DataFrame.
+
+    Args:
+        df: DataFrame about to be written
+
+    Returns:
+        pyarrow.Schema with ARTIFACT_SCHEMA types for known columns and
+        inferred types for the rest
+    """
+    import pyarrow as pa
+
+    inferred = pa.Schema.from_pandas(df, preserve_index=False)
+    return pa.schema([
+        pa.field(field.name, pa.type_for_alias(ARTIFACT_SCHEMA[field.name]))
+        if field.name in ARTIFACT_SCHEMA else field
+        for field in inferred
+    ])
+
+# Indexes of the SQLite serving store, by name. Column lists follow the API's
+# orderings: descending risk with ascending ID tie-break, anomalies in file
+# (rowid) order, and top risk within one district or scheme.
+RISK_STORE_TABLE = "risk_scores"
+RISK_STORE_INDEXES = {
+    "idx_beneficiary_id": "beneficiary_id",
+    "idx_risk": "risk_score DESC, beneficiary_id",
+    "idx_anomaly": "anomaly, risk_score",
+    "idx_district": "district, risk_score DESC, beneficiary_id",
+    "idx_scheme": "scheme, risk_score DESC, beneficiary_id",
+}
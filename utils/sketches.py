@@ -0,0 +1,317 @@
+"""Mergeable approximate sketches for group-count features."""
+import math
+import pickle
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+from config import COUNT_FEATURES, SKETCH_DELTA, SKETCH_EPSILON, SKETCH_HLL_ERROR
+from utils.logger import setup_logger
+from utils.metrics import instrument
+
+logger = setup_logger(__name__)
+
+# Bumped whenever the saved layout or the key hashing changes
+SKETCH_VERSION = 1
+# Column distinct counts are grouped by
+DISTINCT_GROUP = "district"
+
+def key_hashes(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash group keys so equal values hash equally whatever dtype a chunk infers.
+
+    Args:
+        values: Key column
+
+    Returns:
+        Tuple of (uint64 hash per row, True where the key is present)
+    """
+    present = values.notna().to_numpy()
+    if pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+        # Whole numbers parsed as float because of missing values print as integers
+        values = values.astype("Int64")
+    keys = values.astype("str").where(present, "")
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy(), present
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Bit length of each uint64, exact (float64 holds 32-bit halves exactly)."""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+class CountMinSketch:
+    """Count-Min sketch of key frequencies.
+
+    A depth x width table of counters; each key increments one counter per
+    row and its count is the minimum of those counters. Estimates never
+    undercount and exceed the true count by at most epsilon times the total
+    count with probability 1 - delta. Tables with equal dimensions add up to
+    the sketch of the combined input, so shards can be counted separately.
+    """
+
+    def __init__(self, epsilon: float = SKETCH_EPSILON, delta: float = SKETCH_DELTA):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            epsilon: Error bound as a fraction of the total count
+            delta: Probability of exceeding the error bound
+        """
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.table = np.zeros((self.depth, self.width), dtype=np.uint32)
+        self.total = 0
+
+    def _columns(self, hashes: np.ndarray) -> np.ndarray:
+        """Counter column of each hash in every row, by double hashing."""
+        first = hashes & np.uint64(0xFFFFFFFF)
+        second = (hashes >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((first + rows * second) % np.uint64(self.width)).astype(np.int64)
+
+    def add(self, hashes: np.ndarray) -> None:
+        """Count one occurrence of each hashed key."""
+        for row, columns in enumerate(self._columns(hashes)):
+            if len(columns) * 8 < self.width:
+                np.add.at(self.table[row], columns, 1)
+            else:
+                # A dense histogram of the row is cheaper than scattered increments
+                self.table[row] += np.bincount(columns, minlength=self.width).astype(np.uint32)
+        self.total += len(hashes)
+
+    def query(self, hashes: np.ndarray) -> np.ndarray:
+        """Estimated count of each hashed key as int64."""
+        columns = self._columns(hashes)
+        counts = self.table[np.arange(self.depth)[:, None], columns]
+        return counts.min(axis=0).astype(np.int64)
+
+    def merge(self, other: "CountMinSketch") -> "CountMinSketch":
+        """Add another sketch of equal dimensions into this one."""
+        if (self.depth, self.width) != (other.depth, other.width):
+            raise ValueError(
+                f"Cannot merge {other.depth}x{other.width} sketch into {self.depth}x{self.width}"
+            )
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes
+
+class HyperLogLog:
+    """HyperLogLog distinct counters for many groups at once.
+
+    Each group keeps 2**precision one-byte registers holding the longest run
+    of leading zero bits seen among the hashes routed to them. The relative
+    standard error of a count is about 1.04 / sqrt(2**precision). Registers
+    merge by element-wise maximum.
+    """
+
+    def __init__(self, error: float = SKETCH_HLL_ERROR):
+        """
+        Initialize counters without groups.
+
+        Args:
+            error: Target relative standard error of each distinct count
+        """
+        self.precision = int(np.clip(math.ceil(math.log2((1.04 / error) ** 2)), 4, 18))
+        self.groups = pd.Index([], dtype="str")
+        self.registers = np.zeros((0, 2 ** self.precision), dtype=np.uint8)
+
+    def add(self, groups: pd.Series, hashes: np.ndarray) -> None:
+        """
+        Add hashed values to the counter of their group.
+
+        Args:
+            groups: Group label per value
+            hashes: uint64 hash per value
+        """
+        labels = groups.astype("str").to_numpy()
+        new = pd.Index(pd.unique(labels)).difference(self.groups)
+        if len(new):
+            self.groups = self.groups.append(new)
+            self.registers = np.vstack([
+                self.registers, np.zeros((len(new), self.registers.shape[1]), dtype=np.uint8)
+            ])
+
+        bits = 64 - self.precision
+        buckets = (hashes >> np.uint64(bits)).astype(np.int64)
+        rest = hashes & np.uint64((1 << bits) - 1)
+        ranks = (bits + 1 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(self.registers, (self.groups.get_indexer(labels), buckets), ranks)
+
+    def counts(self) -> pd.Series:
+        """Estimated distinct values per group."""
+        m = self.registers.shape[1]
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.exp2(-self.registers.astype(np.float64)).sum(axis=1)
+        # Linear counting is more accurate while many registers are still empty
+        zeros = (self.registers == 0).sum(axis=1)
+        small = (estimate <= 2.5 * m) & (zeros > 0)
+        estimate[small] = m * np.log(m / zeros[small])
+        return pd.Series(np.round(estimate).astype(np.int64), index=self.groups)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Fold another set of counters of equal precision into this one."""
+        if self.precision != other.precision:
+            raise ValueError(
+                f"Cannot merge precision {other.precision} counters into {self.precision}"
+            )
+        groups = self.groups.union(other.groups, sort=False)
+        registers = np.zeros((len(groups), self.registers.shape[1]), dtype=np.uint8)
+        registers[groups.get_indexer(self.groups)] = self.registers
+        positions = groups.get_indexer(other.groups)
+        registers[positions] = np.maximum(registers[positions], other.registers)
+        self.groups, self.registers = groups, registers
+        return self
+
+    @property
+    def nbytes(self) -> int:
+        return self.registers.nbytes
+
+class FeatureSketches:
+    """Sketch-backed group counts and per-district distinct counts.
+
+    One Count-Min sketch per COUNT_FEATURES column replaces the exact count
+    table, so memory is fixed by the error bounds instead of growing with the
+    number of distinct bank accounts and addresses. One HyperLogLog counter
+    set per column counts its distinct values in each district.
+    """
+
+    def __init__(
+        self,
+        epsilon: float = SKETCH_EPSILON,
+        delta: float = SKETCH_DELTA,
+        hll_error: float = SKETCH_HLL_ERROR
+    ):
+        """
+        Initialize empty sketches.
+
+        Args:
+            epsilon: Count-Min error bound as a fraction of the record count
+            delta: Probability of a count exceeding the error bound
+            hll_error: Relative standard error of the distinct counts
+        """
+        self.counts: Dict[str, CountMinSketch] = {
+            column: CountMinSketch(epsilon, delta) for column in COUNT_FEATURES.values()
+        }
+        self.distinct: Dict[str, HyperLogLog] = {
+            column: HyperLogLog(hll_error) for column in COUNT_FEATURES.values()
+        }
+        self.records = 0
+
+    @instrument("sketches.add")
+    def add(self, df: pd.DataFrame) -> "FeatureSketches":
+        """
+        Count the keys of a batch of records.
+
+        Args:
+            df: Records with the COUNT_FEATURES columns and optionally district
+
+        Returns:
+            self, for chaining
+        """
+        for column, sketch in self.counts.items():
+            hashes, present = key_hashes(df[column])
+            sketch.add(hashes[present])
+            if DISTINCT_GROUP in df.columns:
+                self.distinct[column].add(df[DISTINCT_GROUP][present], hashes[present])
+        self.records += len(df)
+        return self
+
+    def annotate(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add the estimated COUNT_FEATURES of each record.
+
+        Records without a key get NaN, as with the exact group count.
+
+        Args:
+            df: Records with the COUNT_FEATURES columns
+
+        Returns:
+            DataFrame with the count feature columns added
+        """
+        for feature, column in COUNT_FEATURES.items():
+            hashes, present = key_hashes(df[column])
+            counts = pd.Series(self.counts[column].query(hashes), index=df.index)
+            df[feature] = counts.where(present)
+        return df
+
+    def distinct_counts(self) -> pd.DataFrame:
+        """Estimated distinct values of each counted column per district."""
+        return pd.DataFrame({
+            column: sketch.counts() for column, sketch in self.distinct.items()
+        }).rename_axis(DISTINCT_GROUP)
+
+    def merge(self, other: "FeatureSketches") -> "FeatureSketches":
+        """Fold the sketches of another shard into these."""
+        for column in self.counts:
+            self.counts[column].merge(other.counts[column])
+            self.distinct[column].merge(other.distinct[column])
+        self.records += other.records
+        return self
+
+    @classmethod
+    def merged(cls, shards: Iterable["FeatureSketches"]) -> Optional["FeatureSketches"]:
+        """Merge per-shard sketches into one, None if there are no shards."""
+        total = None
+        for shard in shards:
+            total = shard if total is None else total.merge(shard)
+        return total
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the sketch tables and registers."""
+        return sum(s.nbytes for s in self.counts.values()) + sum(
+            s.nbytes for s in self.distinct.values()
+        )
+
+    def save(self, file_path: Path) -> bool:
+        """
+        Persist the sketches so a later run or process can query or extend them.
+
+        Args:
+            file_path: Destination path
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(file_path, "wb") as f:
+                pickle.dump({"version": SKETCH_VERSION, "sketches": self}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            logger.info(
+                f"Saved feature sketches of {self.records} records "
+                f"({self.nbytes / 2**20:.1f} MB) to {file_path}"
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"Error saving feature sketches to {file_path}: {str(e)}")
+            return False
+
+    @classmethod
+    def load(cls, file_path: Path) -> Optional["FeatureSketches"]:
+        """
+        Load sketches written by save().
+
+        Args:
+            file_path: Path written by save()
+
+        Returns:
+            FeatureSketches if successful, None otherwise
+        """
+        try:
+            with open(file_path, "rb") as f:
+                state = pickle.load(f)
+            if state.get("version") != SKETCH_VERSION:
+                logger.error(
+                    f"Feature sketch version {state.get('version')} does not match {SKETCH_VERSION}"
+                )
+                return None
+            return state["sketches"]
+
+        except Exception as e:
+            logger.error(f"Error loading feature sketches from {file_path}: {str(e)}")
+            return None
@@ -1,10 +1,41 @@
 """Data validation utilities."""
+import numpy as np
 import pandas as pd
-from typing import List
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from config import (
+    QUARANTINE_OUTPUT, VALIDATION_PHONE_PATTERN, VALIDATION_DATE_PATTERN,
+    VALIDATION_AMOUNT_MIN, VALIDATION_AMOUNT_MAX, VALIDATION_SCHEMES
+)
+from utils.data_loader import save_data
 from utils.logger import setup_logger
+from utils.metrics import instrument
 
 logger = setup_logger(__name__)
 
+class Rule(NamedTuple):
+    """One declarative check on one column; a row violating it gets the rule's bit set."""
+    name: str
+    column: str
+    check: str  # "required", "pattern", "range", "allowed" or "unique"
+    arg: Any = None
+
+# Bit i of a violation mask is set when rule i fails
+DEFAULT_RULES = tuple(
+    rule for rule in [
+        Rule("missing_id", "beneficiary_id", "required"),
+        Rule("missing_name", "name", "required"),
+        Rule("missing_bank_account", "bank_account", "required"),
+        Rule("bad_phone", "phone", "pattern", VALIDATION_PHONE_PATTERN),
+        Rule("bad_date", "date", "pattern", VALIDATION_DATE_PATTERN),
+        Rule("amount_out_of_range", "amount", "range", (VALIDATION_AMOUNT_MIN, VALIDATION_AMOUNT_MAX)),
+        Rule("unknown_scheme", "scheme", "allowed", VALIDATION_SCHEMES),
+        Rule("duplicate_id", "beneficiary_id", "unique"),
+    ]
+    # An empty scheme list means any scheme is accepted
+    if rule.check != "allowed" or rule.arg
+)
+
 def validate_beneficiary_data(df: pd.DataFrame) -> bool:
     """
     Validate beneficiary data schema and content.
@@ -39,3 +70,157 @@ def validate_beneficiary_data(df: pd.DataFrame) -> bool:
     
     logger.info("Data validation passed")
     return True
+
+class RuleValidator:
+    """Evaluate validation rules as vectorized column operations."""
+
+    def __init__(self, rules: Tuple[Rule, ...] = DEFAULT_RULES, stateful: bool = False):
+        """
+        Initialize rule validator.
+
+        Args:
+            rules: Rules to evaluate, at most 32
+            stateful: Remember values of "unique" columns across evaluate()
+                calls, so a chunked file is checked as a whole
+        """
+        if len(rules) > 32:
+            raise ValueError(f"At most 32 rules fit in a violation mask, got {len(rules)}")
+        self.rules = tuple(rules)
+        self.stateful = stateful
+        # Distinct values seen so far per unique column
+        self._seen: Dict[str, set] = {}
+
+    @property
+    def columns(self) -> List[str]:
+        """Columns read by the rules."""
+        return list(dict.fromkeys(rule.column for rule in self.rules))
+
+    def evaluate(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Compute the violation mask of every row.
+
+        Rules on columns missing from df are skipped; column presence is
+        checked by validate_beneficiary_data().
+
+        Args:
+            df: Records to check
+
+        Returns:
+            uint32 array with bit i set where rule i fails
+        """
+        mask = np.zeros(len(df), dtype=np.uint32)
+        for bit, rule in enumerate(self.rules):
+            if rule.column in df.columns:
+                failed = self._check(rule, df[rule.column])
+                mask[failed] |= np.uint32(1 << bit)
+        return mask
+
+    def split(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Separate valid records from violating ones.
+
+        Args:
+            df: Records to check
+
+        Returns:
+            Tuple of (valid records, violating records with violations and
+            violation_names columns added)
+        """
+        mask = self.evaluate(df)
+        bad = mask != 0
+        if not bad.any():
+            return df, df.iloc[:0].assign(violations=np.uint32(0), violation_names="")
+        quarantined = df[bad].copy()
+        quarantined["violations"] = mask[bad]
+        quarantined["violation_names"] = self.names(mask[bad])
+        return df[~bad], quarantined
+
+    def names(self, mask: np.ndarray) -> np.ndarray:
+        """Pipe-separated names of the failed rules of each mask."""
+        distinct, inverse = np.unique(mask, return_inverse=True)
+        labels = np.array([
+            "|".join(rule.name for bit, rule in enumerate(self.rules) if value >> bit & 1)
+            for value in distinct.tolist()
+        ], dtype=object)
+        return labels[inverse]
+
+    def counts(self, mask: np.ndarray) -> Dict[str, int]:
+        """Number of rows violating each rule."""
+        return {
+            rule.name: int(np.count_nonzero(mask & np.uint32(1 << bit)))
+            for bit, rule in enumerate(self.rules)
+        }
+
+    def _check(self, rule: Rule, values: pd.Series) -> np.ndarray:
+        """Boolean array, True where the rule fails."""
+        if rule.check == "required":
+            return values.isna().to_numpy()
+
+        if rule.check == "pattern":
+            if not pd.api.types.is_string_dtype(values):
+                values = values.astype("str")
+            # Arrow-backed strings match in RE2 without a Python loop
+            return ~values.str.fullmatch(rule.arg).fillna(False).to_numpy(dtype=bool)
+
+        if rule.check == "range":
+            low, high = rule.arg
+            numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            return ~((numbers >= low) & (numbers <= high))
+
+        if rule.check == "allowed":
+            return ~values.isin(rule.arg).to_numpy()
+
+        if rule.check == "unique":
+            return self._duplicated(rule.column, values)
+
+        raise ValueError(f"Unknown check {rule.check!r} in rule {rule.name}")
+
+    def _duplicated(self, column: str, values: pd.Series) -> np.ndarray:
+        """True for repeats of an earlier value; the first occurrence is kept. Nulls never repeat."""
+        present = values.notna().to_numpy()
+        failed = values.duplicated(keep="first").to_numpy() & present
+        if not self.stateful:
+            return failed
+
+        # Hash lookups keep the cost per chunk independent of the values seen before
+        array = values.to_numpy()
+        seen = self._seen.setdefault(column, set())
+        if seen:
+            failed |= np.fromiter(
+                (value in seen for value in array.tolist()), dtype=bool, count=len(array)
+            ) & present
+        seen.update(array[present & ~failed].tolist())
+        return failed
+
+@instrument("validation.quarantine")
+def quarantine_invalid(
+    df: pd.DataFrame,
+    file_path: Optional[Path] = QUARANTINE_OUTPUT,
+    validator: Optional[RuleValidator] = None
+) -> pd.DataFrame:
+    """
+    Drop records that violate a validation rule and save them for review.
+
+    Args:
+        df: Records to check
+        file_path: Where violating records are written, replacing earlier
+            ones; None to only drop them
+        validator: Validator to use, a fresh one with DEFAULT_RULES if None
+
+    Returns:
+        The valid records, index preserved
+    """
+    validator = validator or RuleValidator()
+    valid, quarantined = validator.split(df)
+
+    if file_path is not None:
+        if len(quarantined):
+            save_data(quarantined, file_path)
+        else:
+            # A file left by an earlier run would describe different input
+            file_path.unlink(missing_ok=True)
+
+    if len(quarantined):
+        counts = {name: n for name, n in validator.counts(quarantined["violations"].to_numpy()).items() if n}
+        logger.warning("Quarantined %d of %d records: %s", len(quarantined), len(df), counts)
+    return valid